@@ -23,6 +23,7 @@ from actionlib import SimpleActionServer
 # Import custom message, actions and services.
 from exprob_assignment1.msg import ControlFeedback, ControlResult
 from exprob_assignment1.srv import SetPose
+from exprob_assignment1.state_metrics import RequestRate
 import exprob_assignment1  # This is required to pass the `PlanAction` type for instantiating the `SimpleActionServer`.
 
 # A tag for identifying logs producer.
@@ -47,6 +48,11 @@ class ControllingAction(object):
 		"""
 		# Get random-based parameters used by this server
 		self._random_motion_time = rospy.get_param(anm.PARAM_CONTROLLER_TIME, [0.2, 0.5])
+		# Count the requests, and publish their rate in the benchmark mode
+		self._benchmark = rospy.get_param(anm.PARAM_BENCHMARK_MODE, False)
+		self._requests = RequestRate(anm.NODE_CONTROLLER)
+		if self._benchmark:
+			self._requests.start_benchmark()
 		# Instantiate and start the action server based on the `SimpleActionServer` class.
 		self._as = SimpleActionServer(anm.ACTION_CONTROLLER,
 											exprob_assignment1.msg.ControlAction,
@@ -57,6 +63,8 @@ class ControllingAction(object):
 		log_msg = (f'`{anm.ACTION_CONTROLLER}` Action Server initialised. It will navigate trough the plan with a delay ' 
 						f'between each via point spanning in [{self._random_motion_time[0]}, {self._random_motion_time[1]}).')
 		rospy.loginfo(anm.tag_log(log_msg, LOG_TAG))
+		if self._benchmark:
+			rospy.loginfo(anm.tag_log('Benchmark mode: the via points are reached without delay.', LOG_TAG))
 
 	
 	def execute_callback(self, goal):
@@ -64,13 +72,15 @@ class ControllingAction(object):
 		Callback invoked when a client sends a goal to the controller server. This method requires
 		a list of via points (i.e. the plan), and it simulate a movement through each point with a 
 		delay taht is between (['self._random_motion_time[0]`, `self._random_motion_time[1]`).
-		As soon as the server is done, it sends the result to the client.
+		As soon as the server is done, it sends the result to the client. In the benchmark mode there is
+		no delay, but the same feedback and result are sent.
 		
 		Args:
 			self: instance of the current class.
 			goal: it is a list of via points (i.e. the plan)
 		
 		"""
+		self._requests.record()
 		# Check if the provided plan is processable. If not, this service will be aborted.
 		if goal is None or goal.via_points is None or len(goal.via_points) == 0:
 			rospy.logerr(anm.tag_log('No via points provided! This service will be aborted!', LOG_TAG))
@@ -86,12 +96,13 @@ class ControllingAction(object):
 				rospy.loginfo(anm.tag_log('Service has been cancelled by the client!', LOG_TAG))
 				self._as.set_preempted()
 				return
-			delay = random.uniform(self._random_motion_time[0], self._random_motion_time[1])
-			rospy.sleep(delay)
-		feedback.reached_point = point
-		self._as.publish_feedback(feedback)
-		log_msg = f'Reaching point ({point.x}, {point.y}).'
-		rospy.loginfo(anm.tag_log(log_msg, LOG_TAG))
+			if not self._benchmark:
+				delay = random.uniform(self._random_motion_time[0], self._random_motion_time[1])
+				rospy.sleep(delay)
+			feedback.reached_point = point
+			self._as.publish_feedback(feedback)
+			log_msg = f'Reaching point ({point.x}, {point.y}).'
+			rospy.loginfo(anm.tag_log(log_msg, LOG_TAG))
 
 		# Publish the results to the client.
 		result = ControlResult()
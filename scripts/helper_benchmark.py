@@ -0,0 +1,415 @@
+#!/usr/bin/env python
+"""
+.. module:: helper_benchmark
+	:platform: Unix
+	:synopsis: Python script to measure the cost of the operations of the Helper of the state machine
+
+.. moduleauthor:: Francesco Ferrazzi <s5262829@studenti.unige.it>
+
+Benchmark that runs the Helper of the state machine against stand-ins of the other components of the
+architecture, all in the same node: an ARMOR stand-in which serves both the ARMOR services with the
+in-process Python ontology and counts the received calls, and mock planner and controller action
+servers and recharge service which answer immediately. For maps of growing size it measures:
+
+	- `build_environment`: the Build World state, i.e. generating the map, writing the Abox and
+	  loading it in the ontology.
+	- `reason`: the decision taken in the Reasoner state.
+	- `check_controller`: the update of the ontology when the robot reaches a location.
+	- `parse`: the parsing of the IRIs and of the literals returned by ARMOR for every location, done
+	  with the ontology_parser module.
+
+For every operation it reports the calls and the directives sent to the ontology, the p50, p99 and
+mean latency and, in a second pass with tracemalloc enabled, the peak and the retained memory
+allocated by the whole process (hence including the stand-in serving the calls). The `cycle` line
+sums the operations done every time the robot visits a location. The results are saved in a JSON
+file together with the commit of the package, so that they can be compared among commits.
+Only the ROS master is needed. Run it with `rosrun exprob_assignment1 helper_benchmark.py`.
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+import rospy
+import actionlib
+
+# Import constant name defined to structure the architecture.
+from exprob_assignment1 import architecture_name_mapper as anm
+# Import the messages of the action servers and of the services which are replaced.
+from exprob_assignment1.msg import PlanAction, PlanResult, PlanLeg, PatrolPlanAction, PatrolPlanResult, ControlAction, ControlResult
+from std_srvs.srv import SetBool, SetBoolResponse
+from armor_msgs.srv import ArmorDirective, ArmorDirectiveResponse, ArmorDirectiveList, ArmorDirectiveListResponse
+from armor_msgs.msg import ArmorDirectiveRes
+# Import the modules which are measured.
+from exprob_assignment1.map_generator import minimum_doors
+from exprob_assignment1.ontology_parser import parse_literals, parse_names
+from exprob_assignment1.python_ontology import PythonOntology
+from exprob_assignment1.state_machine_helper import Helper
+
+# A tag for identifying logs producer.
+LOG_TAG = anm.NODE_HELPER_BENCHMARK
+
+# Define the default number of locations of the maps
+SIZES = [7, 70, 700, 2800]
+# Define how many rooms there are for every corridor
+ROOMS_PER_CORRIDOR = 3
+# Define the operations done every time the robot visits a location
+CYCLE_OPERATIONS = ('reason', 'check_controller', 'parse')
+
+
+
+class ArmorStandIn:
+	"""
+	This class serves the ARMOR services with the in-process Python ontology, counting the calls and
+	the directives received.
+
+	"""
+	def __init__(self):
+		"""
+		Function that initializes the class ArmorStandIn and advertises the ARMOR services.
+
+		Args:
+			self: instance of the current class.
+
+		"""
+		self.ontology = PythonOntology()
+		self.calls = 0        # Number of calls received by the services
+		self.directives = 0   # Number of directives received with those calls
+		rospy.Service(anm.SERVICE_ARMOR, ArmorDirective, self.directive_callback)
+		rospy.Service(anm.SERVICE_ARMOR_SERIALIZED, ArmorDirectiveList, self.directive_list_callback)
+
+	def directive_callback(self, request):
+		"""
+		Callback of the service which executes a single directive.
+
+		Args:
+			self: instance of the current class.
+			request: it is the request with the directive.
+
+		Returns:
+			response: the response with the queried objects.
+
+		"""
+		self.calls += 1
+		return ArmorDirectiveResponse(armor_response=self._execute([request.armor_request])[0])
+
+	def directive_list_callback(self, request):
+		"""
+		Callback of the service which executes a list of directives.
+
+		Args:
+			self: instance of the current class.
+			request: it is the request with the list of directives.
+
+		Returns:
+			response: the response with the queried objects of every directive.
+
+		"""
+		self.calls += 1
+		return ArmorDirectiveListResponse(armor_responses=self._execute(request.armor_requests))
+
+	def _execute(self, requests):
+		"""
+		Method that executes the directives on the ontology and formats their results as ARMOR does.
+
+		Args:
+			self: instance of the current class.
+			requests: list of ArmorDirectiveReq messages.
+
+		Returns:
+			responses: list of ArmorDirectiveRes messages, in the same order.
+
+		"""
+		self.directives += len(requests)
+		results = self.ontology.call_batch([(req.command, req.primary_command_spec, req.secondary_command_spec, list(req.args)) for req in requests])
+		return [ArmorDirectiveRes(success=True, is_consistent=True, queried_objects=queried_objects) for queried_objects in results]
+
+
+
+class MockServers:
+	"""
+	This class implements the planner, patrol planner and controller action servers and the recharge service, which
+	answer as soon as they receive a request.
+
+	"""
+	def __init__(self):
+		"""
+		Function that initializes the class MockServers and starts the servers.
+
+		Args:
+			self: instance of the current class.
+
+		"""
+		self.planner = actionlib.SimpleActionServer(anm.ACTION_PLANNER, PlanAction, execute_cb=self.plan_callback, auto_start=False)
+		self.planner.start()
+		self.patrol_planner = actionlib.SimpleActionServer(anm.ACTION_PATROL_PLANNER, PatrolPlanAction, execute_cb=self.patrol_callback, auto_start=False)
+		self.patrol_planner.start()
+		self.controller = actionlib.SimpleActionServer(anm.ACTION_CONTROLLER, ControlAction, execute_cb=self.control_callback, auto_start=False)
+		self.controller.start()
+		rospy.Service(anm.TOPIC_RECHARGE, SetBool, lambda request: SetBoolResponse(success=True))
+
+	def plan_callback(self, goal):
+		"""
+		Callback of the planner, which plans a straight path from the current point to the target.
+
+		Args:
+			self: instance of the current class.
+			goal: it is the goal with the current and the target point.
+
+		"""
+		self.planner.set_succeeded(PlanResult(via_points=[goal.current, goal.target]))
+
+	def patrol_callback(self, goal):
+		"""
+		Callback of the patrol planner, which plans straight paths between the points of the patrol.
+
+		Args:
+			self: instance of the current class.
+			goal: it is the goal with the current point and the targets.
+
+		"""
+		points = [goal.current] + list(goal.targets)
+		legs = [PlanLeg(via_points=[first, last]) for first, last in zip(points[:-1], points[1:])]
+		self.patrol_planner.set_succeeded(PatrolPlanResult(legs=legs))
+
+	def control_callback(self, goal):
+		"""
+		Callback of the controller, which reaches the last via point.
+
+		Args:
+			self: instance of the current class.
+			goal: it is the goal with the via points.
+
+		"""
+		self.controller.set_succeeded(ControlResult(reached_point=goal.via_points[-1]))
+
+
+
+class Samples:
+	"""
+	Class that holds the measures of an operation.
+
+	"""
+	def __init__(self):
+		"""
+		Function that initializes the class Samples.
+
+		Args:
+			self: instance of the current class.
+
+		"""
+		self.latencies = []   # Latency of every execution, in seconds
+		self.calls = 0        # Number of calls received by the ontology
+		self.directives = 0   # Number of directives received by the ontology
+		self.peaks = []       # Peak memory allocated during every execution, in bytes
+		self.retained = []    # Memory still allocated after every execution, in bytes
+
+	def summary(self):
+		"""
+		Method that returns the statistics of the operation.
+
+		Args:
+			self: instance of the current class.
+
+		Returns:
+			summary: dictionary with the number of samples, the calls and directives per execution,
+			the latency in milliseconds and the allocated memory in kilobytes.
+
+		"""
+		count = len(self.latencies)
+		return {'samples': count,
+			'calls': self.calls / count,
+			'directives': self.directives / count,
+			'p50_ms': percentile(self.latencies, 0.5) * 1000.0,
+			'p99_ms': percentile(self.latencies, 0.99) * 1000.0,
+			'mean_ms': sum(self.latencies) * 1000.0 / count,
+			'alloc_peak_kb': percentile(self.peaks, 0.5) / 1024.0,
+			'alloc_retained_kb': percentile(self.retained, 0.5) / 1024.0}
+
+
+
+def percentile(values, q):
+	"""
+	Function that computes a percentile with the nearest rank method.
+
+	Args:
+		values: list of values.
+		q: it is the percentile, between 0 and 1.
+
+	Returns:
+		value: the percentile, 0 if there are no values.
+
+	"""
+	if len(values) == 0:
+		return 0.0
+	ordered = sorted(values)
+	return ordered[min(len(ordered) - 1, max(0, int(q * len(ordered) + 0.5) - 1))]
+
+
+
+def measure(samples, standin, traced, function, *args):
+	"""
+	Function that executes an operation and records its latency, or its allocations if tracemalloc
+	is enabled, and the calls received by the ontology.
+
+	Args:
+		samples: it is the instance of Samples() of the operation.
+		standin: it is the ARMOR stand-in.
+		traced: it is True if the allocations are measured instead of the latency.
+		function: it is the operation.
+		args: they are the arguments of the operation.
+
+	"""
+	calls, directives = standin.calls, standin.directives
+	if traced:
+		# Restart the tracing so that the peak refers to this execution only
+		tracemalloc.start()
+		function(*args)
+		retained, peak = tracemalloc.get_traced_memory()
+		tracemalloc.stop()
+		samples.peaks.append(peak)
+		samples.retained.append(retained)
+	else:
+		start = time.perf_counter()
+		function(*args)
+		samples.latencies.append(time.perf_counter() - start)
+		samples.calls += standin.calls - calls
+		samples.directives += standin.directives - directives
+
+
+
+def move(helper):
+	"""
+	Function that moves the robot to the location decided by the reasoner, as the Planner and
+	Controller states do.
+
+	Args:
+		helper: it is the helper of the state machine.
+
+	"""
+	helper.planner()
+	helper.wait_action(helper.planner_cli)
+	helper.check_planner()
+	helper.controller()
+	helper.wait_action(helper.controller_cli)
+
+
+
+def run_pass(cycles, standin, measures, traced):
+	"""
+	Function that builds the map set in the parameters with a new helper and lets the robot visit a location for every cycle.
+
+	Args:
+		cycles: it is the number of locations visited.
+		standin: it is the ARMOR stand-in.
+		measures: dictionary with the instance of Samples() of every operation.
+		traced: it is True if the allocations are measured instead of the latency.
+
+	"""
+	helper = Helper()
+	measure(measures['build_environment'], standin, traced, helper.build_environment)
+	locations = helper._rooms + helper._corridors
+	for _ in range(0, cycles):
+		measure(measures['reason'], standin, traced, helper.reason)
+		move(helper)
+		measure(measures['check_controller'], standin, traced, helper.check_controller)
+		# Parse what ARMOR returns for the locations and for their last visit
+		iris = standin.ontology.call('QUERY', 'IND', 'CLASS', ['LOCATION'])
+		literals = [obj for loc in locations for obj in standin.ontology.call('QUERY', 'DATAPROP', 'IND', ['visitedAt', loc])]
+		measure(measures['parse'], standin, traced, lambda: (parse_names(iris), parse_literals(literals)))
+
+
+
+def run(number_locations, topology, cycles, standin):
+	"""
+	Function that measures the operations of the helper for a single map.
+
+	Args:
+		number_locations: it is the number of locations of the map.
+		topology: it is the way in which the corridors are connected.
+		cycles: it is the number of locations visited.
+		standin: it is the ARMOR stand-in.
+
+	Returns:
+		result: dictionary with the size of the map and the statistics of every operation.
+
+	"""
+	number_corridors = max(1, number_locations // (ROOMS_PER_CORRIDOR + 1))
+	number_rooms = number_locations - number_corridors
+	number_doors = minimum_doors(number_rooms, number_corridors, topology)
+	rospy.set_param(anm.PARAM_MAP_ROOMS, number_rooms)
+	rospy.set_param(anm.PARAM_MAP_CORRIDORS, number_corridors)
+	rospy.set_param(anm.PARAM_MAP_DOORS, number_doors)
+	rospy.set_param(anm.PARAM_MAP_TOPOLOGY, topology)
+	measures = {op: Samples() for op in ('build_environment',) + CYCLE_OPERATIONS}
+	# Measure the latency first, then the allocations, since tracing slows down every allocation
+	run_pass(cycles, standin, measures, False)
+	run_pass(cycles, standin, measures, True)
+	operations = {op: samples.summary() for op, samples in measures.items()}
+	operations['cycle'] = {key: sum(operations[op][key] for op in CYCLE_OPERATIONS)
+		for key in ('calls', 'directives', 'p50_ms', 'p99_ms', 'mean_ms', 'alloc_peak_kb', 'alloc_retained_kb')}
+	return {'locations': number_locations,
+		'rooms': number_rooms,
+		'corridors': number_corridors,
+		'doors': number_doors,
+		'topology': topology,
+		'operations': operations}
+
+
+
+def commit():
+	"""
+	Function that returns the commit of the package, if it is a git repository.
+
+	Returns:
+		commit: the hash of the commit, None if it is not known.
+
+	"""
+	try:
+		return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+			stderr=subprocess.DEVNULL, text=True).strip()
+	except (OSError, subprocess.CalledProcessError):
+		return None
+
+
+
+def main():
+	"""
+	Function that parses the command line, runs the benchmark, prints the results and saves them.
+
+	"""
+	parser = argparse.ArgumentParser(description='Measure the cost of the operations of the Helper of the state machine.')
+	parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help='number of locations of the maps')
+	parser.add_argument('--topology', default='ring', help='topology of the maps')
+	parser.add_argument('--cycles', type=int, default=50, help='number of locations visited for every map')
+	parser.add_argument('--seed', type=int, default=0, help='seed of the random generator')
+	parser.add_argument('--output', default='helper_benchmark.json', help='path of the JSON file in which the results are saved')
+	args = parser.parse_args(rospy.myargv()[1:])
+	# Only the warnings are logged, so that the logs of the helper do not dominate the measures
+	rospy.init_node(anm.NODE_HELPER_BENCHMARK, log_level=rospy.WARN)
+	random.seed(args.seed)
+	standin = ArmorStandIn()
+	MockServers()
+	results = []
+	print(f'{"locations":>10} {"operation":>18} {"calls":>8} {"directives":>10} {"p50 [ms]":>10} {"p99 [ms]":>10} {"peak [kB]":>10}')
+	for number_locations in args.sizes:
+		result = run(number_locations, args.topology, args.cycles, standin)
+		results.append(result)
+		for op, stats in result['operations'].items():
+			print(f'{number_locations:>10} {op:>18} {stats["calls"]:>8.2f} {stats["directives"]:>10.2f} {stats["p50_ms"]:>10.3f} {stats["p99_ms"]:>10.3f} {stats["alloc_peak_kb"]:>10.1f}', flush=True)
+	with open(args.output, 'w') as output_file:
+		json.dump({'commit': commit(),
+			'time': time.time(),
+			'python': sys.version.split()[0],
+			'cycles': args.cycles,
+			'seed': args.seed,
+			'results': results}, output_file, indent=2)
+	rospy.signal_shutdown('benchmark completed')
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+"""
+.. module:: map_benchmark
+	:platform: Unix
+	:synopsis: Python script to measure how the architecture scales with the size of the map
+
+.. moduleauthor:: Francesco Ferrazzi <s5262829@studenti.unige.it>
+
+Benchmark that generates maps of growing size with every topology and measures:
+
+	- `build`: the time spent in the Build World state, i.e. generating the map, filling the local
+	  indexes, writing the Abox and loading it (with the first REASON) in the in-process ontology.
+	- `reasoner`: the mean latency of the decision taken in the Reasoner state, which uses the local
+	  indexes of the topology and of the urgency.
+	- `ontology`: the mean latency of the same decision taken by querying the ontology, i.e. REASON,
+	  `canReach` of the robot and the classes of every reachable location.
+
+The in-process Python ontology is used, so neither ROS nor ARMOR are needed. Run it with
+`rosrun exprob_assignment1 map_benchmark.py`, or with `PYTHONPATH=utilities python3 scripts/map_benchmark.py`
+from the root of the package. The results can also be saved in a JSON file.
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from exprob_assignment1.abox_generator import write_abox
+from exprob_assignment1.map_generator import TOPOLOGIES, generate_map, is_connected, minimum_doors
+from exprob_assignment1.ontology_parser import parse_names
+from exprob_assignment1.python_ontology import PythonOntology
+from exprob_assignment1.topology_index import TopologyIndex
+from exprob_assignment1.urgency_tracker import UrgencyTracker, read_long_property
+
+# Define the paths of the Tbox and the IRI of the ontology
+TBOX_FILE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'topological_map', 'topological_map.owl')
+WEB_PATH = 'http://bnc/exp-rob-lab/2022-23'
+# Define the default number of locations of the maps
+SIZES = [10, 100, 1000, 10000]
+# Define how many rooms there are for every corridor
+ROOMS_PER_CORRIDOR = 3
+
+
+
+def build(number_locations, topology, abox_path, rng):
+	"""
+	Function that builds a map in the same way of the Build World state.
+
+	Args:
+		number_locations: it is the number of locations of the map.
+		topology: it is the way in which the corridors are connected.
+		abox_path: it is the path of the OWL file to be written.
+		rng: it is the random generator.
+
+	Returns:
+		corridors: list with the names of the corridors.
+		topology_index: the local index of the topology.
+		urgency: the local index of the urgency.
+		ontology: the in-process ontology.
+
+	"""
+	number_corridors = max(1, number_locations // (ROOMS_PER_CORRIDOR + 1))
+	number_rooms = number_locations - number_corridors
+	number_doors = minimum_doors(number_rooms, number_corridors, topology)
+	rooms, corridors, doors, location_doors = generate_map(number_rooms, number_corridors, number_doors, topology, 'E', rng)
+	if not is_connected(location_doors, 'E'):
+		raise RuntimeError(f'The {topology} map with {number_locations} locations is not connected')
+	topology_index = TopologyIndex()
+	for loc, loc_doors in location_doors.items():
+		for door in loc_doors:
+			topology_index.add_door(loc, door)
+	now = int(time.time())
+	urgency = UrgencyTracker(read_long_property(TBOX_FILE_PATH, 'Robot1', 'urgencyThreshold'))
+	for loc in rooms + corridors:
+		urgency.update(loc, 1000000000)
+	urgency.update('E', now)
+	visited_at = {loc: urgency.visited_at(loc) for loc in rooms + corridors}
+	write_abox(TBOX_FILE_PATH, abox_path, WEB_PATH, location_doors, visited_at, 'Robot1', 'E', now)
+	ontology = PythonOntology()
+	ontology.call('LOAD', 'FILE', '', [abox_path, WEB_PATH, 'true', 'PELLET', 'false'])
+	return corridors, topology_index, urgency, ontology
+
+
+
+def decide_locally(location, now, corridors, topology_index, urgency):
+	"""
+	Function that takes the decision of the Reasoner state with the local indexes.
+
+	Args:
+		location: it is the location of the robot.
+		now: it is the last time in which the robot moved.
+		corridors: set with the names of the corridors.
+		topology_index: the local index of the topology.
+		urgency: the local index of the urgency.
+
+	Returns:
+		next_loc: the next location of the robot, the same one if no other can be reached.
+
+	"""
+	can_reach = topology_index.neighbours(location)
+	urgent_loc = urgency.urgent(now, can_reach)
+	if len(urgent_loc) > 0:
+		return urgent_loc[0]
+	possible_corridor = [loc for loc in can_reach if loc in corridors]
+	if len(possible_corridor) > 0:
+		return possible_corridor[0]
+	return can_reach[0] if len(can_reach) > 0 else location
+
+
+
+def decide_with_ontology(ontology, location):
+	"""
+	Function that takes the decision of the Reasoner state by querying the ontology.
+
+	Args:
+		ontology: the in-process ontology.
+		location: it is the location of the robot.
+
+	Returns:
+		next_loc: the next location of the robot, the same one if no other can be reached.
+
+	"""
+	directives = [('REASON', '', '', ['']), ('QUERY', 'OBJECTPROP', 'IND', ['canReach', 'Robot1'])]
+	can_reach = parse_names(ontology.call_batch(directives)[-1])
+	directives = [('QUERY', 'CLASS', 'IND', [loc, 'false']) for loc in can_reach]
+	all_status = [parse_names(status) for status in ontology.call_batch(directives)]
+	urgent_loc = [can_reach[i] for i in range(0, len(can_reach)) if 'URGENT' in all_status[i]]
+	possible_corridor = [can_reach[i] for i in range(0, len(can_reach)) if 'CORRIDOR' in all_status[i]]
+	candidates = urgent_loc + possible_corridor + can_reach
+	return candidates[0] if len(candidates) > 0 else location
+
+
+
+def run(number_locations, topology, cycles, seed):
+	"""
+	Function that measures the build time and the latency of the Reasoner for a single map. The
+	robot moves from a location to the next one chosen by the Reasoner, as in the state machine.
+
+	Args:
+		number_locations: it is the number of locations of the map.
+		topology: it is the way in which the corridors are connected.
+		cycles: it is the number of decisions taken by the Reasoner.
+		seed: it is the seed of the random generator.
+
+	Returns:
+		result: dictionary with the size of the map and the measured times, in milliseconds.
+
+	"""
+	rng = random.Random(seed)
+	with tempfile.TemporaryDirectory() as tmp_dir:
+		start = time.perf_counter()
+		corridors, topology_index, urgency, ontology = build(number_locations, topology, os.path.join(tmp_dir, 'abox.owl'), rng)
+		build_time = time.perf_counter() - start
+	corridors = set(corridors)
+	location = 'E'
+	now = urgency.visited_at('E')
+	local_time = 0.0
+	ontology_time = 0.0
+	for _ in range(0, cycles):
+		start = time.perf_counter()
+		next_loc = decide_locally(location, now, corridors, topology_index, urgency)
+		local_time += time.perf_counter() - start
+		start = time.perf_counter()
+		decide_with_ontology(ontology, location)
+		ontology_time += time.perf_counter() - start
+		# Move the robot, both in the local indexes and in the ontology
+		last_motion = now
+		now += 1
+		ontology.call_batch([
+			('REPLACE', 'OBJECTPROP', 'IND', ['isIn', 'Robot1', next_loc, location]),
+			('REPLACE', 'DATAPROP', 'IND', ['now', 'Robot1', 'Long', str(now), str(last_motion)]),
+			('REPLACE', 'DATAPROP', 'IND', ['visitedAt', next_loc, 'Long', str(now), str(urgency.visited_at(next_loc))])])
+		urgency.update(next_loc, now)
+		location = next_loc
+	return {'locations': number_locations,
+		'topology': topology,
+		'build_ms': build_time * 1000.0,
+		'reasoner_ms': local_time * 1000.0 / cycles,
+		'ontology_ms': ontology_time * 1000.0 / cycles}
+
+
+
+def main():
+	"""
+	Function that parses the command line, runs the benchmark and prints the results.
+
+	"""
+	parser = argparse.ArgumentParser(description='Measure how the architecture scales with the size of the map.')
+	parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help='number of locations of the maps')
+	parser.add_argument('--topologies', nargs='+', default=list(TOPOLOGIES), choices=TOPOLOGIES, help='topologies of the maps')
+	parser.add_argument('--cycles', type=int, default=20, help='number of decisions taken by the Reasoner')
+	parser.add_argument('--seed', type=int, default=0, help='seed of the random generator')
+	parser.add_argument('--output', help='path of the JSON file in which the results are saved')
+	args = parser.parse_args()
+	results = []
+	print(f'{"locations":>10} {"topology":>8} {"build [ms]":>12} {"reasoner [ms]":>14} {"ontology [ms]":>14}')
+	for number_locations in args.sizes:
+		for topology in args.topologies:
+			result = run(number_locations, topology, args.cycles, args.seed)
+			results.append(result)
+			print(f'{result["locations"]:>10} {result["topology"]:>8} {result["build_ms"]:>12.2f} {result["reasoner_ms"]:>14.4f} {result["ontology_ms"]:>14.4f}', flush=True)
+	if args.output:
+		with open(args.output, 'w') as output_file:
+			json.dump(results, output_file, indent=2)
+
+
+if __name__ == '__main__':
+	main()
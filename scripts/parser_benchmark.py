@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+"""
+.. module:: parser_benchmark
+	:platform: Unix
+	:synopsis: Python script to compare the parser of the queried objects with the positional slicing
+
+.. moduleauthor:: Francesco Ferrazzi <s5262829@studenti.unige.it>
+
+Benchmark that measures the time needed to get the names of the IRIs and the timestamps of the
+literals returned by ARMOR, with the ontology_parser module and with the positional slicing used
+before (i.e. `[32:-1]` for the IRIs and `[1:11]` for the timestamps, which also gives strings that
+have to be converted to compare the timestamps). Neither ROS nor ARMOR are needed. Run it with
+`rosrun exprob_assignment1 parser_benchmark.py`, or with `PYTHONPATH=utilities python3 scripts/parser_benchmark.py`
+from the root of the package.
+"""
+
+import argparse
+import timeit
+
+from exprob_assignment1.ontology_parser import parse_literals, parse_names
+
+# Define the IRI of the ontology
+WEB_PATH = 'http://bnc/exp-rob-lab/2022-23'
+
+
+
+def main():
+	"""
+	Function that parses the command line, runs the benchmark and prints the results.
+
+	"""
+	parser = argparse.ArgumentParser(description='Compare the parser of the queried objects with the positional slicing.')
+	parser.add_argument('--objects', type=int, default=100, help='number of objects of every query')
+	parser.add_argument('--repeat', type=int, default=10000, help='number of parsed queries')
+	args = parser.parse_args()
+	# The names of the locations repeat among the queries, while the timestamps keep changing
+	iris = [f'<{WEB_PATH}#R{i}>' for i in range(0, args.objects)]
+	literals = [f'"{1665579740 + i}"^^xsd:long' for i in range(0, args.objects)]
+	cases = [
+		('IRI slicing', lambda: [obj[32:-1] for obj in iris]),
+		('IRI parser', lambda: parse_names(iris)),
+		('literal slicing', lambda: [int(obj[1:11]) for obj in literals]),
+		('literal parser', lambda: parse_literals(literals)),
+	]
+	print(f'{"case":>16} {"time per object [us]":>22}')
+	for name, function in cases:
+		elapsed = min(timeit.repeat(function, number=args.repeat, repeat=3))
+		print(f'{name:>16} {elapsed * 1e6 / (args.repeat * args.objects):>22.4f}')
+
+
+if __name__ == '__main__':
+	main()
@@ -7,35 +7,62 @@
 .. moduleauthor:: Francesco Ferrazzi <s5262829@studenti.unige.it>
 
 ROS node for the first assignment of the Experimental Robotics course of the Robotics Engineering
-Master program. The software architecture allows simulating the behavior of a planner that 
-produces a list of random via points starting from the current position and arriving at the target 
-position given by the client. Both the current position and the target positions are random points 
-defined inside the environment.
+Master program. The software architecture allows planning the path of a surveillance robot from the 
+current position to the target position given by the client. The path is searched with A* on an 
+occupancy grid of the map, which is drawn from the doors of the locations written by the state machine 
+when the map is built (see the grid_planner module). Until the map is known, the plan is a straight line.
+Since the robot moves among the same locations, the paths are kept in a bounded LRU cache, keyed by the 
+cells of the start and of the target points, whose entries expire after some time and are dropped when 
+the map changes. The statistics of the cache are published on the /diagnostics topic.
+The feedback holds the whole path computed so far or, if the client asks for it in the goal, only the 
+points added since the previous feedback, together with the index in the plan of the first one.
+The node also plans the legs of a patrol, i.e. the paths towards many points in order, in a single goal 
+of the patrol planner, which shares the occupancy grid and the cache of the paths and sends the plan of 
+every leg as feedback.
+
+Parameters:
+	/state/map/location_doors the doors of every location of the map
+	config/planner/resolution the size of the cells of the occupancy grid
+	config/planner/cache_size the largest number of paths kept in the cache
+	config/planner/cache_ttl the time after which a path of the cache expires
+
+Publishes to:
+	/diagnostics the hit ratio and the size of the cache of the paths
 
 Action Service:
 	/motion/planner to make the planner create the desired path		
+	/motion/patrol_planner to make the planner create the paths of the legs of a patrol
 """
 
-import random
+import time
+import threading
 import rospy
 # Import constant name defined to structure the architecture.
 from exprob_assignment1 import architecture_name_mapper as anm
 # Import the ActionServer implementation used.
 from actionlib import SimpleActionServer
 # Import custom message, actions and services.
-from exprob_assignment1.msg import Point, PlanFeedback, PlanResult
+from exprob_assignment1.msg import Point, PlanFeedback, PlanResult, PlanLeg, PatrolPlanFeedback, PatrolPlanResult
 from exprob_assignment1.srv import GetPose
+from diagnostic_msgs.msg import DiagnosticArray, DiagnosticStatus, KeyValue
+# Import the engine which plans the paths on the occupancy grid.
+from exprob_assignment1.grid_planner import RESOLUTION, MapLayout, GridPlanner
+# Import the cache of the planned paths.
+from exprob_assignment1.plan_cache import CACHE_SIZE, CACHE_TTL, PlanCache
+from exprob_assignment1.state_metrics import RequestRate
 import exprob_assignment1  # This is required to pass the `PlanAction` type for instantiating the `SimpleActionServer`.
 
 
 # A tag for identifying logs producer.
 LOG_TAG = anm.NODE_PLANNER
+# Define the time between two messages with the statistics of the cache, in seconds
+CACHE_STATS_PERIOD = 5.0
 
 
 
 class PlaningAction(object):
 	"""
-	This class implements an action server to simulate motion planning task for a surveillance robot.
+	This class implements an action server to plan the motion of a surveillance robot.
 	Given a current position and a target position, it generates a plan as a set of via points.
 	
 	"""
@@ -47,37 +74,58 @@ class PlaningAction(object):
 			self: instance of the current class.
 		
 		"""
-		# Get random-based parameters used by this server
-		self._random_plan_points = rospy.get_param(anm.PARAM_PLANNER_POINTS, [2, 8])
-		self._random_plan_time = rospy.get_param(anm.PARAM_PLANNER_TIME, [0.1, 0.3])
-		#self._environment_size = rospy.get_param(anm.PARAM_ENVIRONMENT_SIZE)
+		# Get the size of the cells of the occupancy grid
+		self._resolution = rospy.get_param(anm.PARAM_PLANNER_RESOLUTION, RESOLUTION)
+		# The planning engine is created when the map is known, and created again when it changes
+		self._planner = None
+		self._map_param = None
+		self._location_doors = None
+		# The two action servers run on different threads, but share the planning engine and the cache
+		self._lock = threading.Lock()
+		# Initialize the cache of the paths
+		self._cache = PlanCache(rospy.get_param(anm.PARAM_PLANNER_CACHE_SIZE, CACHE_SIZE),
+								rospy.get_param(anm.PARAM_PLANNER_CACHE_TTL, CACHE_TTL))
+		self._diagnostics = rospy.Publisher('/diagnostics', DiagnosticArray, queue_size=1)
+		self._stats_timer = rospy.Timer(rospy.Duration(CACHE_STATS_PERIOD), self._publish_stats)
+		# Count the requests, and publish their rate in the benchmark mode
+		self._benchmark = rospy.get_param(anm.PARAM_BENCHMARK_MODE, False)
+		self._requests = RequestRate(anm.NODE_PLANNER)
+		if self._benchmark:
+			self._requests.start_benchmark()
 		# Instantiate and start the action server based on the `SimpleActionServer` class.
 		self._as = SimpleActionServer(anm.ACTION_PLANNER, 
 										exprob_assignment1.msg.PlanAction, 
 										execute_cb=self.execute_callback, 
 										auto_start=False)
 		self._as.start()
+		self._patrol_as = SimpleActionServer(anm.ACTION_PATROL_PLANNER,
+										exprob_assignment1.msg.PatrolPlanAction,
+										execute_cb=self.execute_patrol_callback,
+										auto_start=False)
+		self._patrol_as.start()
 		# Log information.
-		log_msg = (f'`{anm.ACTION_PLANNER}` Action Server initialised. It will create random path with a number of point '
-					f'spanning in [{self._random_plan_points[0]}, {self._random_plan_points[1]}). Each point will be generated '
-					f'with a delay spanning in [{self._random_plan_time[0]}, {self._random_plan_time[1]}).')
+		log_msg = (f'`{anm.ACTION_PLANNER}` Action Server initialised. It will plan the paths with A* on an occupancy '
+					f'grid with cells of {self._resolution} meters, keeping up to {self._cache.capacity} of them for '
+					f'{self._cache.ttl} seconds.')
+		rospy.loginfo(anm.tag_log(log_msg, LOG_TAG))
 	  
 	
 	def execute_callback(self, goal):
 		""" 
 		Callback invoked when a client sends a goal to the planner server. This method requires
-		two points (i.e. the current and the target points), and returns a list of random points
+		two points (i.e. the current and the target points), and returns the path between them
 		(i.e. the plan), where the fist point is the current point and the last point is the 
-		target point. The plan will contain a random number of other points which spans in the range
-		([`self._random_plan_points[0]`, `self._random_plan_points[1]`). To simulate computation,
-		each point is added to the plan with a random delay spanning in the range 
-		([`self._random_plan_time[0]`, `self._random_plan_time[1]`).
+		target point. The other points are the corners of the path found by A* on the occupancy 
+		grid of the map, after removing the ones that can be skipped with a straight line. If a 
+		path between the same cells is in the cache, it is returned without searching it again.
+		If the goal asks for the delta feedback, every feedback only holds the new points.
 		
 		Args:
 			self: instance of the current class.
 			goal: are the current point and the target point, which are pre defined.
 		
 		"""
+		self._requests.record()
 		# Get the input parameters to compute the plan, i.e., the start (or current) and target positions.
 		start_point = goal.current
 		target_point = goal.target
@@ -100,36 +148,46 @@ class PlaningAction(object):
 		feedback = PlanFeedback()
 		feedback.via_points = []
 		feedback.via_points.append(start_point)
-		# Publish the feedback and wait to simulate computation.
-		self._as.publish_feedback(feedback)
-		delay = random.uniform(self._random_plan_time[0], self._random_plan_time[1])
-		rospy.sleep(delay)
-
-		# Get a random number of via points to be included in the plan.
-		number_of_points = random.randint(self._random_plan_points[0], self._random_plan_points[1] + 1)
-		log_msg = f'Server is planning {number_of_points + 1} points...'
-		rospy.loginfo(anm.tag_log(log_msg, LOG_TAG))
+		sent = self._publish_feedback(feedback, goal.delta_feedback, 0)   # Number of points already published
 
-		# Generate the points of the plan.
-		for i in range(1, number_of_points):
-			if self._as.is_preempt_requested():
-					rospy.loginfo(anm.tag_log('Server has been cancelled by the client!', LOG_TAG))
-					# Actually cancel this service.
-					self._as.set_preempted()  
-					return
-			new_point = Point()
-			new_point.x = random.uniform(0, anm.ENVIRONMENT_SIZE[0])
-			new_point.y = random.uniform(0, anm.ENVIRONMENT_SIZE[1])
-			feedback.via_points.append(new_point)
-			if i < number_of_points - 1:
-				# Publish the new random point as feedback to the client.
-				self._as.publish_feedback(feedback)
-				# Wait to simulate computation.
-				delay = random.uniform(self._random_plan_time[0], self._random_plan_time[1])
-				rospy.sleep(delay)
+		# Search the path on the occupancy grid, or go straight to the target if the map is not known yet
+		with self._lock:
+			planner = self._load_map()
+			start = time.perf_counter()
+			if planner is None:
+				log_msg = 'The map is not known yet, planning a straight path.'
+				rospy.logwarn(anm.tag_log(log_msg, LOG_TAG))
+				path = [(start_point.x, start_point.y), (target_point.x, target_point.y)]
 			else:
-				# Append the target point to the plan as the last point.
-				feedback.via_points.append(target_point)
+				key = (planner.cell(start_point.x, start_point.y), planner.cell(target_point.x, target_point.y))
+				path = self._cache.lookup(key)
+				cached = path is not None
+				if not cached:
+					path = planner.plan((start_point.x, start_point.y), (target_point.x, target_point.y))
+					if path is not None:
+						self._cache.store(key, path)
+			expanded = planner.expanded if planner is not None else 0
+		if self._as.is_preempt_requested():
+			rospy.loginfo(anm.tag_log('Server has been cancelled by the client!', LOG_TAG))
+			# Actually cancel this service.
+			self._as.set_preempted()
+			return
+		if path is None:
+			log_msg = (f'There is no path from ({start_point.x}, {start_point.y}) to ({target_point.x}, '
+								f'{target_point.y}). This service will be aborted!.')
+			rospy.logerr(anm.tag_log(log_msg, LOG_TAG))
+			self._as.set_aborted()
+			return
+		if planner is not None and cached:
+			log_msg = f'Server found the path of {len(path)} points in the cache'
+			rospy.loginfo(anm.tag_log(log_msg, LOG_TAG))
+		elif planner is not None:
+			log_msg = f'Server planned {len(path)} points in {(time.perf_counter() - start) * 1000.0:.1f} ms, expanding {expanded} cells'
+			rospy.loginfo(anm.tag_log(log_msg, LOG_TAG))
+		# The first and the last points are the ones given by the client
+		feedback.via_points.extend(Point(x=x, y=y) for x, y in path[1:-1])
+		feedback.via_points.append(target_point)
+		self._publish_feedback(feedback, goal.delta_feedback, sent)
 
 		# Publish the results to the client.        
 		result = PlanResult()
@@ -139,6 +197,154 @@ class PlaningAction(object):
 		log_msg += ''.join('(' + str(point.x) + ', ' + str(point.y) + '), ' for point in result.via_points)
 		rospy.loginfo(anm.tag_log(log_msg, LOG_TAG))
 
+
+	def execute_patrol_callback(self, goal):
+		""" 
+		Callback invoked when a client sends a goal to the patrol planner server. This method requires
+		the current point and the list of the points to be reached in order, and returns the plan of 
+		every leg, i.e. the path from the previous point to each of them. The legs are planned together
+		on the occupancy grid, and the ones in the cache are not searched again. The plan of every leg 
+		is sent as feedback, in order.
+		
+		Args:
+			self: instance of the current class.
+			goal: are the current point and the points to be reached.
+		
+		"""
+		self._requests.record()
+		# Check if the points are correct. If not, this service will be aborted.
+		if goal.current is None or len(goal.targets) == 0:
+			log_msg = 'Cannot have `None` start point nor no target points. This service will be aborted!.'
+			rospy.logerr(anm.tag_log(log_msg, LOG_TAG))
+			self._patrol_as.set_aborted()
+			return
+		points = [goal.current] + list(goal.targets)
+		invalid = [point for point in points if not self._is_valid(point)]
+		if len(invalid) > 0:
+			log_msg = f'Point ({invalid[0].x}, {invalid[0].y}) out of the environment. This service will be aborted!.'
+			rospy.logerr(anm.tag_log(log_msg, LOG_TAG))
+			self._patrol_as.set_aborted()
+			return
+
+		# Search the legs on the occupancy grid, or go straight to the targets if the map is not known yet
+		with self._lock:
+			planner = self._load_map()
+			start = time.perf_counter()
+			if planner is None:
+				log_msg = 'The map is not known yet, planning straight paths.'
+				rospy.logwarn(anm.tag_log(log_msg, LOG_TAG))
+				paths = [[(first.x, first.y), (last.x, last.y)] for first, last in zip(points[:-1], points[1:])]
+				known = {}
+			else:
+				keys = [(planner.cell(first.x, first.y), planner.cell(last.x, last.y)) for first, last in zip(points[:-1], points[1:])]
+				known = {}
+				for i, key in enumerate(keys):
+					path = self._cache.lookup(key)
+					if path is not None:
+						known[i] = path
+				paths = planner.plan_legs([(point.x, point.y) for point in points], known)
+				for i, path in enumerate(paths):
+					if i not in known and path is not None:
+						self._cache.store(keys[i], path)
+			expanded = planner.expanded if planner is not None else 0
+		if self._patrol_as.is_preempt_requested():
+			rospy.loginfo(anm.tag_log('Server has been cancelled by the client!', LOG_TAG))
+			self._patrol_as.set_preempted()
+			return
+		if None in paths:
+			last = points[paths.index(None) + 1]
+			log_msg = f'There is no path to ({last.x}, {last.y}). This service will be aborted!.'
+			rospy.logerr(anm.tag_log(log_msg, LOG_TAG))
+			self._patrol_as.set_aborted()
+			return
+		log_msg = (f'Server planned {len(paths)} legs ({len(known)} in the cache) in {(time.perf_counter() - start) * 1000.0:.1f} ms, '
+					f'expanding {expanded} cells')
+		rospy.loginfo(anm.tag_log(log_msg, LOG_TAG))
+
+		# Send every leg as feedback and all of them as result. The first and the last points of every 
+		# leg are the ones given by the client
+		result = PatrolPlanResult()
+		for i, path in enumerate(paths):
+			leg = PlanLeg()
+			leg.via_points = [points[i]] + [Point(x=x, y=y) for x, y in path[1:-1]] + [points[i + 1]]
+			result.legs.append(leg)
+			self._patrol_as.publish_feedback(PatrolPlanFeedback(leg=leg, leg_index=i))
+		self._patrol_as.set_succeeded(result)
+		log_msg = f'Patrol plan succeeded with {len(result.legs)} legs and {sum(len(leg.via_points) for leg in result.legs)} points'
+		rospy.loginfo(anm.tag_log(log_msg, LOG_TAG))
+
+
+	def _publish_feedback(self, feedback, delta, sent):
+		""" 
+		Method that publishes the points of the plan computed so far, or only the ones not sent yet 
+		if the delta feedback is requested, so that the bytes sent for a plan grow linearly with 
+		its length.
+		
+		Args:
+			self: instance of the current class.
+			feedback: it is the feedback with all the points computed so far.
+			delta: it is True if only the new points have to be published.
+			sent: it is the number of points already published.
+			
+		Returns:
+			sent: the number of points published so far.
+		
+		"""
+		if delta:
+			self._as.publish_feedback(PlanFeedback(via_points=feedback.via_points[sent:], first_index=sent))
+		else:
+			self._as.publish_feedback(feedback)
+		return len(feedback.via_points)
+
+
+	def _load_map(self):
+		""" 
+		Method that builds the occupancy grid from the doors of the locations, the first time they
+		are found on the parameter server and every time they change, dropping the cached paths. 
+		The parameter is searched in the parent namespaces too, since the map is shared by the robots 
+		of a fleet, and it is read from the local cache of rospy, which is updated by the master.
+		
+		Args:
+			self: instance of the current class.
+			
+		Returns:
+			planner: the instance of GridPlanner() of the map, None if the map is not known yet.
+		
+		"""
+		if self._map_param is None:
+			self._map_param = rospy.search_param(anm.PARAM_MAP_LOCATION_DOORS)
+			if self._map_param is None:
+				return None
+		location_doors = rospy.get_param_cached(self._map_param)
+		if location_doors is not self._location_doors:
+			start = time.perf_counter()
+			self._location_doors = location_doors
+			layout = MapLayout(location_doors, anm.ENVIRONMENT_SIZE, anm.CHARGE_LOCATION)
+			self._planner = GridPlanner(layout, self._resolution)
+			self._cache.clear()
+			log_msg = (f'Occupancy grid of {self._planner.width}x{self._planner.height} cells built in '
+						f'{(time.perf_counter() - start) * 1000.0:.1f} ms')
+			rospy.loginfo(anm.tag_log(log_msg, LOG_TAG))
+		return self._planner
+
+
+	def _publish_stats(self, event=None):
+		""" 
+		Method that publishes the statistics of the cache of the paths on the diagnostics topic.
+		
+		Args:
+			self: instance of the current class.
+			event: it is the event of the timer.
+		
+		"""
+		stats = self._cache.stats()
+		status = DiagnosticStatus(level=DiagnosticStatus.OK, name=f'{rospy.get_name()}: plan cache', hardware_id=rospy.get_name())
+		status.message = f'hit ratio {stats["hit_ratio"]:.2f}'
+		status.values = [KeyValue(key=key, value=str(value)) for key, value in stats.items()]
+		msg = DiagnosticArray(status=[status])
+		msg.header.stamp = rospy.Time.now()
+		self._diagnostics.publish(msg)
+
 	
 	def _is_valid(self, point):
 		""" 
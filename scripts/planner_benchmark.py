@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+"""
+.. module:: planner_benchmark
+	:platform: Unix
+	:synopsis: Python script to measure the latency of the planner with the resolution of the grid
+
+.. moduleauthor:: Francesco Ferrazzi <s5262829@studenti.unige.it>
+
+Benchmark that draws maps of growing size on occupancy grids of growing resolution, as the planner
+node does, and plans the paths between random pairs of locations. For every map and resolution it
+measures the time needed to build the grid and the p50, p99 and max latency of the plans, together
+with the number of cells expanded by A* and the number of via points after the smoothing. The cells
+get smaller than the given resolution along the rows or the columns when the map has too many
+locations to fit the grid. Neither ROS nor ARMOR are needed. Run it with
+`rosrun exprob_assignment1 planner_benchmark.py`, or with `PYTHONPATH=utilities python3 scripts/planner_benchmark.py`
+from the root of the package. The results can also be saved in a JSON file.
+"""
+
+import argparse
+import json
+import random
+import time
+
+from exprob_assignment1.grid_planner import MapLayout, GridPlanner
+from exprob_assignment1.map_generator import TOPOLOGIES, generate_map, minimum_doors
+
+# Define the size of the environment, as in the architecture_name_mapper
+ENVIRONMENT_SIZE = [20, 15]
+# Define the default number of locations of the maps and size of the cells, in meters
+SIZES = [7, 70, 700]
+RESOLUTIONS = [0.4, 0.2, 0.1, 0.05]
+# Define how many rooms there are for every corridor
+ROOMS_PER_CORRIDOR = 3
+
+
+
+def percentile(values, q):
+	"""
+	Function that computes a percentile with the nearest rank method.
+
+	Args:
+		values: list of values.
+		q: it is the percentile, between 0 and 1.
+
+	Returns:
+		value: the percentile.
+
+	"""
+	ordered = sorted(values)
+	return ordered[min(len(ordered) - 1, max(0, int(q * len(ordered) + 0.5) - 1))]
+
+
+
+def run(number_locations, topology, resolution, plans, seed):
+	"""
+	Function that measures the build time of the grid and the latency of the plans for a single map.
+
+	Args:
+		number_locations: it is the number of locations of the map.
+		topology: it is the way in which the corridors are connected.
+		resolution: it is the size of the cells, in meters.
+		plans: it is the number of planned paths.
+		seed: it is the seed of the random generator.
+
+	Returns:
+		result: dictionary with the size of the map and of the grid and the measured times, in milliseconds.
+
+	"""
+	rng = random.Random(seed)
+	number_corridors = max(1, number_locations // (ROOMS_PER_CORRIDOR + 1))
+	number_rooms = number_locations - number_corridors
+	number_doors = minimum_doors(number_rooms, number_corridors, topology)
+	rooms, corridors, doors, location_doors = generate_map(number_rooms, number_corridors, number_doors, topology, 'E', rng)
+	start = time.perf_counter()
+	layout = MapLayout(location_doors, ENVIRONMENT_SIZE, 'E')
+	planner = GridPlanner(layout, resolution)
+	build_time = time.perf_counter() - start
+	locations = rooms + corridors
+	latencies = []
+	expanded = 0
+	via_points = 0
+	for _ in range(0, plans):
+		first, last = rng.sample(locations, 2)
+		start = time.perf_counter()
+		path = planner.plan(layout.centre(first), layout.centre(last))
+		latencies.append(time.perf_counter() - start)
+		if path is None:
+			raise RuntimeError(f'No path from {first} to {last} in the {topology} map with {number_locations} locations')
+		expanded += planner.expanded
+		via_points += len(path)
+	return {'locations': number_locations,
+		'topology': topology,
+		'resolution': resolution,
+		'cells': [planner.width, planner.height],
+		'build_ms': build_time * 1000.0,
+		'p50_ms': percentile(latencies, 0.5) * 1000.0,
+		'p99_ms': percentile(latencies, 0.99) * 1000.0,
+		'max_ms': max(latencies) * 1000.0,
+		'expanded': expanded / plans,
+		'via_points': via_points / plans}
+
+
+
+def main():
+	"""
+	Function that parses the command line, runs the benchmark and prints the results.
+
+	"""
+	parser = argparse.ArgumentParser(description='Measure the latency of the planner with the resolution of the grid.')
+	parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help='number of locations of the maps')
+	parser.add_argument('--resolutions', type=float, nargs='+', default=RESOLUTIONS, help='size of the cells, in meters')
+	parser.add_argument('--topology', default='ring', choices=TOPOLOGIES, help='topology of the maps')
+	parser.add_argument('--plans', type=int, default=20, help='number of planned paths for every grid')
+	parser.add_argument('--seed', type=int, default=0, help='seed of the random generator')
+	parser.add_argument('--output', help='path of the JSON file in which the results are saved')
+	args = parser.parse_args()
+	results = []
+	print(f'{"locations":>10} {"resolution":>10} {"cells":>11} {"build [ms]":>11} {"p50 [ms]":>10} {"p99 [ms]":>10} {"max [ms]":>10} {"expanded":>10} {"points":>7}')
+	for number_locations in args.sizes:
+		for resolution in args.resolutions:
+			result = run(number_locations, args.topology, resolution, args.plans, args.seed)
+			results.append(result)
+			cells = f'{result["cells"][0]}x{result["cells"][1]}'
+			print(f'{number_locations:>10} {resolution:>10.3f} {cells:>11} {result["build_ms"]:>11.2f} {result["p50_ms"]:>10.2f} '
+				f'{result["p99_ms"]:>10.2f} {result["max_ms"]:>10.2f} {result["expanded"]:>10.0f} {result["via_points"]:>7.1f}', flush=True)
+	if args.output:
+		with open(args.output, 'w') as output_file:
+			json.dump(results, output_file, indent=2)
+
+
+if __name__ == '__main__':
+	main()
@@ -18,6 +18,7 @@ The service is blocking and after the battery is charged, the response is sent t
 
 Publishes to:
 	/state/battery_low the battery level of the robot
+	/state/battery_low_stamp the time in which the battery got low
 	
 Service:
 	/state/recharge to charge the robot
@@ -33,8 +34,9 @@ import time
 from exprob_assignment1 import architecture_name_mapper as anm
 
 # Import the messages used by services and publishers.
-from std_msgs.msg import Bool
+from std_msgs.msg import Bool, Header
 from std_srvs.srv import SetBool, SetBoolResponse
+from exprob_assignment1.state_metrics import RequestRate
 
 # A tag for identifying logs producer.
 LOG_TAG = anm.NODE_ROBOT_BATTERY_STATE
@@ -64,6 +66,12 @@ class RobotBatteryState:
 		log_msg = (f'Random-based battery charged notification: the battery will be charged (i.e., low to high) with a '
 			   f'delay in the range of [{self._random_battery_charge[0]}, {self._random_battery_charge[1]}) seconds.')
 		rospy.loginfo(anm.tag_log(log_msg, LOG_TAG))
+		# Count the requests, and publish their rate in the benchmark mode
+		self._benchmark = rospy.get_param(anm.PARAM_BENCHMARK_MODE, False)
+		self._requests = RequestRate(anm.NODE_ROBOT_BATTERY_STATE)
+		if self._benchmark:
+			self._requests.start_benchmark()
+			rospy.loginfo(anm.tag_log('Benchmark mode: the battery is charged without delay.', LOG_TAG))
 		# Initialize and define the service to recharge the state of the battery
 		rospy.Service(anm.TOPIC_RECHARGE, SetBool, self._battery_charger)
 		# Initialise randomness, if enabled.
@@ -92,6 +100,7 @@ class RobotBatteryState:
 		"""
 		# Define a `lathed` publisher to wait for initialisation and publish immediately.
 		publisher = rospy.Publisher(anm.TOPIC_BATTERY_LOW, Bool, queue_size=1, latch=True)
+		self._stamp_publisher = rospy.Publisher(anm.TOPIC_BATTERY_LOW_STAMP, Header, queue_size=1, latch=True)
 		if self._randomness:
 			# Publish battery level changes randomly.
 			self._random_battery_notifier(publisher)
@@ -105,7 +114,8 @@ class RobotBatteryState:
 		Service used to recharge the battery of the robot. Once the client gives a request to the 
 		server, the server waste time to simulate the charging action for the robot's battery, which
 		stays between (self._random_battery_charge[0], self._random_battery_charge[1]). After this 
-		time has elapsed, the server sets the battery to high and returns a response. 
+		time has elapsed, the server sets the battery to high and returns a response. In the benchmark
+		mode the battery is charged without delay.
 		
 		Args:
 			self: instance of the current class.
@@ -115,13 +125,16 @@ class RobotBatteryState:
 			response: is the boolean value used to state that the cahrging task ended.
 		
 		"""
+		self._requests.record()
 		response = SetBoolResponse()  # initialize the service response
 		if request.data == True:
 			log_msg = f'The battery of the robot is low... Robot RECHARGING'
 			rospy.loginfo(anm.tag_log(log_msg, LOG_TAG))
 			# Wait for simulate the battery charge
-			delay_charge = random.uniform(self._random_battery_charge[0], self._random_battery_charge[1])
-			rospy.sleep(delay_charge)
+			delay_charge = 0.0
+			if not self._benchmark:
+				delay_charge = random.uniform(self._random_battery_charge[0], self._random_battery_charge[1])
+				rospy.sleep(delay_charge)
 			log_msg = f'The battery of the robot was fully charged in {delay_charge} seconds'
 			rospy.loginfo(anm.tag_log(log_msg, LOG_TAG))
 			self._battery_low = False   
@@ -151,7 +164,7 @@ class RobotBatteryState:
 				rospy.sleep(delay)
 				# Set the battery to low and publish it
 				self._battery_low = True
-				publisher.publish(Bool(self._battery_low))
+				self._publish(publisher)
 				log_msg = f'Robot got low battery after {delay} seconds.'
 				self._print_info(log_msg)
 			
@@ -188,9 +201,24 @@ class RobotBatteryState:
 				error = True
 			# Publish the massage based on the entered command.
 			if not error:
-				publisher.publish(Bool(self._battery_low))
+				self._publish(publisher)
 
 	
+	def _publish(self, publisher):
+		""" 
+		Method that publishes the state of the battery. When the battery is low, the time of the 
+		publish is sent just before, so that the state machine can measure how long it takes to react.
+		
+		Args:
+			self: instance of the current class.
+			publisher: is the boolean value used to state the power level of the battery.
+		
+		"""
+		if self._battery_low:
+			self._stamp_publisher.publish(Header(stamp=rospy.Time.now()))
+		publisher.publish(Bool(self._battery_low))
+		
+	
 	def _print_info(self, msg):
 		""" 
 		Method which prints log informations only when the random testing is active.
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+"""
+.. module:: sim_clock
+	:platform: Unix
+	:synopsis: Python module for the simulated clock of the architecture
+
+.. moduleauthor:: Francesco Ferrazzi <s5262829@studenti.unige.it>
+
+ROS node which publishes a simulated time on the /clock topic, so that the whole architecture can
+run faster than the wall clock when the `/use_sim_time` parameter is `True`. Every node waits with
+`rospy.sleep()`, `rospy.Timer` or the timeouts of actionlib, which follow the simulated time, hence
+the delays of the planner and of the controller, the drain and the charge of the battery and the
+urgency threshold of the locations are all scaled by the same factor.
+The simulated time starts from the current wall time and advances in steps of `sim/step` seconds,
+`sim/speed` times faster than the wall clock, or as fast as possible if the speed is not positive.
+
+Publishes to:
+	/clock the simulated time
+"""
+
+import time
+import rospy
+# Import constant name defined to structure the architecture.
+from exprob_assignment1 import architecture_name_mapper as anm
+# Import the message of the clock.
+from rosgraph_msgs.msg import Clock
+
+# A tag for identifying logs producer.
+LOG_TAG = anm.NODE_SIM_CLOCK
+
+
+
+def main():
+	"""
+	Function that initializes the node and publishes the simulated time until the node is shut down.
+	The wall clock is used to pace the steps, since the node is the source of the simulated time.
+
+	"""
+	rospy.init_node(anm.NODE_SIM_CLOCK, log_level=rospy.INFO)
+	speed = rospy.get_param(anm.PARAM_SIM_SPEED, 10.0)
+	step = rospy.get_param(anm.PARAM_SIM_STEP, 0.01)
+	publisher = rospy.Publisher('/clock', Clock, queue_size=1)
+	start = time.time()
+	now = start
+	if speed > 0:
+		log_msg = f'Publishing the simulated time {speed} times faster than the wall clock, in steps of {step} seconds.'
+	else:
+		log_msg = f'Publishing the simulated time as fast as possible, in steps of {step} seconds.'
+	rospy.loginfo(anm.tag_log(log_msg, LOG_TAG))
+	while not rospy.is_shutdown():
+		publisher.publish(Clock(rospy.Time.from_sec(now)))
+		now += step
+		if speed > 0:
+			# Wait until the wall clock reaches the next step, without accumulating the delays
+			delay = start + (now - start) / speed - time.time()
+			if delay > 0:
+				time.sleep(delay)
+
+
+if __name__ == '__main__':
+	main()
@@ -25,8 +25,10 @@ the final state machine called final_state_machine.py..
 """
 
 # Import libraries
+import os
 import roslib
 import rospy
+import rospkg
 import smach
 import smach_ros
 import time
@@ -36,7 +38,12 @@ from std_msgs.msg import String, Float64, Bool, Float32
 # Import the class that decouples the interface of the Finite State Machine with
 # the other  nodes of the architecture from the actual implementation of the
 # Finite State Machine, which is available in this file.
-from exprob_assignment1.state_machine_helper import Helper
+from exprob_assignment1.state_machine_helper import Helper, Fleet, TBOX_ROBOT, set_ontology_metrics
+# Import the metrics of the states.
+from exprob_assignment1.state_metrics import StateMetrics
+# Import the asyncio variant of the helper, used by the states written as coroutines.
+from exprob_assignment1.async_helper import AsyncHelper, AsyncState
+from actionlib_msgs.msg import GoalStatus
 
 # Import constant name defined to structure the architecture.
 from exprob_assignment1 import architecture_name_mapper as anm
@@ -55,7 +62,7 @@ STATE_SURVEILLANCE = 'SURVEILLANCE'  # State that checks the location in which t
 TRANS_BATTERY_LOW = 'battery_low'      # The transition from the inner Finite State Machine associated with the `REASONER`, 'PLANNER' and `CONTRLLER` states toward the `REACHCHARGE` state.
 TRANS_BATTERY_OK = 'battery_ok'        # The transition from the `CHARGE` state to the inner Finite State Machine associated with the `REASONER` state.
 TRANS_CHECK_LOC = 'check_loc'          # The transition from the `CONTROLLER` state to the `SURVEILLANCE` state.
-TRANS_INFO_DONE = 'info_done'          # The transition from the `REASONER` state to the `PLANNER` state.
+TRANS_INFO_DONE = 'info_done'          # The transition from the `REASONER` state (or the asyncio `CONTROLLER` state, if planning again fails) to the `PLANNER` state.
 TRANS_PLAN_OK = 'plan_ok'              # The transition from the `PLANNER` state to the 'CONTROLLER' state.
 TRANS_WORLD_DONE = 'world_done'        # The transition from the `BUILDWORLD` state with to the 'REASONER' state.
 TRANS_CHARGE_ON = 'charge_on'          # The transition from the 'REACHCHARGE' state toward the `CAHRGE` state.
@@ -103,12 +110,15 @@ class BuildWorld(smach.State):
 		rospy.loginfo(anm.tag_log(log_msg, LOG_TAG)) 
 		self._helper.build_environment()     
 		while not rospy.is_shutdown():
+			count = self._helper.event_count()
 			self._helper.mutex.acquire()
 			try:
 				if self._helper.world_done():
 					return TRANS_WORLD_DONE
 			finally:
-					self._helper.mutex.release()
+				self._helper.mutex.release()
+			# Sleep until a callback signals an event, instead of spinning
+			self._helper.wait_event(count)
 					
 
 					
@@ -147,12 +157,15 @@ class Charge(smach.State):
 		rospy.loginfo('\n\n############ Executing state CHARGE ############\n')
 		self._helper.recharge_srv()
 		while not rospy.is_shutdown():
+			count = self._helper.event_count()
 			self._helper.mutex.acquire()
 			try:
 				if not self._helper.ret_battery_low():
 					return TRANS_BATTERY_OK
 			finally:
-				self._helper.mutex.release()			
+				self._helper.mutex.release()
+			# Sleep until a callback signals an event, instead of spinning
+			self._helper.wait_event(count)
 
 			
 
@@ -192,12 +205,15 @@ class ReachCharge(smach.State):
 		rospy.loginfo('\n\n############ Executing state REACH CHARGE ############\n')
 		self._helper.go_to_charge()
 		while not rospy.is_shutdown():
+			count = self._helper.event_count()
 			self._helper.mutex.acquire()
 			try:
 				if self._helper.charge_ready():
 					return TRANS_CHARGE_ON
 			finally:
 				self._helper.mutex.release()
+			# Sleep until a callback signals an event, instead of spinning
+			self._helper.wait_event(count)
 		
 
 
@@ -242,6 +258,7 @@ class Reasoner(smach.State):
 		log_msg = f'The next location that will be reached is: {goal_location}\n\n'
 		rospy.loginfo(anm.tag_log(log_msg, LOG_TAG))
 		while not rospy.is_shutdown():
+			count = self._helper.event_count()
 			self._helper.mutex.acquire()
 			try:
 				if self._helper.ret_battery_low():
@@ -250,7 +267,9 @@ class Reasoner(smach.State):
 				if self._helper.reason_done():
 					return TRANS_INFO_DONE
 			finally:
-				self._helper.mutex.release()        		
+				self._helper.mutex.release()
+			# Sleep until a callback signals an event, instead of spinning
+			self._helper.wait_event(count)
 
 
 
@@ -295,6 +314,7 @@ class Planner(smach.State):
 		rospy.loginfo(anm.tag_log(log_msg, LOG_TAG))
 		self._helper.planner()
 		while not rospy.is_shutdown():
+			count = self._helper.event_count()
 			self._helper.mutex.acquire()
 			try:
 				self._helper.check_planner()
@@ -305,6 +325,8 @@ class Planner(smach.State):
 					return TRANS_PLAN_OK
 			finally:
 				self._helper.mutex.release()
+			# Sleep until a callback signals an event, instead of spinning
+			self._helper.wait_event(count)
 
 			
 			
@@ -350,6 +372,7 @@ class Controller(smach.State):
 		rospy.loginfo(anm.tag_log(log_msg, LOG_TAG))
 		self._helper.controller()
 		while not rospy.is_shutdown():
+			count = self._helper.event_count()
 			self._helper.mutex.acquire()
 			try:
 				self._helper.check_controller()
@@ -360,6 +383,108 @@ class Controller(smach.State):
 					return TRANS_CHECK_LOC
 			finally:
 				self._helper.mutex.release()
+			# Sleep until a callback signals an event, instead of spinning
+			self._helper.wait_event(count)
+
+
+
+class AsyncPlanner(AsyncState):
+	""" 
+	Class that defines the state: PLANNER, written as a coroutine of the AsyncHelper.
+		
+
+	"""
+	def __init__(self, async_helper):
+		""" 
+		Function that initializes the state PLANNER.
+		
+		Args:
+			self: instance of the current class.
+			async_helper: instance of the class AsyncHelper() allocated in async_helper.py`
+
+		"""
+		AsyncState.__init__(self, async_helper, outcomes = [TRANS_BATTERY_LOW, TRANS_BATTERY_OK, TRANS_CHECK_LOC, TRANS_INFO_DONE, TRANS_PLAN_OK, TRANS_WORLD_DONE, TRANS_CHARGE_ON, TRANS_CHECK_DONE])
+			
+	async def execute_async(self, userdata):
+		""" 
+		Coroutine which is executed before exiting the state PLANNER. It has the same behavior of
+		the Planner state, but the plan is awaited together with the battery low event, so the goal
+		is cancelled as soon as the battery gets low. If the planner fails, a new plan is requested.
+		
+		Args:
+			self: instance of the current class.
+			userdata: shared variable between the states of the Final State Machine
+
+		Returns:
+			TRANS_BATTERY_LOW: is the transition to go from the PLANNER state to the REACHCHARGE state.
+			TRANS_PLAN_OK: is the transition to go from the PLANNER state to the CONTROLLER state.
+		
+		"""
+		log_msg = f'\n\n############ Executing state PLANNER ############\n'
+		rospy.loginfo(anm.tag_log(log_msg, LOG_TAG))
+		while not rospy.is_shutdown():
+			low, state = await self._async.until_battery_low(self._async.plan())
+			if low:
+				return TRANS_BATTERY_LOW
+			if state == GoalStatus.SUCCEEDED:
+				return TRANS_PLAN_OK
+			log_msg = f'The PLANNER failed with state {state}, planning again'
+			rospy.logwarn(anm.tag_log(log_msg, LOG_TAG))
+
+
+
+class AsyncController(AsyncState):
+	""" 
+	Class that defines the state: CONTROLLER, written as a coroutine of the AsyncHelper.
+		
+
+	"""
+	def __init__(self, async_helper):
+		""" 
+		Method that initializes the state CONTROLLER.
+		
+		Args:
+			self: instance of the current class.
+			async_helper: instance of the class AsyncHelper() allocated in async_helper.py`
+
+		"""
+		AsyncState.__init__(self, async_helper, outcomes = [TRANS_BATTERY_LOW, TRANS_BATTERY_OK, TRANS_CHECK_LOC, TRANS_INFO_DONE, TRANS_PLAN_OK, TRANS_WORLD_DONE, TRANS_CHARGE_ON, TRANS_CHECK_DONE])
+		
+	async def execute_async(self, userdata):
+		""" 
+		Coroutine which is executed before exiting the state CONTROLLER. It has the same behavior of
+		the Controller state, but the motion is awaited together with the battery low event, so the 
+		goal is cancelled as soon as the battery gets low. If the controller fails, a new plan is 
+		requested from the last reached point and followed. If that plan fails too, the PLANNER state
+		plans again, instead of following the via points of the failed plan.
+		
+		Args:
+			self: instance of the current class.
+			userdata: shared variable between the states of the Final State Machine
+
+		Returns:
+			TRANS_BATTERY_LOW: is the transition to go from the CONTROLLER state to the REACHCHARGE state.
+			TRANS_CHECK_LOC: is the transition to go from the CONTROLLER state to the SURVEILLANCE state.
+			TRANS_INFO_DONE: is the transition to go from the CONTROLLER state to the PLANNER state.
+			
+		"""
+		log_msg = f'\n\n############ Executing state CONTROLLER ############\n'
+		rospy.loginfo(anm.tag_log(log_msg, LOG_TAG))
+		while not rospy.is_shutdown():
+			low, state = await self._async.until_battery_low(self._async.control())
+			if low:
+				return TRANS_BATTERY_LOW
+			if state == GoalStatus.SUCCEEDED:
+				return TRANS_CHECK_LOC
+			log_msg = f'The CONTROLLER failed with state {state}, planning again'
+			rospy.logwarn(anm.tag_log(log_msg, LOG_TAG))
+			low, state = await self._async.until_battery_low(self._async.plan())
+			if low:
+				return TRANS_BATTERY_LOW
+			if state != GoalStatus.SUCCEEDED:
+				log_msg = f'The PLANNER failed with state {state}, going back to the PLANNER'
+				rospy.logwarn(anm.tag_log(log_msg, LOG_TAG))
+				return TRANS_INFO_DONE
 
 
 
@@ -402,6 +527,7 @@ class Surveillance(smach.State):
 		rospy.loginfo(anm.tag_log(log_msg, LOG_TAG))
 		self._helper.do_surveillance()
 		while not rospy.is_shutdown():
+			count = self._helper.event_count()
 			self._helper.mutex.acquire()
 			try:
 				if self._helper.ret_battery_low():
@@ -411,20 +537,40 @@ class Surveillance(smach.State):
 					return TRANS_CHECK_DONE
 			finally:
 				self._helper.mutex.release()
+			# Sleep until a callback signals an event, instead of spinning
+			self._helper.wait_event(count)
 
 
 			
-def main():
+def robot_state_machine(helper, metrics=None):
 	"""
-	This method initializes the Final State Machine of the node state_machine.py using the SMACH
-	modules. Some documentation can be found online at the following link: `smach <http://wiki.ros.org/smach/>`_.
-    	Every state of the node relies on the node state_machine_helper.py, in fact, an instance of the
-    	Helper() situated on the node state_machine_helper.py is passed to every state of the FSM.
-    	
-    	"""
-	rospy.init_node(anm.NODE_STATE_MACHINE, log_level=rospy.INFO)
+	This method creates the Final State Machine of a single robot, whose states rely on the given
+	instance of the Helper() situated on the node state_machine_helper.py.
 	
-	helper = Helper()
+	Args:
+		helper: instance of the class Helper() allocated in state_machine_helper.py`
+		metrics: instance of the class StateMetrics() which records the metrics of the states, if any.
+	
+	Returns:
+		sm: the SMACH state machine of the robot.
+	
+	"""
+	def instrument(label, state):
+		# Record the metrics of the state, per robot if there are many of them
+		if metrics is None:
+			return state
+		if len(helper.fleet.robots) > 1:
+			label = f'{helper.robot}/{label}'
+		return metrics.instrument(label, state)
+	
+	# Select the states written as coroutines of the asyncio helper for the planner and the controller
+	if rospy.get_param(anm.PARAM_ASYNC_STATES, False):
+		async_helper = AsyncHelper(helper)
+		planner_state = AsyncPlanner(async_helper)
+		controller_state = AsyncController(async_helper)
+	else:
+		planner_state = Planner(helper)
+		controller_state = Controller(helper)
 	
 	# Create a SMACH state machine
 	sm = smach.StateMachine(outcomes=['container_interface'])
@@ -433,7 +579,7 @@ def main():
 	# Open the container
 	with sm:
 		# Add states to the container
-		smach.StateMachine.add(STATE_BUILD_WORLD, BuildWorld(helper),
+		smach.StateMachine.add(STATE_BUILD_WORLD, instrument(STATE_BUILD_WORLD, BuildWorld(helper)),
 							transitions={TRANS_BATTERY_LOW:STATE_BUILD_WORLD,
 								     TRANS_CHARGE_ON:STATE_BUILD_WORLD, 
 								     TRANS_BATTERY_OK:STATE_BUILD_WORLD,
@@ -443,7 +589,7 @@ def main():
 								     TRANS_WORLD_DONE:STATE_REASONER,
 								     TRANS_CHECK_DONE:STATE_BUILD_WORLD})
 																										
-		smach.StateMachine.add(STATE_CHARGE, Charge(helper), 
+		smach.StateMachine.add(STATE_CHARGE, instrument(STATE_CHARGE, Charge(helper)), 
 							transitions={TRANS_BATTERY_LOW:STATE_CHARGE,
 								     TRANS_CHARGE_ON:STATE_CHARGE,
 								     TRANS_BATTERY_OK:STATE_REASONER,
@@ -453,7 +599,7 @@ def main():
 								     TRANS_WORLD_DONE:STATE_CHARGE,
 								     TRANS_CHECK_DONE:STATE_CHARGE})
 													
-		smach.StateMachine.add(STATE_REASONER, Reasoner(helper), 
+		smach.StateMachine.add(STATE_REASONER, instrument(STATE_REASONER, Reasoner(helper)), 
 							transitions={TRANS_BATTERY_LOW:STATE_REACH_CHARGE,
 								     TRANS_CHARGE_ON:STATE_REASONER, 
 								     TRANS_BATTERY_OK:STATE_REASONER,
@@ -463,7 +609,7 @@ def main():
 								     TRANS_WORLD_DONE:STATE_REASONER,
 								     TRANS_CHECK_DONE:STATE_REASONER})
 													
-		smach.StateMachine.add(STATE_PLANNER, Planner(helper), 
+		smach.StateMachine.add(STATE_PLANNER, instrument(STATE_PLANNER, planner_state), 
 							transitions={TRANS_BATTERY_LOW:STATE_REACH_CHARGE, 
 								     TRANS_CHARGE_ON:STATE_PLANNER,
 							             TRANS_BATTERY_OK:STATE_PLANNER,
@@ -473,17 +619,17 @@ def main():
 								     TRANS_WORLD_DONE:STATE_PLANNER,
 								     TRANS_CHECK_DONE:STATE_PLANNER})
 													
-		smach.StateMachine.add(STATE_CONTROLLER, Controller(helper), 
+		smach.StateMachine.add(STATE_CONTROLLER, instrument(STATE_CONTROLLER, controller_state), 
 							transitions={TRANS_BATTERY_LOW:STATE_REACH_CHARGE, 
 								     TRANS_CHARGE_ON:STATE_CONTROLLER,
 								     TRANS_BATTERY_OK:STATE_CONTROLLER,
 								     TRANS_CHECK_LOC:STATE_SURVEILLANCE,
-								     TRANS_INFO_DONE:STATE_CONTROLLER,
+								     TRANS_INFO_DONE:STATE_PLANNER,
 								     TRANS_PLAN_OK:STATE_CONTROLLER,
 								     TRANS_WORLD_DONE:STATE_CONTROLLER,
 								     TRANS_CHECK_DONE:STATE_CONTROLLER})
 													
-		smach.StateMachine.add(STATE_REACH_CHARGE, ReachCharge(helper), 
+		smach.StateMachine.add(STATE_REACH_CHARGE, instrument(STATE_REACH_CHARGE, ReachCharge(helper)), 
 							transitions={TRANS_BATTERY_LOW:STATE_REACH_CHARGE, 
 								     TRANS_CHARGE_ON:STATE_CHARGE,
 								     TRANS_BATTERY_OK:STATE_REACH_CHARGE,
@@ -493,7 +639,7 @@ def main():
 								     TRANS_WORLD_DONE:STATE_REACH_CHARGE,
 								     TRANS_CHECK_DONE:STATE_REACH_CHARGE})
 										
-		smach.StateMachine.add(STATE_SURVEILLANCE, Surveillance(helper), 
+		smach.StateMachine.add(STATE_SURVEILLANCE, instrument(STATE_SURVEILLANCE, Surveillance(helper)), 
 							transitions={TRANS_BATTERY_LOW:STATE_REACH_CHARGE, 
 								     TRANS_CHARGE_ON:STATE_SURVEILLANCE,
 								     TRANS_BATTERY_OK:STATE_SURVEILLANCE,
@@ -502,6 +648,40 @@ def main():
 								     TRANS_PLAN_OK:STATE_SURVEILLANCE,
 								     TRANS_WORLD_DONE:STATE_SURVEILLANCE,
 								     TRANS_CHECK_DONE:STATE_REASONER})
+	return sm
+
+
+def main():
+	"""
+	This method initializes the Final State Machine of the node state_machine.py using the SMACH
+	modules. Some documentation can be found online at the following link: `smach <http://wiki.ros.org/smach/>`_.
+    	Every state of the node relies on the node state_machine_helper.py, in fact, an instance of the
+    	Helper() situated on the node state_machine_helper.py is passed to every state of the FSM.
+    	If many robots are given, the state machines of the robots run concurrently, one for every robot,
+    	sharing the map and the connection to the ontology.
+    	
+    	"""
+	rospy.init_node(anm.NODE_STATE_MACHINE, log_level=rospy.INFO)
+	
+	# Record the timing and the transitions of the states, and the calls they do to the ontology
+	metrics = None
+	if rospy.get_param(anm.PARAM_STATE_METRICS, True):
+		metrics = StateMetrics(anm.NODE_STATE_MACHINE)
+		set_ontology_metrics(metrics)
+		metrics.start()
+		metrics_file = rospy.get_param(anm.PARAM_STATE_METRICS_FILE, os.path.join(rospkg.get_ros_home(), 'state_metrics.json'))
+		rospy.on_shutdown(lambda: metrics.dump(metrics_file))
+	
+	robots = rospy.get_param(anm.PARAM_ROBOTS, [TBOX_ROBOT])
+	fleet = Fleet(robots)
+	if len(robots) == 1:
+		sm = robot_state_machine(Helper(robots[0], fleet), metrics)
+	else:
+		# Run the state machine of every robot in its own thread
+		sm = smach.Concurrence(outcomes=['container_interface'], default_outcome='container_interface')
+		with sm:
+			for robot in robots:
+				smach.Concurrence.add(robot.upper(), robot_state_machine(Helper(robot, fleet), metrics))
 										  
 	# Create and start the introspection server for visualization
 	sis = smach_ros.IntrospectionServer('server_name', sm, '/SM_ROOT')
@@ -0,0 +1,13 @@
+"""
+Configuration of the tests. They are run with `python3 -m pytest test` from the root of the package.
+If the workspace is sourced, its package is used, since it also holds the generated messages; otherwise 
+the utilities are imported from the source tree, and the tests which need ROS are skipped.
+"""
+
+import os
+import sys
+
+try:
+	import exprob_assignment1
+except ImportError:
+	sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'utilities'))
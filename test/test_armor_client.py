@@ -0,0 +1,136 @@
+"""
+Tests of the client of the ARMOR service: the retries with a growing delay, the reconnections and the
+directives which cannot be executed twice. The service proxies of rospy are replaced by fake ones, so
+ARMOR is not needed, but rospy and the messages of ARMOR are.
+"""
+
+import pytest
+
+rospy = pytest.importorskip('rospy')
+pytest.importorskip('armor_msgs')
+
+from armor_msgs.srv import ArmorDirectiveResponse, ArmorDirectiveListResponse
+from armor_msgs.msg import ArmorDirectiveRes
+from exprob_assignment1 import armor_client
+from exprob_assignment1.armor_client import ArmorClient
+
+QUERY = ('QUERY', 'OBJECTPROP', 'IND', ['canReach', 'Robot1'])
+REPLACE = ('REPLACE', 'OBJECTPROP', 'IND', ['isIn', 'Robot1', 'R1', 'E'])
+
+
+
+class FakeProxy:
+	"""
+	Persistent service proxy which raises the given errors, one for every call, and then answers
+	with empty results.
+
+	"""
+	def __init__(self, errors, calls):
+		self.errors = errors
+		self.calls = calls
+		self.closed = False
+
+	def __call__(self, request):
+		self.calls.append(request)
+		if len(self.errors) > 0:
+			raise self.errors.pop(0)
+		if hasattr(request, 'armor_requests'):
+			return ArmorDirectiveListResponse(armor_responses=[ArmorDirectiveRes() for _ in request.armor_requests])
+		return ArmorDirectiveResponse(armor_response=ArmorDirectiveRes())
+
+	def close(self):
+		self.closed = True
+
+
+
+@pytest.fixture
+def service(monkeypatch):
+	"""
+	Fixture that replaces the proxies and the delays of rospy. It returns the proxies opened so far,
+	the requests received and the errors that the next calls raise.
+
+	"""
+	state = {'proxies': [], 'calls': [], 'errors': [], 'sleeps': []}
+	def proxy(name, service_class, persistent=False):
+		assert persistent
+		state['proxies'].append(FakeProxy(state['errors'], state['calls']))
+		return state['proxies'][-1]
+	monkeypatch.setattr(rospy, 'ServiceProxy', proxy)
+	monkeypatch.setattr(rospy, 'wait_for_service', lambda name, timeout=None: None)
+	monkeypatch.setattr(armor_client.time, 'sleep', state['sleeps'].append)
+	return state
+
+
+def test_connection_is_kept_between_calls(service):
+	"""A single proxy is opened for many calls."""
+	client = ArmorClient()
+	client.call_batch([QUERY])
+	client.call_batch([REPLACE, QUERY])
+	assert len(service['proxies']) == 1 and len(service['calls']) == 2
+	assert client.stats()['calls'] == 2 and client.reconnections == 0
+
+
+def test_transport_failure_is_retried_on_a_new_connection(service):
+	"""A broken connection is closed and opened again, and the query is sent again."""
+	client = ArmorClient(retry_delay=0.5)
+	client.call_batch([QUERY])
+	service['errors'].append(rospy.ServiceException('transport error completing service call: connection reset'))
+	client.call_batch([QUERY])
+	assert len(service['proxies']) == 2 and service['proxies'][0].closed
+	assert len(service['calls']) == 3
+	assert client.reconnections == 1
+	assert service['sleeps'] == [0.5]
+
+
+def test_failure_after_max_retries_raises(service):
+	"""The last error is raised when every attempt fails, doubling the delay between them."""
+	client = ArmorClient(max_retries=3, retry_delay=0.5)
+	service['errors'].extend(rospy.ServiceException(f'unable to connect to service: {i}') for i in range(4))
+	with pytest.raises(rospy.ServiceException, match='unable to connect to service: 3'):
+		client.call(*QUERY)
+	assert len(service['calls']) == 4
+	assert service['sleeps'] == [0.5, 1.0, 2.0]
+
+
+def test_sent_change_is_not_executed_twice(service):
+	"""A directive which changes the ontology is not retried if it may have been executed."""
+	client = ArmorClient()
+	client.call_batch([QUERY])
+	service['errors'].append(rospy.ServiceException('transport error completing service call: connection reset'))
+	with pytest.raises(rospy.ServiceException):
+		client.call_batch([REPLACE, QUERY])
+	assert len(service['calls']) == 2 and service['sleeps'] == []
+	# The connection is opened again by the next call
+	client.call_batch([QUERY])
+	assert len(service['proxies']) == 2 and client.reconnections == 1
+
+
+def test_unsent_change_is_retried(service):
+	"""A directive which changes the ontology is retried if the new connection could not be opened."""
+	client = ArmorClient()
+	service['errors'].append(rospy.ServiceException('service [/armor_interface_serialized_srv] unavailable'))
+	client.call_batch([REPLACE])
+	assert len(service['calls']) == 2 and len(service['sleeps']) == 1
+
+
+def test_unavailable_service_is_retried(service, monkeypatch):
+	"""A timeout while waiting for the service is retried, since nothing was sent."""
+	timeouts = [rospy.ROSException('timeout exceeded while waiting for service')]
+	def wait_for_service(name, timeout=None):
+		if len(timeouts) > 0:
+			raise timeouts.pop(0)
+	monkeypatch.setattr(rospy, 'wait_for_service', wait_for_service)
+	client = ArmorClient()
+	client.call(*REPLACE)
+	assert len(service['calls']) == 1 and len(service['sleeps']) == 1
+
+
+def test_close_drops_every_connection(service):
+	"""The proxies are closed, and opened again at the next call."""
+	client = ArmorClient()
+	client.call(*QUERY)
+	client.call_batch([QUERY])
+	client.close()
+	assert len(service['proxies']) == 2 and all(proxy.closed for proxy in service['proxies'])
+	client.call(*QUERY)
+	assert len(service['proxies']) == 3 and client.reconnections == 1
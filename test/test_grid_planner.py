@@ -0,0 +1,103 @@
+"""
+Tests of the layout of the locations and of the A* planner on the occupancy grid.
+"""
+
+import random
+
+import pytest
+
+from exprob_assignment1.grid_planner import MapLayout, GridPlanner
+from exprob_assignment1.map_generator import generate_map, minimum_doors
+
+ENVIRONMENT_SIZE = [20, 15]
+# The map of the assignment: four rooms, two corridors and the charging corridor
+DOORS = {'R1': ['D1'], 'R2': ['D2'], 'R3': ['D3'], 'R4': ['D4'], 'C1': ['D1', 'D2', 'D5', 'D7'],
+	'C2': ['D3', 'D4', 'D5', 'D6'], 'E': ['D6', 'D7']}
+
+
+
+def _check_path(planner, path, start, target):
+	"""
+	Function that checks that a path goes from the start to the target through free cells.
+
+	"""
+	assert path[0] == start and path[-1] == target
+	cells = [planner._nearest_free(planner.cell(*point)) for point in path]
+	for cell in cells:
+		assert not planner.occupied.flat[cell]
+	for first, last in zip(cells[:-1], cells[1:]):
+		assert planner._line_free(first, last)
+
+
+def test_layout_places_every_location():
+	"""Every location has its own tile inside the environment, and the children touch their parent."""
+	layout = MapLayout(DOORS, ENVIRONMENT_SIZE, 'E')
+	assert set(layout.tiles) == set(DOORS)
+	assert layout.tiles['E'][0] == 0
+	for location in DOORS:
+		x, y = layout.centre(location)
+		assert 0 < x < ENVIRONMENT_SIZE[0] and 0 < y < ENVIRONMENT_SIZE[1]
+
+
+def test_plan_between_every_pair_of_locations():
+	"""The paths between the centres of the locations only cross free cells and the doors."""
+	layout = MapLayout(DOORS, ENVIRONMENT_SIZE, 'E')
+	planner = GridPlanner(layout, 0.2)
+	for first in DOORS:
+		for last in DOORS:
+			start, target = layout.centre(first), layout.centre(last)
+			path = planner.plan(start, target)
+			assert path is not None, (first, last)
+			_check_path(planner, path, start, target)
+
+
+def test_plan_to_disconnected_location_is_none():
+	"""A location without doors in common with the others cannot be reached."""
+	doors = {'E': ['D1'], 'R1': ['D1'], 'R2': []}
+	layout = MapLayout(doors, ENVIRONMENT_SIZE, 'E')
+	planner = GridPlanner(layout, 0.2)
+	assert planner.plan(layout.centre('E'), layout.centre('R1')) is not None
+	assert planner.plan(layout.centre('E'), layout.centre('R2')) is None
+	assert planner.plan_legs([layout.centre('E'), layout.centre('R1'), layout.centre('R2')])[1] is None
+
+
+def test_point_on_a_wall_is_moved_to_a_free_cell():
+	"""The corner of the environment is a wall, the path starts from the closest free cell."""
+	layout = MapLayout(DOORS, ENVIRONMENT_SIZE, 'E')
+	planner = GridPlanner(layout, 0.2)
+	assert planner.occupied.flat[planner.cell(0.0, 0.0)]
+	path = planner.plan((0.0, 0.0), layout.centre('R3'))
+	assert path is not None and path[0] == (0.0, 0.0)
+
+
+def test_plan_legs_matches_single_plans():
+	"""The legs planned together are the same as the ones planned one by one, and the known ones are kept."""
+	layout = MapLayout(DOORS, ENVIRONMENT_SIZE, 'E')
+	planner = GridPlanner(layout, 0.2)
+	points = [layout.centre(location) for location in ['E', 'R1', 'R3', 'R1', 'R3', 'E']]
+	legs = planner.plan_legs(points)
+	assert legs == [planner.plan(first, last) for first, last in zip(points[:-1], points[1:])]
+	known = {0: [points[0], points[1]]}
+	assert planner.plan_legs(points, known)[0] is known[0]
+
+
+def test_cells_are_shrunk_to_fit_large_maps():
+	"""With more locations than cells, the cells get smaller so that every location is reachable."""
+	rng = random.Random(0)
+	rooms, corridors, doors, location_doors = generate_map(525, 175, minimum_doors(525, 175, 'ring'), 'ring', 'E', rng)
+	layout = MapLayout(location_doors, ENVIRONMENT_SIZE, 'E')
+	planner = GridPlanner(layout, 0.4)
+	assert planner.width >= 2 * layout.columns + 1 and planner.height >= 2 * layout.rows + 1
+	for location in rng.sample(rooms + corridors, 5):
+		start, target = layout.centre('E'), layout.centre(location)
+		path = planner.plan(start, target)
+		assert path is not None, location
+		_check_path(planner, path, start, target)
+
+
+@pytest.mark.parametrize('point', [(0.05, 0.05), (10.0, 7.5), (19.95, 14.95)])
+def test_cell_and_point_round_trip(point):
+	"""The centre of the cell of a point is in the same cell."""
+	planner = GridPlanner(MapLayout(DOORS, ENVIRONMENT_SIZE, 'E'), 0.1)
+	cell = planner.cell(*point)
+	assert planner.cell(*planner.point(cell)) == cell
@@ -0,0 +1,63 @@
+"""
+Tests of the generator of the maps: connectivity of every topology, number of doors and errors.
+"""
+
+import random
+
+import pytest
+
+from exprob_assignment1.map_generator import TOPOLOGIES, generate_map, minimum_doors, is_connected
+
+
+
+@pytest.mark.parametrize('topology', TOPOLOGIES)
+def test_large_maps_are_connected(topology):
+	"""Every location of a map with 10k locations can be reached from the charging corridor."""
+	number_rooms, number_corridors = 7500, 2500
+	number_doors = minimum_doors(number_rooms, number_corridors, topology) + 100
+	rooms, corridors, doors, location_doors = generate_map(number_rooms, number_corridors, number_doors, topology, 'E', random.Random(0))
+	assert len(rooms) == number_rooms and len(corridors) == number_corridors and len(doors) == number_doors
+	assert corridors[-1] == 'E'
+	assert is_connected(location_doors, 'E')
+
+
+@pytest.mark.parametrize('topology', TOPOLOGIES)
+def test_every_door_joins_two_locations(topology):
+	"""Every room has one door, and every door is shared by exactly two locations."""
+	rooms, corridors, doors, location_doors = generate_map(12, 5, minimum_doors(12, 5, topology) + 3, topology, 'E', random.Random(1))
+	for room in rooms:
+		assert len(location_doors[room]) == 1
+	sharing = {door: 0 for door in doors}
+	for loc_doors in location_doors.values():
+		for door in loc_doors:
+			sharing[door] += 1
+	assert set(sharing.values()) == {2}
+
+
+def test_same_seed_gives_same_map():
+	"""The map only depends on the random generator."""
+	assert generate_map(10, 4, 15, 'grid', 'E', random.Random(7)) == generate_map(10, 4, 15, 'grid', 'E', random.Random(7))
+
+
+def test_single_location_map():
+	"""A map can be made of the charging corridor alone, which reaches nothing."""
+	rooms, corridors, doors, location_doors = generate_map(0, 1, 0)
+	assert (rooms, corridors, doors, location_doors) == ([], ['E'], [], {'E': []})
+	assert is_connected(location_doors, 'E')
+
+
+def test_disconnected_map_is_detected():
+	"""A location without doors in common with the others cannot be reached."""
+	assert not is_connected({'E': ['D1'], 'R1': ['D1'], 'R2': ['D2']}, 'E')
+
+
+@pytest.mark.parametrize('arguments', [
+	(4, 3, 7, 'mesh'),   # unknown topology
+	(4, 0, 7, 'ring'),   # no charging corridor
+	(4, 3, 6, 'ring'),   # a door less than needed
+	(4, 1, 5, 'ring'),   # exceeding doors with a single corridor
+])
+def test_invalid_maps_raise(arguments):
+	"""The maps which cannot be built are reported with a ValueError."""
+	with pytest.raises(ValueError):
+		generate_map(*arguments, rng=random.Random(0))
@@ -0,0 +1,135 @@
+"""
+Tests of the cache of the ontology queries: the queries answered by the cache, and the entries dropped
+by the writes and by the following REASON.
+"""
+
+from exprob_assignment1.ontology_cache import OntologyCache
+
+CAN_REACH = ('QUERY', 'OBJECTPROP', 'IND', ['canReach', 'Robot1'])
+CAN_REACH_2 = ('QUERY', 'OBJECTPROP', 'IND', ['canReach', 'Robot2'])
+CONNECTED = ('QUERY', 'OBJECTPROP', 'IND', ['connectedTo', 'R1'])
+VISITED = ('QUERY', 'DATAPROP', 'IND', ['visitedAt', 'R1'])
+CLASS_R1 = ('QUERY', 'CLASS', 'IND', ['R1', 'false'])
+CLASS_R2 = ('QUERY', 'CLASS', 'IND', ['R2', 'false'])
+URGENT = ('QUERY', 'IND', 'CLASS', ['URGENT', 'false'])
+REASON = ('REASON', '', '', [])
+QUERIES = [CAN_REACH, CAN_REACH_2, CONNECTED, VISITED, CLASS_R1, CLASS_R2]
+
+
+
+def _cached(cache):
+	"""
+	Function that fills the cache with the answer of every query of QUERIES.
+
+	"""
+	cache.update_batch(QUERIES, [[f'result of {query[3][0]} {query[3][1]}'] for query in QUERIES])
+	return cache
+
+
+def _hits(cache):
+	"""
+	Function that returns the queries of QUERIES answered by the cache.
+
+	"""
+	return [query for query, result in zip(QUERIES, cache.lookup_batch(QUERIES)) if result is not None]
+
+
+def test_query_is_answered_by_the_cache():
+	"""A query already answered is not sent again, and a copy of the result is given."""
+	cache = OntologyCache()
+	assert cache.lookup_batch([CAN_REACH]) == [None]
+	cache.update_batch([CAN_REACH], [['R1', 'C1']])
+	result = cache.lookup_batch([CAN_REACH])[0]
+	assert result == ['R1', 'C1']
+	result.append('R2')
+	assert cache.lookup_batch([CAN_REACH])[0] == ['R1', 'C1']
+	assert cache.stats()['hits'] == 2 and cache.stats()['misses'] == 1
+
+
+def test_individuals_of_a_class_are_not_cached():
+	"""The query of the individuals of a class (e.g. URGENT) is always sent."""
+	cache = OntologyCache()
+	cache.update_batch([URGENT], [['R1']])
+	assert cache.lookup_batch([URGENT]) == [None]
+	assert cache.stats()['entries'] == 0
+
+
+def test_moving_the_robot_drops_its_reachable_locations():
+	"""A write of isIn drops what the robot can reach and its classes, not the ones of the others."""
+	cache = _cached(OntologyCache())
+	cache.update_batch([('REPLACE', 'OBJECTPROP', 'IND', ['isIn', 'Robot1', 'R1', 'E'])], [[]])
+	assert _hits(cache) == [CAN_REACH_2, CONNECTED, VISITED, CLASS_R1, CLASS_R2]
+
+
+def test_changing_the_doors_drops_the_connections():
+	"""A write of hasDoor drops every connection and reachable location, and the classes of the location."""
+	cache = _cached(OntologyCache())
+	cache.update_batch([('ADD', 'OBJECTPROP', 'IND', ['hasDoor', 'R1', 'D5'])], [[]])
+	assert _hits(cache) == [VISITED, CLASS_R2]
+
+
+def test_visiting_a_location_drops_its_classes():
+	"""A write of visitedAt drops the value and the classes of that location only."""
+	cache = _cached(OntologyCache())
+	cache.update_batch([('REMOVE', 'DATAPROP', 'IND', ['visitedAt', 'R1', 'Long', '1000'])], [[]])
+	assert _hits(cache) == [CAN_REACH, CAN_REACH_2, CONNECTED, CLASS_R2]
+
+
+def test_changing_the_time_drops_every_class():
+	"""A write of now drops the classes of every location, since any of them can become URGENT."""
+	cache = _cached(OntologyCache())
+	cache.update_batch([('REPLACE', 'DATAPROP', 'IND', ['now', 'Robot1', 'Long', '2000', '1000'])], [[]])
+	assert _hits(cache) == [CAN_REACH, CAN_REACH_2, CONNECTED, VISITED]
+
+
+def test_other_writes_drop_everything():
+	"""A write which is not of a property (e.g. LOAD or DISJOINT) drops every entry."""
+	for write in [('LOAD', 'FILE', '', ['abox.owl', 'http://bnc', 'true', 'PELLET', 'true']),
+			('DISJOINT', 'IND', '', ['R1', 'R2']), ('ADD', 'IND', 'CLASS', ['R5', 'ROOM'])]:
+		cache = _cached(OntologyCache())
+		cache.update_batch([write], [[]])
+		assert _hits(cache) == [], write
+
+
+def test_reason_drops_the_entries_of_the_writes_again():
+	"""The old answers queried after a write and before the REASON are dropped by the REASON."""
+	cache = _cached(OntologyCache())
+	move = ('REPLACE', 'OBJECTPROP', 'IND', ['isIn', 'Robot1', 'R1', 'E'])
+	cache.update_batch([move, CAN_REACH], [[], ['R1', 'C1']])
+	assert cache.lookup_batch([CAN_REACH])[0] == ['R1', 'C1']
+	cache.update_batch([REASON], [[]])
+	assert _hits(cache) == [CAN_REACH_2, CONNECTED, VISITED, CLASS_R1, CLASS_R2]
+	# Nothing is pending after the REASON, so the next one does not drop anything
+	cache.update_batch([CAN_REACH, REASON], [['C1'], []])
+	assert _hits(cache) == QUERIES
+
+
+def test_reason_after_a_load_drops_everything():
+	"""A REASON drops every entry queried after a write which may affect all of them."""
+	cache = OntologyCache()
+	cache.update_batch([('LOAD', 'FILE', '', ['abox.owl', 'http://bnc', 'true', 'PELLET', 'true'])], [[]])
+	_cached(cache)
+	cache.update_batch([REASON], [[]])
+	assert _hits(cache) == []
+
+
+def test_query_after_a_write_in_the_same_list_is_sent():
+	"""A cached answer is not used if a previous directive of the same list may change it."""
+	cache = _cached(OntologyCache())
+	move = ('REPLACE', 'OBJECTPROP', 'IND', ['isIn', 'Robot1', 'R1', 'E'])
+	assert cache.lookup_batch([CAN_REACH, move, CAN_REACH, CAN_REACH_2])[1:] == [None, None, ['result of canReach Robot2']]
+	assert cache.lookup_batch([CAN_REACH])[0] is not None
+	# After a write, its entries are also blocked by a REASON in the same list
+	cache.update_batch([move], [[]])
+	cache.update_batch([CAN_REACH], [['C1']])
+	assert cache.lookup_batch([REASON, CAN_REACH]) == [None, None]
+
+
+def test_disabled_and_cleared_cache():
+	"""A disabled cache does not answer nor store anything, and clear() drops every entry."""
+	cache = _cached(OntologyCache())
+	cache.clear()
+	assert _hits(cache) == [] and cache.stats()['invalidations'] == len(QUERIES)
+	cache.enabled = False
+	_cached(cache)
+	assert _hits(cache) == [] and cache.stats()['entries'] == 0
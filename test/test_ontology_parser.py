@@ -0,0 +1,49 @@
+"""
+Tests of the parser of the IRIs and of the literals queried from the ontology.
+"""
+
+import pytest
+
+from exprob_assignment1.ontology_parser import parse_name, parse_names, parse_literal, parse_literals
+
+
+
+def test_parse_name_of_iri():
+	"""The name is what follows the last '#' or '/' of the IRI, whatever the IRI is."""
+	assert parse_name('<http://bnc/exp-rob-lab/2022-23#R1>') == 'R1'
+	assert parse_name('<http://example.org/ontology/Robot1>') == 'Robot1'
+	assert parse_names(['<http://bnc/exp-rob-lab/2022-23#C1>', '<http://bnc/exp-rob-lab/2022-23#E>']) == ['C1', 'E']
+
+
+def test_parse_name_is_interned():
+	"""The same IRI gives the same object, so the names can be compared by identity."""
+	iri = '<http://bnc/exp-rob-lab/2022-23#R12>'
+	assert parse_name(iri) is parse_name(''.join(iri))
+
+
+def test_parse_name_of_non_iri():
+	"""A string which is not an IRI is returned as it is."""
+	assert parse_name('R1') == 'R1'
+	assert parse_name('<no-separator>') == '<no-separator>'
+
+
+def test_parse_literal_converts_the_datatype():
+	"""The literals are converted to the Python type of their datatype."""
+	assert parse_literal('"1665579740"^^xsd:long') == 1665579740
+	assert parse_literal('"0.5"^^xsd:double') == 0.5
+	assert parse_literal('"true"^^xsd:boolean') is True
+	assert parse_literal('"E"^^xsd:string') == 'E'
+	assert parse_literal('"untyped"') == 'untyped'
+	assert parse_literals(['"1"^^xsd:int', '"2"^^xsd:integer']) == [1, 2]
+
+
+def test_parse_literal_keeps_inner_quotes():
+	"""The literal is split at its closing quote, not at the first one."""
+	assert parse_literal('"a "quoted" word"^^xsd:string') == 'a "quoted" word'
+
+
+@pytest.mark.parametrize('queried_object', ['<http://bnc/exp-rob-lab/2022-23#R1>', '1665579740', '"open', '1"^^xsd:long'])
+def test_parse_literal_of_non_literal_raises(queried_object):
+	"""The objects which are not literals are reported with a ValueError."""
+	with pytest.raises(ValueError):
+		parse_literal(queried_object)
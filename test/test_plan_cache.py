@@ -0,0 +1,86 @@
+"""
+Tests of the cache of the paths of the planner: the least recently used eviction, the expiration of
+the entries and the invalidation when the map changes. The ROS time is replaced by a fake clock.
+"""
+
+import pytest
+
+rospy = pytest.importorskip('rospy')
+
+from exprob_assignment1.plan_cache import PlanCache
+
+
+
+@pytest.fixture
+def clock(monkeypatch):
+	"""
+	Fixture that replaces the ROS time with a clock which is moved by hand.
+
+	"""
+	now = [0.0]
+	monkeypatch.setattr(rospy, 'get_time', lambda: now[0])
+	return now
+
+
+def test_least_recently_used_is_evicted(clock):
+	"""When the cache is full, the entry used least recently is dropped."""
+	cache = PlanCache(capacity=2, ttl=0)
+	cache.store('a', [1])
+	cache.store('b', [2])
+	assert cache.lookup('a') == [1]
+	cache.store('c', [3])
+	assert cache.lookup('b') is None
+	assert cache.lookup('a') == [1] and cache.lookup('c') == [3]
+	assert cache.stats()['evictions'] == 1 and cache.stats()['entries'] == 2
+
+
+def test_store_again_refreshes_the_entry(clock):
+	"""Storing a key again makes it the most recently used, without evicting anything."""
+	cache = PlanCache(capacity=2, ttl=0)
+	cache.store('a', [1])
+	cache.store('b', [2])
+	cache.store('a', [3])
+	cache.store('c', [4])
+	assert cache.lookup('a') == [3] and cache.lookup('b') is None
+	assert cache.evictions == 1
+
+
+def test_entries_expire_after_the_ttl(clock):
+	"""An entry is served until its time to live elapsed, and dropped afterwards."""
+	cache = PlanCache(capacity=8, ttl=10.0)
+	cache.store('a', [1])
+	clock[0] = 10.0
+	assert cache.lookup('a') == [1]
+	clock[0] = 10.5
+	assert cache.lookup('a') is None
+	assert cache.stats() == {'hits': 1, 'misses': 1, 'hit_ratio': 0.5, 'evictions': 0, 'expirations': 1,
+		'invalidations': 0, 'entries': 0}
+
+
+def test_entries_never_expire_without_ttl(clock):
+	"""With a time to live which is not positive, the entries are kept."""
+	cache = PlanCache(capacity=8, ttl=0)
+	cache.store('a', [1])
+	clock[0] = 1e9
+	assert cache.lookup('a') == [1] and cache.expirations == 0
+
+
+@pytest.mark.parametrize('capacity', [0, -1])
+def test_cache_is_disabled_without_capacity(clock, capacity):
+	"""Nothing is stored, nor counted, if the capacity is not positive."""
+	cache = PlanCache(capacity=capacity)
+	cache.store('a', [1])
+	assert cache.lookup('a') is None
+	assert cache.stats()['entries'] == 0 and cache.misses == 0
+
+
+def test_clear_counts_the_invalidations(clock):
+	"""Clearing the cache drops and counts every entry."""
+	cache = PlanCache(capacity=8)
+	cache.store('a', [1])
+	cache.store('b', [2])
+	cache.clear()
+	assert cache.invalidations == 2
+	assert cache.lookup('a') is None and cache.lookup('b') is None
+	cache.clear()
+	assert cache.invalidations == 2
@@ -0,0 +1,134 @@
+"""
+Tests of the patrol planner of the planner node: the legs sent as feedback and result, the legs taken
+from the cache and the goals which are aborted. The action server is replaced by a fake one, so the node
+is not started, but rospy and the messages of the package are needed.
+"""
+
+import os
+import sys
+import threading
+
+import pytest
+
+rospy = pytest.importorskip('rospy')
+pytest.importorskip('actionlib')
+pytest.importorskip('exprob_assignment1.msg')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+
+from exprob_assignment1.msg import Point, PatrolPlanGoal
+from exprob_assignment1.grid_planner import MapLayout, GridPlanner
+from exprob_assignment1.plan_cache import PlanCache
+from exprob_assignment1 import architecture_name_mapper as anm
+import planner
+
+DOORS = {'R1': ['D1'], 'R2': ['D2'], 'C1': ['D1', 'D2', 'D3'], 'E': ['D3']}
+
+
+
+class FakeServer:
+	"""
+	Action server which records the feedbacks and the final state of the goal.
+
+	"""
+	def __init__(self):
+		self.feedbacks = []
+		self.state = None
+		self.result = None
+
+	def is_preempt_requested(self):
+		return False
+
+	def publish_feedback(self, feedback):
+		self.feedbacks.append(feedback)
+
+	def set_succeeded(self, result):
+		self.state, self.result = 'succeeded', result
+
+	def set_aborted(self):
+		self.state = 'aborted'
+
+
+
+class FakeRequests:
+	"""
+	Counter of the requests served.
+
+	"""
+	def __init__(self):
+		self.requests = 0
+
+	def record(self):
+		self.requests += 1
+
+
+
+@pytest.fixture
+def server(monkeypatch):
+	"""
+	Fixture that returns the planner node with the map of DOORS, without starting its action servers.
+
+	"""
+	monkeypatch.setattr(rospy, 'get_time', lambda: 0.0)
+	layout = MapLayout(DOORS, anm.ENVIRONMENT_SIZE, anm.CHARGE_LOCATION)
+	node = planner.PlaningAction.__new__(planner.PlaningAction)
+	node._lock = threading.Lock()
+	node._cache = PlanCache()
+	node._requests = FakeRequests()
+	node._patrol_as = FakeServer()
+	node._load_map = lambda: node.grid
+	node.grid = GridPlanner(layout, 0.2)
+	node.layout = layout
+	return node
+
+
+def _goal(server, locations):
+	"""
+	Function that returns the goal of a patrol from the charging location through the given locations.
+
+	"""
+	points = [Point(x=x, y=y) for x, y in (server.layout.centre(location) for location in ['E'] + locations)]
+	return PatrolPlanGoal(current=points[0], targets=points[1:])
+
+
+def test_every_leg_is_sent_as_feedback_and_result(server):
+	"""The legs join the given points in order, and are sent one by one as feedback."""
+	goal = _goal(server, ['R1', 'R2', 'E'])
+	server.execute_patrol_callback(goal)
+	assert server._patrol_as.state == 'succeeded'
+	legs = server._patrol_as.result.legs
+	points = [goal.current] + list(goal.targets)
+	assert len(legs) == 3
+	for i, leg in enumerate(legs):
+		assert leg.via_points[0] == points[i] and leg.via_points[-1] == points[i + 1]
+	assert [feedback.leg_index for feedback in server._patrol_as.feedbacks] == [0, 1, 2]
+	assert [feedback.leg for feedback in server._patrol_as.feedbacks] == list(legs)
+	assert server._requests.requests == 1
+
+
+def test_known_legs_are_taken_from_the_cache(server):
+	"""The legs planned by a previous patrol are found in the cache."""
+	server.execute_patrol_callback(_goal(server, ['R1', 'R2']))
+	first = server._patrol_as.result.legs
+	server._patrol_as = FakeServer()
+	server.execute_patrol_callback(_goal(server, ['R1', 'C1']))
+	assert server._cache.hits == 1
+	assert server._patrol_as.result.legs[0] == first[0]
+
+
+def test_invalid_patrols_are_aborted(server):
+	"""A patrol without targets, or with a point outside the environment, is aborted."""
+	server.execute_patrol_callback(PatrolPlanGoal(current=Point(x=1.0, y=1.0), targets=[]))
+	assert server._patrol_as.state == 'aborted'
+	server._patrol_as = FakeServer()
+	server.execute_patrol_callback(PatrolPlanGoal(current=Point(x=1.0, y=1.0), targets=[Point(x=-1.0, y=1.0)]))
+	assert server._patrol_as.state == 'aborted'
+
+
+def test_unreachable_target_aborts_the_patrol(server):
+	"""The patrol is aborted if a leg cannot be planned."""
+	server.grid = GridPlanner(MapLayout({'E': ['D1'], 'R1': ['D1'], 'R2': []}, anm.ENVIRONMENT_SIZE, 'E'), 0.2)
+	server.layout = server.grid.layout
+	server.execute_patrol_callback(_goal(server, ['R1', 'R2']))
+	assert server._patrol_as.state == 'aborted'
+	assert server._patrol_as.feedbacks == []
@@ -0,0 +1,63 @@
+"""
+Tests of the in-process Python ontology: loading of an Abox written by the abox_generator, the
+rules applied by REASON and the errors of the unsupported directives.
+"""
+
+import os
+
+import pytest
+
+from exprob_assignment1.abox_generator import write_abox
+from exprob_assignment1.ontology_parser import parse_names, parse_literals
+from exprob_assignment1.python_ontology import PythonOntology
+
+TBOX_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'topological_map', 'topological_map.owl')
+IRI = 'http://bnc/exp-rob-lab/2022-23'
+# Two rooms on the same corridor, which is connected to the charging corridor
+DOORS = {'R1': ['D1'], 'R2': ['D2'], 'C1': ['D1', 'D2', 'D3'], 'E': ['D3']}
+NOW = 1700000000
+
+
+
+@pytest.fixture
+def ontology(tmp_path):
+	"""
+	Fixture that loads an Abox in which R1 was visited long ago and the robot is in E.
+
+	"""
+	visited_at = {'R1': 1000000000, 'R2': NOW, 'C1': NOW, 'E': NOW}
+	abox_path = str(tmp_path / 'abox.owl')
+	write_abox(TBOX_PATH, abox_path, IRI, DOORS, visited_at, 'Robot1', 'E', str(NOW))
+	ontology = PythonOntology()
+	ontology.call('LOAD', 'FILE', '', [abox_path, IRI, 'true', 'PELLET', 'false'])
+	return ontology
+
+
+def test_reason_infers_reachability_and_urgency(ontology):
+	"""The robot reaches the locations connected to its own, and only the old visit is URGENT."""
+	can_reach, urgent = ontology.call_batch([('QUERY', 'OBJECTPROP', 'IND', ['canReach', 'Robot1']),
+		('QUERY', 'IND', 'CLASS', ['URGENT', 'false'])])
+	assert parse_names(can_reach) == ['C1']
+	assert parse_names(urgent) == ['R1']
+
+
+def test_inferred_knowledge_changes_only_after_reason(ontology):
+	"""As the buffered reasoner of ARMOR, a REPLACE is seen by the rules only after a REASON."""
+	ontology.call('REPLACE', 'OBJECTPROP', 'IND', ['isIn', 'Robot1', 'C1', 'E'])
+	assert parse_names(ontology.call('QUERY', 'OBJECTPROP', 'IND', ['canReach', 'Robot1'])) == ['C1']
+	ontology.call('REASON', '', '', [''])
+	assert sorted(parse_names(ontology.call('QUERY', 'OBJECTPROP', 'IND', ['canReach', 'Robot1']))) == ['E', 'R1', 'R2']
+
+
+def test_data_properties_are_formatted_as_armor(ontology):
+	"""The literals are typed as ARMOR returns them, and a REPLACE keeps a single value."""
+	ontology.call('REPLACE', 'DATAPROP', 'IND', ['visitedAt', 'R1', 'Long', str(NOW), '1000000000'])
+	assert parse_literals(ontology.call('QUERY', 'DATAPROP', 'IND', ['visitedAt', 'R1'])) == [NOW]
+	ontology.call('REASON', '', '', [''])
+	assert parse_names(ontology.call('QUERY', 'IND', 'CLASS', ['URGENT', 'false'])) == []
+
+
+def test_unsupported_directive_raises(ontology):
+	"""The directives which are not implemented are reported instead of being ignored."""
+	with pytest.raises(ValueError):
+		ontology.call('SAVE', '', '', ['/tmp/ontology.owl'])
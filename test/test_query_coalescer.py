@@ -0,0 +1,127 @@
+"""
+Tests of the backend which coalesces the directives of many threads: the order of the directives, the
+results given back to every list, the errors and the window waited for the other senders.
+"""
+
+import threading
+import time
+
+import pytest
+
+from exprob_assignment1.query_coalescer import QueryCoalescer
+
+
+
+class RecordingBackend:
+	"""
+	Backend which records the batches it receives and answers every directive with its arguments. A
+	batch can be held until it is released, and the next batches can fail.
+
+	"""
+	def __init__(self, hold=False):
+		self.batches = []
+		self.errors = []
+		self.closed = False
+		self.received = threading.Event()
+		self.release = threading.Event()
+		if not hold:
+			self.release.set()
+
+	def call_batch(self, directives):
+		self.batches.append(list(directives))
+		self.received.set()
+		self.release.wait()
+		if len(self.errors) > 0:
+			raise self.errors.pop(0)
+		return [list(ARGS) for command, primary_command_spec, secondary_command_spec, ARGS in directives]
+
+	def close(self):
+		self.closed = True
+
+
+def _query(*ARGS):
+	"""
+	Function that returns a QUERY directive with the given arguments.
+
+	"""
+	return ('QUERY', 'OBJECTPROP', 'IND', list(ARGS))
+
+
+def test_results_are_split_back_to_every_list():
+	"""The lists queued together are sent in a single call, in order, and each gets its own results."""
+	backend = RecordingBackend()
+	coalescer = QueryCoalescer(backend, senders=3, window=5.0)
+	requests = [coalescer.submit([_query(i, j) for j in range(i + 1)]) for i in range(3)]
+	assert [request.result() for request in requests] == [[[0, 0]], [[1, 0], [1, 1]], [[2, 0], [2, 1], [2, 2]]]
+	assert backend.batches == [[_query(0, 0), _query(1, 0), _query(1, 1), _query(2, 0), _query(2, 1), _query(2, 2)]]
+	assert coalescer.stats() == {'requests': 3, 'round_trips': 1}
+
+
+def test_lists_queued_during_a_call_are_sent_next_in_order():
+	"""The lists queued while a call is running are sent together afterwards, in the order they were queued."""
+	backend = RecordingBackend(hold=True)
+	coalescer = QueryCoalescer(backend, senders=2, window=0.0)
+	first = coalescer.submit([_query('first')])
+	assert backend.received.wait(5.0)
+	second = coalescer.submit([_query('second')])
+	third = coalescer.submit([_query('third')])
+	backend.release.set()
+	assert first.result() == [['first']] and second.result() == [['second']] and third.result() == [['third']]
+	assert backend.batches == [[_query('first')], [_query('second'), _query('third')]]
+
+
+def test_error_is_given_to_every_list_of_the_call():
+	"""If the call fails, every list sent with it gets the error, and the next calls go on."""
+	backend = RecordingBackend()
+	backend.errors.append(ValueError('transport error'))
+	coalescer = QueryCoalescer(backend, senders=2, window=5.0)
+	requests = [coalescer.submit([_query(i)]) for i in range(2)]
+	for request in requests:
+		with pytest.raises(ValueError, match='transport error'):
+			request.result()
+	requests = [coalescer.submit([_query(i)]) for i in range(2)]
+	assert [request.result() for request in requests] == [[[0]], [[1]]]
+	assert coalescer.stats() == {'requests': 4, 'round_trips': 1}
+
+
+def test_threads_of_every_sender_do_not_wait_the_window():
+	"""Once a list of every sender is queued, they are sent at once in a single call."""
+	backend = RecordingBackend()
+	coalescer = QueryCoalescer(backend, senders=4, window=5.0)
+	results = {}
+	def send(robot):
+		results[robot] = coalescer.call_batch([_query(robot, 'canReach'), _query(robot, 'isIn')])
+	threads = [threading.Thread(target=send, args=(f'Robot{i}',)) for i in range(4)]
+	start = time.monotonic()
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join(5.0)
+	assert time.monotonic() - start < 2.0
+	assert results == {f'Robot{i}': [[f'Robot{i}', 'canReach'], [f'Robot{i}', 'isIn']] for i in range(4)}
+	assert len(backend.batches) == 1 and len(backend.batches[0]) == 8
+
+
+def test_single_sender_does_not_wait_the_window():
+	"""A single sender gets the results without waiting for the others."""
+	coalescer = QueryCoalescer(RecordingBackend(), senders=1, window=5.0)
+	start = time.monotonic()
+	assert coalescer.call_batch([_query('R1')]) == [['R1']]
+	assert time.monotonic() - start < 2.0
+
+
+def test_partial_batch_waits_the_window():
+	"""If some senders did not queue a list, the window is waited before sending."""
+	coalescer = QueryCoalescer(RecordingBackend(), senders=2, window=0.2)
+	start = time.monotonic()
+	assert coalescer.call_batch([_query('R1')]) == [['R1']]
+	assert time.monotonic() - start >= 0.2
+
+
+def test_close_closes_the_backend():
+	"""Closing the coalescer stops its thread and closes the wrapped backend."""
+	backend = RecordingBackend()
+	coalescer = QueryCoalescer(backend)
+	coalescer.close()
+	coalescer._thread.join(5.0)
+	assert backend.closed and not coalescer._thread.is_alive()
@@ -0,0 +1,95 @@
+"""
+Tests of the patrol requested by the helper of the state machine: the client of the patrol planner
+created at the first patrol, and the plans of the legs taken from the result. The action client is
+replaced by a fake one, so the planner is not needed, but ROS and the messages of the package are.
+"""
+
+import pytest
+
+rospy = pytest.importorskip('rospy')
+actionlib = pytest.importorskip('actionlib')
+pytest.importorskip('exprob_assignment1.msg')
+
+from actionlib_msgs.msg import GoalStatus
+from exprob_assignment1.msg import Point, PlanLeg, PatrolPlanResult
+from exprob_assignment1.grid_planner import MapLayout
+from exprob_assignment1 import architecture_name_mapper as anm
+from exprob_assignment1.state_machine_helper import Helper
+
+DOORS = {'R1': ['D1'], 'R2': ['D2'], 'C1': ['D1', 'D2', 'D3'], 'E': ['D3']}
+
+
+
+class FakeClient:
+	"""
+	Action client of the patrol planner, which plans straight legs or ends with the given state.
+
+	"""
+	def __init__(self, name=None, action=None, available=True, state=GoalStatus.SUCCEEDED):
+		self.available = available
+		self.state = state
+		self.goals = []
+
+	def wait_for_server(self, timeout=None):
+		return self.available
+
+	def send_goal(self, goal):
+		self.goals.append(goal)
+
+	def wait_for_result(self, timeout=None):
+		return True
+
+	def get_state(self):
+		return self.state
+
+	def get_result(self):
+		points = [self.goals[-1].current] + list(self.goals[-1].targets)
+		return PatrolPlanResult(legs=[PlanLeg(via_points=[first, last]) for first, last in zip(points[:-1], points[1:])])
+
+
+
+@pytest.fixture
+def helper():
+	"""
+	Fixture that returns a helper in the charging location of the map of DOORS, without clients.
+
+	"""
+	helper = Helper.__new__(Helper)
+	helper.log_tag = anm.NODE_STATE_MACHINE
+	helper.layout = MapLayout(DOORS, anm.ENVIRONMENT_SIZE, anm.CHARGE_LOCATION)
+	helper.current_point = Point(x=anm.INIT_POINT[0], y=anm.INIT_POINT[1])
+	helper.patrol_cli = None
+	helper._patrol_action = anm.ACTION_PATROL_PLANNER
+	return helper
+
+
+def test_patrol_legs_are_unpacked(helper, monkeypatch):
+	"""The client is created at the first patrol, and every leg goes from a location to the next one."""
+	monkeypatch.setattr(actionlib, 'SimpleActionClient', FakeClient)
+	legs = helper.plan_patrol(['R1', 'R2'])
+	assert isinstance(helper.patrol_cli, FakeClient)
+	goal = helper.patrol_cli.goals[0]
+	assert goal.current == helper.current_point
+	assert goal.targets == [helper.location_point('R1'), helper.location_point('R2')]
+	assert legs == [[helper.current_point, goal.targets[0]], [goal.targets[0], goal.targets[1]]]
+	assert all(type(leg) == list for leg in legs)
+
+
+def test_failed_patrol_is_none(helper):
+	"""A patrol which is not planned gives None."""
+	helper.patrol_cli = FakeClient(state=GoalStatus.ABORTED)
+	assert helper.plan_patrol(['R1']) is None
+
+
+def test_empty_patrol_does_not_need_the_planner(helper, monkeypatch):
+	"""No goal is sent, nor client created, without locations."""
+	monkeypatch.setattr(actionlib, 'SimpleActionClient', None)
+	assert helper.plan_patrol([]) == []
+	assert helper.patrol_cli is None
+
+
+def test_missing_patrol_planner_is_none(helper, monkeypatch):
+	"""If the planner does not serve the patrols, None is given and the client is created again next time."""
+	monkeypatch.setattr(actionlib, 'SimpleActionClient', lambda name, action: FakeClient(available=False))
+	assert helper.plan_patrol(['R1'], rospy.Duration(0.1)) is None
+	assert helper.patrol_cli is None
@@ -0,0 +1,62 @@
+"""
+Tests of the streaming histograms of the metrics of the states: the quantiles published on the
+diagnostics and saved when the node is shut down.
+"""
+
+import math
+import random
+
+import pytest
+
+pytest.importorskip('rospy')
+pytest.importorskip('diagnostic_msgs')
+
+from exprob_assignment1.state_metrics import HISTOGRAM_MIN, HISTOGRAM_GROWTH, QUANTILES, Histogram
+
+
+
+def test_empty_histogram():
+	"""Every statistic of an empty histogram is 0."""
+	histogram = Histogram()
+	assert histogram.quantile(0.5) == 0.0
+	assert histogram.summary() == {'count': 0, 'mean': 0.0, 'min': 0.0, 'max': 0.0, 'p50': 0.0, 'p90': 0.0, 'p99': 0.0}
+
+
+@pytest.mark.parametrize('value', [0.0, HISTOGRAM_MIN / 2, 0.0123, 42.0])
+def test_single_value(value):
+	"""With a single value, every quantile is that value."""
+	histogram = Histogram()
+	histogram.record(value)
+	for q in (0.0, *QUANTILES, 1.0):
+		assert histogram.quantile(q) == value
+	summary = histogram.summary()
+	assert summary['count'] == 1 and summary['mean'] == summary['min'] == summary['max'] == value
+
+
+def test_values_are_placed_in_logarithmic_buckets():
+	"""A value goes in the first bucket whose upper bound is not lower, the small ones in the first one."""
+	histogram = Histogram()
+	for value in (0.0, HISTOGRAM_MIN, HISTOGRAM_MIN * 1.05, HISTOGRAM_MIN * 1.15, 1.0):
+		histogram.record(value)
+	index = int(math.log(1.0 / HISTOGRAM_MIN, HISTOGRAM_GROWTH)) + 1
+	assert histogram._buckets == {0: 2, 1: 1, 2: 1, index: 1}
+	assert HISTOGRAM_MIN * HISTOGRAM_GROWTH ** (index - 1) < 1.0 <= HISTOGRAM_MIN * HISTOGRAM_GROWTH ** index
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_quantiles_have_a_bounded_relative_error(seed):
+	"""The quantiles are never lower than the exact ones, and at most 10% higher."""
+	rng = random.Random(seed)
+	values = [10 ** rng.uniform(-5, 1) for _ in range(10000)]
+	histogram = Histogram()
+	for value in values:
+		histogram.record(value)
+	values.sort()
+	for q in QUANTILES:
+		exact = values[math.ceil(q * len(values)) - 1]
+		estimate = histogram.quantile(q)
+		assert exact * (1 - 1e-9) <= estimate <= exact * HISTOGRAM_GROWTH, q
+	assert histogram.quantile(1.0) == values[-1]
+	summary = histogram.summary()
+	assert summary['min'] == values[0] and summary['max'] == values[-1]
+	assert summary['mean'] == pytest.approx(sum(values) / len(values))
@@ -0,0 +1,59 @@
+"""
+Tests of the index of the urgent locations and of the reading of the properties of the Tbox.
+"""
+
+import os
+
+from exprob_assignment1.urgency_tracker import UrgencyTracker, read_long_property
+
+TBOX_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'topological_map', 'topological_map.owl')
+
+
+
+def test_urgent_is_ordered_from_the_oldest_visit():
+	"""A location is URGENT once more than the threshold elapsed, the least recently visited first."""
+	tracker = UrgencyTracker(10)
+	tracker.update('R1', 5)
+	tracker.update('R2', 0)
+	tracker.update('R3', 15)
+	assert tracker.urgent(10) == []
+	assert tracker.urgent(15) == ['R2']
+	assert tracker.urgent(20) == ['R2', 'R1']
+	assert tracker.urgent(20, ['R1', 'R3']) == ['R1']
+	assert not tracker.is_urgent('R1', 15)
+	assert tracker.is_urgent('R1', 16)
+
+
+def test_visit_again_discards_the_old_entry():
+	"""A new visit replaces the previous one, even if its outdated entry is still in the heap."""
+	tracker = UrgencyTracker(10)
+	tracker.update('R1', 0)
+	tracker.update('R1', 50)
+	assert tracker.visited_at('R1') == 50
+	assert tracker.urgent(55) == []
+	assert tracker.urgent(61) == ['R1']
+	# The heap is the same after a query, so the same answer is given again
+	assert tracker.urgent(61) == ['R1']
+
+
+def test_many_visits_keep_the_heap_bounded():
+	"""The outdated entries are dropped when they are the majority."""
+	tracker = UrgencyTracker(10)
+	for timestamp in range(0, 1000):
+		tracker.update('R1', timestamp)
+	assert len(tracker._heap) <= 2 * 1 + 16 + 1
+	assert tracker.urgent(1009) == [] and tracker.urgent(1010) == ['R1']
+
+
+def test_unknown_location_is_not_urgent():
+	"""The locations which were never visited are not indexed."""
+	tracker = UrgencyTracker(10)
+	assert tracker.visited_at('R1') is None
+	assert not tracker.is_urgent('R1', 100)
+
+
+def test_read_long_property_of_the_tbox():
+	"""The threshold of the robot is read from the Tbox, and a missing property gives None."""
+	assert read_long_property(TBOX_PATH, 'Robot1', 'urgencyThreshold') > 0
+	assert read_long_property(TBOX_PATH, 'Robot1', 'missingProperty') is None
+	assert read_long_property(TBOX_PATH, 'Robot2', 'urgencyThreshold') is None
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+"""
+.. module:: abox_generator
+	:platform: Unix
+	:synopsis: Python module for the generation of the Abox of the ontology
+
+.. moduleauthor:: Francesco Ferrazzi <s5262829@studenti.unige.it>
+
+Generator of the complete ontology of the environment, i.e. the Tbox of topological_map.owl plus
+the Abox of the map, in the same RDF/XML style of topological_map_abox.owl. The whole Abox (doors,
+rooms, corridors, `visitedAt` timestamps, position and last motion of the robot and the axiom
+stating that every individual is different) is written in a single pass, so that the ontology can
+be created with a single LOAD instead of one directive for every assertion.
+"""
+
+import os
+import re
+
+# Define the datatype of the timestamps
+XSD_LONG = 'http://www.w3.org/2001/XMLSchema#long'
+# Define the indentation used in the OWL files
+INDENT = '    '
+
+
+
+def write_abox(tbox_path, abox_path, iri, doors, visited_at, robot, robot_location, now, robots=None):
+	"""
+	Function that writes the ontology of the environment in an OWL file. The individuals are added
+	at the end of the Tbox, and the robot defined in the Tbox is written again with its position
+	and its last motion, keeping its other properties (e.g. `urgencyThreshold`). The other robots of
+	a fleet, if any, are written in the same way with the properties of that robot.
+
+	Args:
+		tbox_path: it is the path of the OWL file with the Tbox.
+		abox_path: it is the path of the OWL file to be written.
+		iri: it is the IRI of the ontology.
+		doors: dictionary with the doors of every location, i.e. {location: [door]}.
+		visited_at: dictionary with the last visit of every location, i.e. {location: timestamp}.
+		robot: it is the name of the robot.
+		robot_location: it is the location in which the robot is.
+		now: it is the last time in which the robot moved.
+		robots: dictionary with the location of every other robot, i.e. {robot: location}.
+
+	"""
+	with open(tbox_path) as tbox_file:
+		tbox = tbox_file.read()
+	# Take the robot out of the Tbox, its other properties are written again below
+	robot_pattern = re.compile(r'\n[ \t]*<owl:NamedIndividual rdf:about="' + re.escape(f'{iri}#{robot}') + r'">\n(.*?)[ \t]*</owl:NamedIndividual>\n', re.S)
+	match = robot_pattern.search(tbox)
+	robot_lines = []
+	if match is not None:
+		robot_lines = [line.strip() for line in match.group(1).splitlines() if line.strip() and not line.strip().startswith('<now ')]
+		tbox = tbox[:match.start()] + '\n' + tbox[match.end():]
+	door_names = list(dict.fromkeys(door for location_doors in doors.values() for door in location_doors))
+	locations = list(doors) + [loc for loc in visited_at if loc not in doors]
+	lines = []
+	# Write the locations with their doors and timestamps
+	for location in locations:
+		properties = [f'<hasDoor rdf:resource="{iri}#{door}"/>' for door in doors.get(location, [])]
+		if location in visited_at:
+			properties.append(f'<visitedAt rdf:datatype="{XSD_LONG}">{visited_at[location]}</visitedAt>')
+		lines.extend(_individual(iri, location, properties))
+	# Write the doors
+	for door in door_names:
+		lines.extend(_individual(iri, door, []))
+	# Write the robots
+	robot_locations = {robot: robot_location}
+	robot_locations.update(robots or {})
+	for name, location in robot_locations.items():
+		properties = [f'<isIn rdf:resource="{iri}#{location}"/>', f'<now rdf:datatype="{XSD_LONG}">{now}</now>']
+		lines.extend(_individual(iri, name, properties + robot_lines))
+	# State that every location and door is a different individual
+	lines.append(f'{INDENT}<rdf:Description>')
+	lines.append(f'{INDENT * 2}<rdf:type rdf:resource="http://www.w3.org/2002/07/owl#AllDifferent"/>')
+	lines.append(f'{INDENT * 2}<owl:distinctMembers rdf:parseType="Collection">')
+	for name in locations + door_names:
+		lines.append(f'{INDENT * 3}<rdf:Description rdf:about="{iri}#{name}"/>')
+	lines.append(f'{INDENT * 2}</owl:distinctMembers>')
+	lines.append(f'{INDENT}</rdf:Description>')
+	end = tbox.rfind('</rdf:RDF>')
+	abox = tbox[:end] + '\n'.join(lines) + '\n' + tbox[end:]
+	# Write in a temporary file first, so that a partial file is never loaded
+	tmp_path = abox_path + '.tmp'
+	with open(tmp_path, 'w') as abox_file:
+		abox_file.write(abox)
+	os.replace(tmp_path, abox_path)
+
+
+
+def _individual(iri, name, properties):
+	"""
+	Function that returns the lines of an individual in RDF/XML.
+
+	Args:
+		iri: it is the IRI of the ontology.
+		name: it is the name of the individual.
+		properties: list with the lines of the assertions of the individual.
+
+	Returns:
+		lines: list with the lines of the individual.
+
+	"""
+	lines = ['', f'{INDENT}<!-- {iri}#{name} -->', '']
+	if len(properties) == 0:
+		lines.append(f'{INDENT}<owl:NamedIndividual rdf:about="{iri}#{name}"/>')
+	else:
+		lines.append(f'{INDENT}<owl:NamedIndividual rdf:about="{iri}#{name}">')
+		lines.extend(f'{INDENT * 2}{line}' for line in properties)
+		lines.append(f'{INDENT}</owl:NamedIndividual>')
+	lines.append(f'{INDENT}')
+	return lines
@@ -17,12 +17,70 @@ INIT_POINT = [0.0, 0.0]
 # Initialize and define the size of the environment 
 ENVIRONMENT_SIZE = [20, 15]
 
+# The boolean parameter to enable the cache of the ontology queries.
+# If the value is `True` the queries whose answer did not change since the last time are not sent 
+# to the ontology. Instead, every query is sent to the ontology if `False`.
+PARAM_ONTOLOGY_CACHE = 'config/ontology_cache'
+
+# The time between two cross-checks of the local indexes with the ontology, in seconds (default 60), 0 to disable them.
+# The Reasoner asks the ontology to REASON and queries the reachable and the URGENT locations, which are
+# compared with the ones known locally, and the differences are logged.
+PARAM_ONTOLOGY_CHECK_PERIOD = 'config/ontology_check_period'
+
+# The name of the parameter to select the ontology backend.
+# If the value is `armor` the ontology is managed by the ARMOR service, while if it is `python`
+# the in-process Python ontology is used and the ARMOR service is not needed.
+PARAM_ONTOLOGY_BACKEND = 'config/ontology_backend'
+
+# The parameters that define the map explored by the robot, i.e. the number of rooms, the number of
+# corridors (including the charging one), the number of doors, and the way in which the corridors are
+# connected, which can be `ring` (default), `chain`, `star`, `grid` or `random`.
+PARAM_MAP_ROOMS = 'config/map/rooms'
+PARAM_MAP_CORRIDORS = 'config/map/corridors'
+PARAM_MAP_DOORS = 'config/map/doors'
+PARAM_MAP_TOPOLOGY = 'config/map/topology'
+
+# The boolean parameter to enable the speculative reasoning.
+# If the value is `True` the next location is decided in background while the robot moves and checks
+# a location, and the Reasoner only validates it. Instead, the Reasoner decides it if `False` (default).
+PARAM_SPECULATIVE_REASONING = 'config/speculative_reasoning'
+
+# The boolean parameter to enable the prefetching of the plans.
+# If the value is `True` the plan towards the next location is requested while the robot checks a
+# location, and the Planner reuses it. Instead, the plan is requested by the Planner if `False` (default).
+PARAM_PLAN_PREFETCH = 'config/plan_prefetch'
+
+# The boolean parameter to use the states written as coroutines of the asyncio helper.
+# If the value is `True` the Planner and the Controller await the goals together with the battery low
+# event, and cancel them as soon as the battery gets low. Instead, they poll the helper if `False` (default).
+PARAM_ASYNC_STATES = 'config/async_states'
+
+# The list of the names of the robots controlled by the state machine, e.g. `[Robot1, Robot2]`.
+# With a single robot (default `[Robot1]`) the names of the topics, services and actions are used as
+# they are, while with many robots they are in the namespace of every robot, e.g. `robot2/state/battery_low`.
+PARAM_ROBOTS = 'config/robots'
+
+# The boolean parameter to enable the metrics of the states of the state machine.
+# If the value is `True` (default) the timing, the outcomes and the calls to the ontology of every state are
+# published on the /diagnostics topic and saved in a JSON file on shutdown. Instead, nothing is recorded if `False`.
+PARAM_STATE_METRICS = 'config/state_metrics'
+
+# The path of the JSON file in which the metrics of the states are saved, `~/.ros/state_metrics.json` by default.
+PARAM_STATE_METRICS_FILE = 'config/state_metrics_file'
+
 # The boolean parameter to active random testing.
 # If the value is `False` a keyboard-based interface will be used to produce stimulus 
 # (i.e., battery signals). Instead, random stimulus will be generated if `True`. In the 
 # latter case, the architecture also requires all the parameters with the scope 
 # `test/random_sense/*`, which are not used if the boolean parameter is `False`.
 PARAM_RANDOM_ACTIVE = 'test/random_sense/active'
+
+# The boolean parameter to enable the benchmark mode.
+# If the value is `True` the planner, the controller and the charge of the battery complete their requests
+# without the simulated delays, but with the same feedback and results, and the surveillance of a location
+# does not wait. Every server counts its requests per second and publishes them on /diagnostics. The time
+# after which the battery gets low is not changed. Instead, the simulated delays are used if `False` (default).
+PARAM_BENCHMARK_MODE = 'test/benchmark'
 # ---------------------------------------------------------
 
 
@@ -32,6 +90,10 @@ NODE_ROBOT_BATTERY_STATE = 'robot-battery-state'
 # The name of the topic where the battery state is published.
 TOPIC_BATTERY_LOW = 'state/battery_low'
 
+# The name of the topic where the time in which the battery got low is published, just before
+# the battery state. It is used to measure the latency of the preemption of the state machine.
+TOPIC_BATTERY_LOW_STAMP = 'state/battery_low_stamp'
+
 # The name of the service solving the recharge of the robot.
 TOPIC_RECHARGE = 'state/recharge'
 
@@ -49,6 +111,12 @@ PARAM_BATTERY_CHARGE = 'test/random_sense/battery_charge'
 
 # The name of the node representing the shared knowledge required for this scenario.
 NODE_STATE_MACHINE = 'state-machine'
+
+# The name of the ARMOR service which executes one directive on the ontology.
+SERVICE_ARMOR = '/armor_interface_srv'
+
+# The name of the ARMOR service which executes a list of directives on the ontology in a single call.
+SERVICE_ARMOR_SERIALIZED = '/armor_interface_serialized_srv'
 # ---------------------------------------------------------
 
 
@@ -58,14 +126,27 @@ NODE_PLANNER = 'planner'
 # The name of the action server solving the motion planning problem.
 ACTION_PLANNER = 'motion/planner'
 
-# Defines the number of points in the plan. It is a list where the number of points
-# is a random value in the interval [`min_n`, `max_n`).
-PARAM_PLANNER_POINTS = 'test/random_plan_points'
+# The name of the action server planning the paths towards many points in order, i.e. the legs of a patrol.
+ACTION_PATROL_PLANNER = 'motion/patrol_planner'
+
+# The size of the cells of the occupancy grid on which the paths are planned, in meters (default 0.1).
+# The smaller the cells, the longer the time needed to plan a path.
+PARAM_PLANNER_RESOLUTION = 'config/planner/resolution'
+
+# The largest number of paths kept in the cache of the planner (default 128), 0 to disable the cache.
+PARAM_PLANNER_CACHE_SIZE = 'config/planner/cache_size'
+
+# The time after which a path of the cache of the planner expires, in seconds (default 60), 0 to never expire.
+PARAM_PLANNER_CACHE_TTL = 'config/planner/cache_ttl'
+
+# The boolean parameter to ask the planner for the delta feedback.
+# If the value is `True` (default) every feedback of the planner only holds the points added since the previous
+# one, and the state machine rebuilds the plan. Instead, every feedback holds the whole plan computed so far if `False`.
+PARAM_PLANNER_DELTA_FEEDBACK = 'config/planner/delta_feedback'
 
-# The delay between the computation of the next via points.
-# It should be a list `[min_time, max_time]`, and the computation will 
-# last for a random number of seconds in such an interval.
-PARAM_PLANNER_TIME = 'test/random_plan_time'
+# The doors of every location of the map, i.e. `{location: [door]}`, written by the state machine when
+# the map is built and read by the planner to draw the occupancy grid.
+PARAM_MAP_LOCATION_DOORS = 'state/map/location_doors'
 # -------------------------------------------------
 
 
@@ -82,6 +163,23 @@ PARAM_CONTROLLER_TIME = 'test/random_motion_time'
 # -------------------------------------------------
 
 
+# The name of the node which publishes the simulated time.
+NODE_SIM_CLOCK = 'sim-clock'
+
+# How many times the simulated time is faster than the wall clock, if the value is not positive the 
+# simulated time advances as fast as possible. It is used only if `/use_sim_time` is `True`.
+PARAM_SIM_SPEED = 'sim/speed'
+
+# The seconds of simulated time between two messages of the clock.
+PARAM_SIM_STEP = 'sim/step'
+# -------------------------------------------------
+
+
+# The name of the node which measures the operations of the helper of the state machine.
+NODE_HELPER_BENCHMARK = 'helper-benchmark'
+# -------------------------------------------------
+
+
 # Function used to label each log with a producer tag.
 def tag_log(msg, producer_tag):
     return '@%s>> %s' % (producer_tag, msg)
@@ -0,0 +1,284 @@
+#!/usr/bin/env python
+"""
+.. module:: armor_client
+	:platform: Unix
+	:synopsis: Python module for the client of the ARMOR service
+
+.. moduleauthor:: Francesco Ferrazzi <s5262829@studenti.unige.it>
+
+Client used to send directives to the ARMOR service. The connection to the service is opened once
+and kept alive (i.e. persistent), so the lookup of the service and the set up of the connection are
+not repeated for every directive. If the connection drops, it is opened again transparently and the
+directive is retried a bounded number of times, waiting a growing delay between the attempts. rospy
+reports every failure of a call as a ServiceException, whether the request reached ARMOR or not. The 
+directives which only read the ontology (i.e. QUERY and REASON) are always retried, while the ones which 
+change it (e.g. ADD) are only retried if the request was not sent, since they would be executed twice.
+The latency of every call is measured and can be retrieved through the stats() method.
+
+Service:
+	/armor_interface_srv to send a single directive to the ontology
+	/armor_interface_serialized_srv to send many directives to the ontology in a single call
+"""
+
+import threading
+import time
+import rospy
+
+# Import constant name defined to structure the architecture.
+from exprob_assignment1 import architecture_name_mapper as anm
+
+# Armor import to work with the ontology
+from armor_msgs.srv import ArmorDirective, ArmorDirectiveRequest
+from armor_msgs.srv import ArmorDirectiveList, ArmorDirectiveListRequest
+from armor_msgs.msg import ArmorDirectiveReq
+
+# A tag for identifying logs producer.
+LOG_TAG = anm.NODE_STATE_MACHINE
+
+# Define the number of times a directive is retried before giving up
+MAX_RETRIES = 3
+# Define the delay before the first retry, in seconds, which is doubled at every attempt
+RETRY_DELAY = 0.5
+# Define how long to wait for the service to be available, in seconds
+CONNECTION_TIMEOUT = 10.0
+# Define the commands which do not change the ontology, so they can be executed again
+READ_ONLY_COMMANDS = ('QUERY', 'REASON')
+# Define the errors of rospy raised before the request is sent, i.e. when the connection cannot be opened
+UNSENT_ERRORS = ('unable to connect', 'unavailable')
+
+
+
+class ArmorClient:
+	"""
+	This class implements a client of the ARMOR service with a persistent connection. It exposes
+	the same call() and call_batch() methods of the PythonOntology, so the two can be used in the same way.
+
+	"""
+	def __init__(self, client_name='example', reference_name='ontoRef', max_retries=MAX_RETRIES, retry_delay=RETRY_DELAY):
+		"""
+		Function that initializes the class ArmorClient. The connections are opened at the first call.
+
+		Args:
+			self: instance of the current class.
+			client_name: it is the name of the client for ARMOR.
+			reference_name: it is the name of the ontology reference for ARMOR.
+			max_retries: number of times a directive is retried before giving up.
+			retry_delay: delay before the first retry, in seconds.
+
+		"""
+		self.client_name = client_name
+		self.reference_name = reference_name
+		self.max_retries = max_retries
+		self.retry_delay = retry_delay
+		self.calls = 0                    # Number of calls to the service
+		self.reconnections = 0            # Number of times a connection has been opened again
+		self.last_latency = 0.0           # Latency of the last call, in seconds
+		self.max_latency = 0.0            # Maximum latency of a call, in seconds
+		self._total_latency = 0.0         # Sum of the latencies of every call, in seconds
+		self._proxies = {}                # Persistent service proxies, indexed by service name
+		self._opened = set()              # Names of the services connected at least once
+		self._lock = threading.Lock()     # Mutex since a persistent proxy cannot be shared among threads
+
+
+	def call(self, command, primary_command_spec, secondary_command_spec, ARGS):
+		"""
+		Method that sends a single directive to the ARMOR service.
+
+		Args:
+			self: instance of the current class.
+			command: it is the command to execute (e.g. ADD, LOAD, ...).
+			primary_command_spec: it is the primary command specification (optional).
+			secondary_command_spec: it is the secondary command specification (optional).
+			ARGS: it is the list of arguments (e.g. list of individuals to add).
+
+		Returns:
+			queried_objects: it returns a list of queried objects.
+
+		"""
+		request = ArmorDirectiveRequest()
+		request.armor_request = self._request(command, primary_command_spec, secondary_command_spec, ARGS)
+		response = self._invoke(anm.SERVICE_ARMOR, ArmorDirective, request, command in READ_ONLY_COMMANDS)
+		return response.armor_response.queried_objects
+
+
+	def call_batch(self, directives):
+		"""
+		Method that sends a list of directives to the ARMOR service in a single call. ARMOR executes
+		them in the given order.
+
+		Args:
+			self: instance of the current class.
+			directives: list of tuples (command, primary_command_spec, secondary_command_spec, ARGS).
+
+		Returns:
+			queried_objects: list with the queried objects of every directive.
+
+		"""
+		if len(directives) == 0:
+			return []
+		request = ArmorDirectiveListRequest()
+		request.armor_requests = [self._request(*directive) for directive in directives]
+		read_only = all(directive[0] in READ_ONLY_COMMANDS for directive in directives)
+		response = self._invoke(anm.SERVICE_ARMOR_SERIALIZED, ArmorDirectiveList, request, read_only)
+		return [res.queried_objects for res in response.armor_responses]
+
+
+	def stats(self):
+		"""
+		Method that returns the counters and the latencies of the calls done so far.
+
+		Args:
+			self: instance of the current class.
+
+		Returns:
+			stats: dictionary with the number of calls and reconnections, and the last, mean and
+				maximum latency in seconds.
+
+		"""
+		return {'calls': self.calls,
+			'reconnections': self.reconnections,
+			'last_latency': self.last_latency,
+			'mean_latency': self._total_latency / self.calls if self.calls > 0 else 0.0,
+			'max_latency': self.max_latency}
+
+
+	def close(self):
+		"""
+		Method that closes every connection to the ARMOR service.
+
+		Args:
+			self: instance of the current class.
+
+		"""
+		with self._lock:
+			for name in list(self._proxies):
+				self._disconnect(name)
+
+
+	def _request(self, command, primary_command_spec, secondary_command_spec, ARGS):
+		"""
+		Method that builds the message of a directive.
+
+		Args:
+			self: instance of the current class.
+			command: it is the command to execute (e.g. ADD, LOAD, ...).
+			primary_command_spec: it is the primary command specification (optional).
+			secondary_command_spec: it is the secondary command specification (optional).
+			ARGS: it is the list of arguments (e.g. list of individuals to add).
+
+		Returns:
+			armor_request: the directive message for ARMOR.
+
+		"""
+		armor_request = ArmorDirectiveReq()
+		armor_request.client_name = self.client_name
+		armor_request.reference_name = self.reference_name
+		armor_request.command = command
+		armor_request.primary_command_spec = primary_command_spec
+		armor_request.secondary_command_spec = secondary_command_spec
+		armor_request.args = ARGS
+		return armor_request
+
+
+	def _invoke(self, name, service_class, request, read_only):
+		"""
+		Method that calls a service through its persistent connection. If the call fails, the connection
+		is closed and the call is retried up to `max_retries` times, opening it again and doubling the 
+		delay between two attempts. A request which changes the ontology is only retried if it was not 
+		sent, i.e. the new connection could not be opened. When every attempt fails, or the request 
+		cannot be retried, the last error is raised. The lock is only held during an attempt, so the 
+		other threads can call the service while this one waits to retry.
+
+		Args:
+			self: instance of the current class.
+			name: it is the name of the service.
+			service_class: it is the type of the service.
+			request: it is the request message.
+			read_only: it is True if the request does not change the ontology.
+
+		Returns:
+			response: the response message of the service.
+
+		"""
+		delay = self.retry_delay
+		for attempt in range(self.max_retries + 1):
+			with self._lock:
+				try:
+					opened = name not in self._proxies
+					proxy = self._connect(name, service_class)
+					start = time.perf_counter()
+					response = proxy(request)
+					self._record(time.perf_counter() - start)
+					return response
+				except rospy.ServiceException as e:
+					self._disconnect(name)
+					error = e
+					# The request may have been executed, unless a new connection could not be opened
+					unsent = opened and any(text in str(e) for text in UNSENT_ERRORS)
+					retry = read_only or unsent
+				except rospy.ROSException as e:
+					# The service is not available (i.e. wait_for_service() timed out), nothing was sent
+					self._disconnect(name)
+					error = e
+					retry = True
+			if not retry or attempt == self.max_retries or rospy.is_shutdown():
+				log_msg = f'Call to {name} failed after {attempt + 1} attempts: {error}'
+				rospy.logerr(anm.tag_log(log_msg, LOG_TAG))
+				raise error
+			log_msg = f'Call to {name} failed ({error}), retrying in {delay} seconds'
+			rospy.logwarn(anm.tag_log(log_msg, LOG_TAG))
+			time.sleep(delay)
+			delay = delay * 2
+
+
+	def _connect(self, name, service_class):
+		"""
+		Method that returns the persistent proxy of a service, opening it if it is not available.
+
+		Args:
+			self: instance of the current class.
+			name: it is the name of the service.
+			service_class: it is the type of the service.
+
+		Returns:
+			proxy: the persistent proxy of the service.
+
+		"""
+		if name not in self._proxies:
+			rospy.wait_for_service(name, timeout=CONNECTION_TIMEOUT)
+			self._proxies[name] = rospy.ServiceProxy(name, service_class, persistent=True)
+			if name in self._opened:
+				self.reconnections += 1
+			self._opened.add(name)
+		return self._proxies[name]
+
+
+	def _disconnect(self, name):
+		"""
+		Method that closes the persistent proxy of a service, if it is open.
+
+		Args:
+			self: instance of the current class.
+			name: it is the name of the service.
+
+		"""
+		proxy = self._proxies.pop(name, None)
+		if proxy is not None:
+			proxy.close()
+
+
+	def _record(self, latency):
+		"""
+		Method that updates the statistics with the latency of a call.
+
+		Args:
+			self: instance of the current class.
+			latency: it is the latency of the call, in seconds.
+
+		"""
+		self.calls += 1
+		self.last_latency = latency
+		self.max_latency = max(self.max_latency, latency)
+		self._total_latency += latency
+		log_msg = f'ARMOR call {self.calls} took {latency * 1000.0:.2f} ms'
+		rospy.logdebug(anm.tag_log(log_msg, LOG_TAG))
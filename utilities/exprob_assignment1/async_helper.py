@@ -0,0 +1,296 @@
+#!/usr/bin/env python
+"""
+.. module:: async_helper
+	:platform: Unix
+	:synopsis: Python module for the asyncio variant of the Helper of the State Machine
+
+.. moduleauthor:: Francesco Ferrazzi <s5262829@studenti.unige.it>
+
+Asyncio variant of the Helper, in which the goals of the action servers, the updates of the ontology
+and the battery low events are awaitables. The coroutines run in an event loop owned by a background
+thread, while the blocking calls of the Helper (i.e. the ROS services and the waits of the action 
+clients) run in the default executor of the loop, so that the loop stays free while they block. The waits for a result can be raced against the battery low
+event, and the goal is cancelled as soon as the battery gets low. The AsyncState adapter lets a
+SMACH state be written as a coroutine.
+"""
+
+import asyncio
+import functools
+import threading
+import rospy
+import smach
+
+# Import constant name defined to structure the architecture.
+from exprob_assignment1 import architecture_name_mapper as anm
+from exprob_assignment1.state_machine_helper import ACTION_TIMEOUT
+
+# A tag for identifying logs producer.
+LOG_TAG = anm.NODE_STATE_MACHINE
+
+
+
+class AsyncHelper:
+	"""
+	Class that wraps the Helper of the state machine, exposing its blocking I/O as coroutines.
+
+	"""
+	def __init__(self, helper):
+		"""
+		Method that initializes the class, starts the event loop in a background thread and
+		registers a listener of the battery status on the Helper.
+
+		Args:
+			self: instance of the current class.
+			helper: instance of the class Helper() allocated in state_machine_helper.py
+
+		"""
+		self.helper = helper
+		self.loop = asyncio.new_event_loop()
+		self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+		self._thread.start()
+		# The event has to be created inside the loop which awaits it
+		self._battery_event = self.run(self._create_battery_event())
+		helper.add_battery_listener(self._battery_changed)
+		rospy.on_shutdown(self.close)
+
+
+	async def _create_battery_event(self):
+		"""
+		Coroutine that creates the event set while the battery is low.
+
+		Args:
+			self: instance of the current class.
+
+		Returns:
+			event: the asyncio event, already set if the battery is low.
+
+		"""
+		event = asyncio.Event()
+		if self.helper.battery_low:
+			event.set()
+		return event
+
+
+	def _battery_changed(self, battery_low):
+		"""
+		It is the listener of the battery status registered on the Helper. It is called by the
+		threads of rospy, so the event is changed by the event loop.
+
+		Args:
+			self: instance of the current class.
+			battery_low: it is the new value of battery_low.
+
+		"""
+		if battery_low:
+			self.loop.call_soon_threadsafe(self._battery_event.set)
+		else:
+			self.loop.call_soon_threadsafe(self._battery_event.clear)
+
+
+	def run(self, coro, timeout=None):
+		"""
+		Method that runs a coroutine in the event loop and blocks the calling thread until its end.
+		It is the bridge used by the SMACH states, which are executed by a thread of SMACH.
+
+		Args:
+			self: instance of the current class.
+			coro: it is the coroutine to run.
+			timeout: longest time to wait for the result, in seconds (None waits forever).
+
+		Returns:
+			result: the value returned by the coroutine.
+
+		"""
+		return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+
+	async def call(self, function, *args):
+		"""
+		Coroutine that executes a blocking function in the executor of the event loop.
+
+		Args:
+			self: instance of the current class.
+			function: it is the function to execute.
+			args: they are the arguments of the function.
+
+		Returns:
+			result: the value returned by the function.
+
+		"""
+		return await self.loop.run_in_executor(None, functools.partial(function, *args))
+
+
+	async def locked(self, function, *args):
+		"""
+		Coroutine that executes a blocking function of the Helper holding its mutex, like the
+		methods called by the synchronous states.
+
+		Args:
+			self: instance of the current class.
+			function: it is the function to execute.
+			args: they are the arguments of the function.
+
+		Returns:
+			result: the value returned by the function.
+
+		"""
+		def _locked():
+			with self.helper.mutex:
+				return function(*args)
+		return await self.call(_locked)
+
+
+	async def result(self, client, timeout=ACTION_TIMEOUT):
+		"""
+		Coroutine that waits until the goal sent by an action client reaches a terminal state.
+		If the coroutine is cancelled, e.g. because the battery got low, the goal is cancelled too.
+
+		Args:
+			self: instance of the current class.
+			client: it is the action client which sent the goal.
+			timeout: longest time to wait for the result.
+
+		Returns:
+			state: the final state of the goal (e.g. GoalStatus.SUCCEEDED, GoalStatus.ABORTED).
+
+		"""
+		try:
+			return await self.call(self.helper.wait_action, client, timeout)
+		except asyncio.CancelledError:
+			client.cancel_goal()
+			raise
+
+
+	async def battery_low(self):
+		"""
+		Coroutine that waits until the battery is low.
+
+		Args:
+			self: instance of the current class.
+
+		"""
+		await self._battery_event.wait()
+
+
+	async def until_battery_low(self, awaitable):
+		"""
+		Coroutine that waits for an awaitable, unless the battery gets low first, in which case
+		the awaitable is cancelled and waited until it stops.
+
+		Args:
+			self: instance of the current class.
+			awaitable: it is the awaitable to wait for.
+
+		Returns:
+			low: Bool value that states if the battery got low.
+			result: the value of the awaitable, or None if it has not finished.
+
+		"""
+		task = asyncio.ensure_future(awaitable)
+		low = asyncio.ensure_future(self.battery_low())
+		done, pending = await asyncio.wait({task, low}, return_when=asyncio.FIRST_COMPLETED)
+		for future in pending:
+			future.cancel()
+		if len(pending) > 0:
+			await asyncio.wait(pending)
+		return low in done, task.result() if task in done else None
+
+
+	async def plan(self):
+		"""
+		Coroutine that requests a plan towards the next location and waits for it.
+
+		Args:
+			self: instance of the current class.
+
+		Returns:
+			state: the final state of the goal of the planner.
+
+		"""
+		await self.call(self.helper.planner)
+		state = await self.result(self.helper.planner_cli)
+		await self.locked(self.helper.check_planner)
+		return state
+
+
+	async def control(self):
+		"""
+		Coroutine that makes the robot follow the last plan and waits until the target is reached,
+		then the ontology is updated. If the coroutine is cancelled during the update, the update is
+		completed before the cancellation is raised, so the position of the robot does not change
+		after the state has ended.
+
+		Args:
+			self: instance of the current class.
+
+		Returns:
+			state: the final state of the goal of the controller.
+
+		"""
+		await self.call(self.helper.controller)
+		state = await self.result(self.helper.controller_cli)
+		update = asyncio.ensure_future(self.locked(self.helper.check_controller))
+		try:
+			await asyncio.shield(update)
+		except asyncio.CancelledError:
+			await update
+			raise
+		return state
+
+
+	def close(self):
+		"""
+		Method that stops the event loop, called when the node is shut down.
+
+		Args:
+			self: instance of the current class.
+
+		"""
+		self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+
+class AsyncState(smach.State):
+	"""
+	Class that adapts a coroutine to a SMACH state: the subclasses implement execute_async(), which
+	is run in the event loop of the AsyncHelper.
+
+	"""
+	def __init__(self, async_helper, outcomes):
+		"""
+		Method that initializes the state.
+
+		Args:
+			self: instance of the current class.
+			async_helper: instance of the class AsyncHelper().
+			outcomes: list of the outcomes of the state.
+
+		"""
+		smach.State.__init__(self, outcomes=outcomes)
+		self._async = async_helper
+		self._helper = async_helper.helper
+
+	def execute(self, userdata):
+		"""
+		Method which is executed by SMACH, it blocks until execute_async() returns.
+
+		Args:
+			self: instance of the current class.
+			userdata: shared variable between the states of the Final State Machine
+
+		Returns:
+			outcome: the outcome returned by execute_async().
+
+		"""
+		return self._async.run(self.execute_async(userdata))
+
+	async def execute_async(self, userdata):
+		"""
+		Coroutine with the behavior of the state, implemented by the subclasses.
+
+		Args:
+			self: instance of the current class.
+			userdata: shared variable between the states of the Final State Machine
+
+		"""
+		raise NotImplementedError
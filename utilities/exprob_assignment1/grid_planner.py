@@ -0,0 +1,446 @@
+#!/usr/bin/env python
+"""
+.. module:: grid_planner
+	:platform: Unix
+	:synopsis: Python module for the A* planner on the occupancy grid of the map
+
+.. moduleauthor:: Francesco Ferrazzi <s5262829@studenti.unige.it>
+
+Motion planning engine of the architecture. The map, i.e. the doors of every location, is drawn in
+the environment as a set of rectangular locations separated by walls:
+
+	- The locations are laid out along a spanning tree of the map rooted in the charging corridor,
+	  visited in breadth first order: every location is a column (one for every depth of the tree)
+	  as tall as the leaves below it, so it touches its parent and all its children.
+	- The walls between two locations sharing a door have an opening in the middle of the wall they
+	  share. The doors between locations that do not touch (e.g. the ones closing a loop of corridors)
+	  are not drawn, since a map is not planar in general.
+
+The layout is rasterized on an occupancy grid and on a cost map, both stored in NumPy arrays, where
+the cells near the walls cost more so that the paths keep away from them. The paths are searched
+with A* on the 8-connected grid, with a binary heap and the octile distance as heuristic, and then
+smoothed by removing the via points that can be skipped with a straight line through free cells.
+The search only depends on the size of the grid, so its latency is bounded by the resolution.
+The legs of a patrol, i.e. the paths between consecutive points, can be planned together: every
+point is moved to a free cell once for the two legs it joins, and the legs repeated in the same
+patrol are searched once.
+"""
+
+import heapq
+import math
+
+import numpy as np
+
+# Define the default size of the cells of the grid, in meters
+RESOLUTION = 0.1
+# Define the width of the openings of the doors, in meters
+DOOR_WIDTH = 1.0
+# Define how far from the walls the cells cost more, in meters, and the extra cost next to a wall
+INFLATION_RADIUS = 0.5
+INFLATION_COST = 4.0
+
+
+
+class MapLayout:
+	"""
+	This class places every location of the map on a rectangle of the environment, so that the
+	locations connected by the spanning tree of the map touch each other.
+
+	"""
+	def __init__(self, location_doors, environment_size, root='E'):
+		"""
+		Function that initializes the class MapLayout.
+
+		Args:
+			self: instance of the current class.
+			location_doors: dictionary with the doors of every location, i.e. {location: [door]}.
+			environment_size: it is the size of the environment, i.e. [x_max, y_max] in meters.
+			root: it is the location placed in the first column, i.e. the charging corridor.
+
+		"""
+		self.size = (float(environment_size[0]), float(environment_size[1]))
+		door_locations = {}
+		for loc, doors in location_doors.items():
+			for door in doors:
+				door_locations.setdefault(door, set()).add(loc)
+		# Pairs of different locations sharing a door, sorted to get the same layout from the same map
+		self.links = sorted({tuple(sorted((a, b))) for locs in door_locations.values() for a in locs for b in locs if a < b})
+		neighbours = {loc: [] for loc in location_doors}
+		for a, b in self.links:
+			neighbours[a].append(b)
+			neighbours[b].append(a)
+		# Visit the map breadth first, every location is a child of the one from which it is reached
+		order = []
+		children = {}
+		depth = {}
+		for start in [root] + sorted(location_doors):
+			if start in depth or start not in location_doors:
+				continue
+			depth[start] = 0
+			order.append(start)
+			children[start] = []
+			frontier = [start]
+			while len(frontier) > 0:
+				next_frontier = []
+				for loc in frontier:
+					for other in sorted(neighbours[loc]):
+						if other not in depth:
+							depth[other] = depth[loc] + 1
+							children[loc].append(other)
+							children[other] = []
+							order.append(other)
+							next_frontier.append(other)
+				frontier = next_frontier
+		# Count the leaves below every location, the children before their parents
+		leaves = {}
+		for loc in reversed(order):
+			leaves[loc] = max(1, sum(leaves[child] for child in children[loc]))
+		# Give to every location the rows of its leaves, in depth first order
+		self.tiles = {}   # Column and rows of every location, i.e. {location: (column, first_row, last_row + 1)}
+		row = 0
+		for loc in order:
+			if depth[loc] > 0:
+				continue
+			stack = [(loc, row)]
+			row += leaves[loc]
+			while len(stack) > 0:
+				loc, first = stack.pop()
+				self.tiles[loc] = (depth[loc], first, first + leaves[loc])
+				for child in children[loc]:
+					stack.append((child, first))
+					first += leaves[child]
+		self.columns = max(depth.values()) + 1 if len(depth) > 0 else 1
+		self.rows = max(row, 1)
+
+	def centre(self, location):
+		"""
+		Method that returns the centre of a location.
+
+		Args:
+			self: instance of the current class.
+			location: it is the name of the location.
+
+		Returns:
+			centre: the coordinates (x, y) of the centre of the location, in meters.
+
+		"""
+		column, first, last = self.tiles[location]
+		return ((column + 0.5) * self.size[0] / self.columns, 0.5 * (first + last) * self.size[1] / self.rows)
+
+
+
+class GridPlanner:
+	"""
+	This class rasterizes the layout of the map on an occupancy grid and plans the paths on it.
+
+	"""
+	def __init__(self, layout, resolution=RESOLUTION):
+		"""
+		Function that initializes the class GridPlanner and builds the grid. The cells are made
+		smaller along the rows or the columns if needed to give at least a free cell to every location.
+
+		Args:
+			self: instance of the current class.
+			layout: it is the instance of MapLayout() to be rasterized.
+			resolution: it is the size of the cells, in meters.
+
+		"""
+		self.layout = layout
+		width, height = layout.size
+		self.resolution = resolution
+		self.width = max(int(math.ceil(width / resolution)), 2 * layout.columns + 1)
+		self.height = max(int(math.ceil(height / resolution)), 2 * layout.rows + 1)
+		self.cell_size = (width / self.width, height / self.height)   # Size of the cells along x and y, in meters
+		# The boundaries of the columns and of the rows are walls, the last ones are the border
+		self._x = [round(c * (self.width - 1) / layout.columns) for c in range(0, layout.columns + 1)]
+		self._y = [round(r * (self.height - 1) / layout.rows) for r in range(0, layout.rows + 1)]
+		self.occupied = np.ones((self.height, self.width), dtype=bool)
+		for column, first, last in layout.tiles.values():
+			self.occupied[self._y[first] + 1:self._y[last], self._x[column] + 1:self._x[column + 1]] = False
+		for a, b in layout.links:
+			self._open_door(layout.tiles[a], layout.tiles[b])
+		# The cost of a cell grows close to the walls, the walls cannot be crossed
+		distance = _wall_distance(self.occupied, self.cell_size)
+		self.cost = 1.0 + INFLATION_COST * np.clip(1.0 - distance / INFLATION_RADIUS, 0.0, 1.0)
+		self.cost[self.occupied] = math.inf
+		# The search works on flat lists, which are faster than the arrays to read one cell at a time
+		self._costs = self.cost.ravel().tolist()
+		w = self.width
+		dx, dy = self.cell_size
+		diagonal = math.hypot(dx, dy)
+		# Every move is (step, length, corner, corner), the corners are the cells a diagonal move passes by
+		self._moves = [(1, dx, 0, 0), (-1, dx, 0, 0), (w, dy, 0, 0), (-w, dy, 0, 0),
+			(w + 1, diagonal, 1, w), (w - 1, diagonal, -1, w), (-w + 1, diagonal, 1, -w), (-w - 1, diagonal, -1, -w)]
+		self._free = None   # Indexes of the free cells, computed the first time a point is on a wall
+		self.expanded = 0   # Number of cells expanded by the last search
+
+	def plan(self, start, target):
+		"""
+		Method that plans a path between two points of the environment.
+
+		Args:
+			self: instance of the current class.
+			start: it is the point (x, y) in which the path starts, in meters.
+			target: it is the point (x, y) in which the path ends, in meters.
+
+		Returns:
+			via_points: list of points (x, y) from the start to the target, None if the target cannot be reached.
+
+		"""
+		return self.plan_legs([start, target])[0]
+
+	def plan_legs(self, points, known=None):
+		"""
+		Method that plans the paths between consecutive points, i.e. the legs of a patrol. The last
+		cell of a leg is the first cell of the next one, and the legs between the same cells are only
+		searched once.
+
+		Args:
+			self: instance of the current class.
+			points: list of the points (x, y) to be reached in order, starting from the first one, in meters.
+			known: dictionary with the paths of the legs which are already known, e.g. from a cache, which
+				are not searched again, i.e. {index of the leg: via_points}.
+
+		Returns:
+			legs: list with the via points (x, y) of every leg, None for the legs whose target cannot be reached.
+
+		"""
+		known = known if known is not None else {}
+		cells = [self._nearest_free(self.cell(*point)) for point in points]
+		searched = {}   # Smoothed via points of the legs searched so far, i.e. {(first, last): via_points}
+		legs = []
+		expanded = 0
+		for i in range(0, len(points) - 1):
+			if i in known:
+				legs.append(known[i])
+				continue
+			key = (cells[i], cells[i + 1])
+			if key not in searched:
+				path = self._search(*key)
+				expanded += self.expanded
+				searched[key] = None if path is None else [self.point(cell) for cell in self._smooth(path)[1:-1]]
+			via_points = searched[key]
+			legs.append(None if via_points is None else [tuple(points[i])] + via_points + [tuple(points[i + 1])])
+		self.expanded = expanded
+		return legs
+
+	def cell(self, x, y):
+		"""
+		Method that returns the cell which contains a point, or the closest one if it is outside.
+
+		Args:
+			self: instance of the current class.
+			x: it is the x coordinate of the point, in meters.
+			y: it is the y coordinate of the point, in meters.
+
+		Returns:
+			cell: the index of the cell in the flat grid.
+
+		"""
+		column = min(max(int(x / self.cell_size[0]), 0), self.width - 1)
+		row = min(max(int(y / self.cell_size[1]), 0), self.height - 1)
+		return row * self.width + column
+
+	def point(self, cell):
+		"""
+		Method that returns the centre of a cell.
+
+		Args:
+			self: instance of the current class.
+			cell: it is the index of the cell in the flat grid.
+
+		Returns:
+			point: the coordinates (x, y) of the centre of the cell, in meters.
+
+		"""
+		row, column = divmod(cell, self.width)
+		return ((column + 0.5) * self.cell_size[0], (row + 0.5) * self.cell_size[1])
+
+	def _open_door(self, tile_a, tile_b):
+		"""
+		Method that opens a door in the wall between two locations, if they touch.
+
+		Args:
+			self: instance of the current class.
+			tile_a: it is the column and the rows of the first location.
+			tile_b: it is the column and the rows of the second location.
+
+		"""
+		(column_a, first_a, last_a), (column_b, first_b, last_b) = sorted((tile_a, tile_b))
+		if column_b == column_a + 1 and first_b < last_a and first_a < last_b:
+			# Opening in the vertical wall, along the rows in common
+			door = max(1, int(round(DOOR_WIDTH / self.cell_size[1])))
+			low, high = self._y[max(first_a, first_b)] + 1, self._y[min(last_a, last_b)]
+			middle = (low + high - min(door, high - low)) // 2
+			self.occupied[middle:middle + min(door, high - low), self._x[column_b]] = False
+		elif column_a == column_b and (last_a == first_b or last_b == first_a):
+			# Opening in the horizontal wall, along the whole column
+			door = max(1, int(round(DOOR_WIDTH / self.cell_size[0])))
+			low, high = self._x[column_a] + 1, self._x[column_a + 1]
+			middle = (low + high - min(door, high - low)) // 2
+			self.occupied[self._y[max(first_a, first_b)], middle:middle + min(door, high - low)] = False
+
+	def _nearest_free(self, cell):
+		"""
+		Method that finds the free cell closest to a cell, e.g. if a point is on a wall.
+
+		Args:
+			self: instance of the current class.
+			cell: it is the index of the cell in the flat grid.
+
+		Returns:
+			cell: the index of the closest free cell.
+
+		"""
+		if self._costs[cell] != math.inf:
+			return cell
+		if self._free is None:
+			self._free = np.argwhere(~self.occupied)
+		free = self._free
+		row, column = divmod(cell, self.width)
+		nearest = free[np.argmin((free[:, 0] - row) ** 2 + (free[:, 1] - column) ** 2)]
+		return int(nearest[0]) * self.width + int(nearest[1])
+
+	def _search(self, start, goal):
+		"""
+		Method that searches the cheapest path between two free cells with A*.
+
+		Args:
+			self: instance of the current class.
+			start: it is the index of the first cell.
+			goal: it is the index of the last cell.
+
+		Returns:
+			path: list with the indexes of the cells of the path, None if there is no path.
+
+		"""
+		costs = self._costs
+		moves = self._moves
+		w = self.width
+		inf = math.inf
+		heappush, heappop = heapq.heappush, heapq.heappop
+		goal_row, goal_column = divmod(goal, w)
+		# Octile distance in meters, i.e. the length of the path if there were no walls
+		dx, dy = self.cell_size
+		shortcut = math.hypot(dx, dy) - dx - dy
+		g = {start: 0.0}
+		g_get = g.get
+		parent = {start: None}
+		heap = [(0.0, 0.0, start)]
+		expanded = 0
+		while len(heap) > 0:
+			_, g_cell, cell = heappop(heap)
+			if g_cell > g[cell]:
+				continue   # the cell has already been reached with a lower cost
+			expanded += 1
+			if cell == goal:
+				self.expanded = expanded
+				path = []
+				while cell is not None:
+					path.append(cell)
+					cell = parent[cell]
+				return path[::-1]
+			for step, length, corner_a, corner_b in moves:
+				other = cell + step
+				cost = costs[other]
+				# The walls cannot be crossed, and the diagonal moves cannot cut their corners
+				if cost == inf or costs[cell + corner_a] == inf or costs[cell + corner_b] == inf:
+					continue
+				g_other = g_cell + length * cost
+				if g_other < g_get(other, inf):
+					g[other] = g_other
+					parent[other] = cell
+					row, column = divmod(other, w)
+					columns, rows = abs(column - goal_column), abs(row - goal_row)
+					heappush(heap, (g_other + columns * dx + rows * dy + shortcut * (columns if columns < rows else rows), g_other, other))
+		self.expanded = expanded
+		return None
+
+	def _smooth(self, path):
+		"""
+		Method that removes the cells of a path which can be skipped, i.e. it keeps the cells in which
+		the direction changes and then skips the ones that can be joined by a straight line.
+
+		Args:
+			self: instance of the current class.
+			path: list with the indexes of the cells of the path.
+
+		Returns:
+			path: list with the indexes of the kept cells, with the same first and last cell.
+
+		"""
+		if len(path) < 3:
+			return path
+		turns = [path[0]]
+		for i in range(1, len(path) - 1):
+			if path[i] - path[i - 1] != path[i + 1] - path[i]:
+				turns.append(path[i])
+		turns.append(path[-1])
+		smoothed = [turns[0]]
+		for i in range(2, len(turns)):
+			if not self._line_free(smoothed[-1], turns[i]):
+				smoothed.append(turns[i - 1])
+		smoothed.append(turns[-1])
+		return smoothed
+
+	def _line_free(self, a, b):
+		"""
+		Method that checks if the straight line between two cells only crosses free cells, without
+		cutting the corners of the walls.
+
+		Args:
+			self: instance of the current class.
+			a: it is the index of the first cell.
+			b: it is the index of the last cell.
+
+		Returns:
+			free: Bool value that states if the line is free.
+
+		"""
+		costs = self._costs
+		w = self.width
+		y0, x0 = divmod(a, w)
+		y1, x1 = divmod(b, w)
+		dx, dy = abs(x1 - x0), -abs(y1 - y0)
+		sx, sy = (1 if x1 > x0 else -1), (1 if y1 > y0 else -1)
+		error = dx + dy
+		while (x0, y0) != (x1, y1):
+			e2 = 2 * error
+			step_x, step_y = e2 >= dy, e2 <= dx
+			if step_x and step_y and (costs[y0 * w + x0 + sx] == math.inf or costs[(y0 + sy) * w + x0] == math.inf):
+				return False
+			if step_x:
+				error += dy
+				x0 += sx
+			if step_y:
+				error += dx
+				y0 += sy
+			if costs[y0 * w + x0] == math.inf:
+				return False
+		return True
+
+
+
+def _wall_distance(occupied, cell_size):
+	"""
+	Function that computes the distance of every cell from the closest wall along its row and its
+	column, which is the distance from the walls of the rectangular locations.
+
+	Args:
+		occupied: it is the boolean array of the walls.
+		cell_size: it is the size of the cells along x and y, in meters.
+
+	Returns:
+		distance: the array of the distances, in meters.
+
+	"""
+	distance = np.full(occupied.shape, math.inf)
+	for axis, size in ((1, cell_size[0]), (0, cell_size[1])):
+		along = np.where(occupied, 0.0, math.inf)
+		lines = np.moveaxis(along, axis, 0)
+		for i in range(1, lines.shape[0]):
+			np.minimum(lines[i], lines[i - 1] + size, out=lines[i])
+		for i in range(lines.shape[0] - 2, -1, -1):
+			np.minimum(lines[i], lines[i + 1] + size, out=lines[i])
+		np.minimum(distance, along, out=distance)
+	return distance
@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+"""
+.. module:: map_generator
+	:platform: Unix
+	:synopsis: Python module for the generation of random maps of any size
+
+.. moduleauthor:: Francesco Ferrazzi <s5262829@studenti.unige.it>
+
+Generator of the indoor environment explored by the robot, given the number of rooms, corridors
+and doors and the way in which the corridors are connected to each other (i.e. the topology):
+
+	- `ring`: every corridor is connected to the previous and to the next one, closing a loop.
+	- `chain`: every corridor is connected to the previous and to the next one.
+	- `star`: every corridor is connected to the charging corridor.
+	- `grid`: the corridors are placed on a square grid and connected to their neighbours.
+	- `random`: the corridors are connected by a random spanning tree.
+
+Every room has a single door towards a corridor, and the rooms are split evenly among the
+corridors. The exceeding doors, if any, connect random pairs of corridors. Since the corridors are
+always connected, the charging corridor can be reached from every location. The default
+parameters (i.e. 4 rooms, 3 corridors, 7 doors and `ring` topology) give the map of the assignment.
+"""
+
+import math
+import random
+
+# Define the topologies that can be generated
+TOPOLOGIES = ('ring', 'chain', 'star', 'grid', 'random')
+
+
+
+def generate_map(number_rooms, number_corridors, number_doors, topology='ring', charge_loc='E', rng=random):
+	"""
+	Function that generates a random map. The names of the rooms (i.e. `R1`, `R2`, ...), corridors
+	(i.e. `C1`, `C2`, ... and the charging corridor) and doors (i.e. `D1`, `D2`, ...) are shuffled,
+	so that every run gives a different map with the same topology.
+
+	Args:
+		number_rooms: it is the number of rooms.
+		number_corridors: it is the number of corridors, including the charging one.
+		number_doors: it is the number of doors, at least one for every room plus the ones needed
+			to connect the corridors.
+		topology: it is the way in which the corridors are connected, one of TOPOLOGIES.
+		charge_loc: it is the name of the charging corridor.
+		rng: it is the random generator (e.g. random.Random(seed) to get the same map every time).
+
+	Returns:
+		rooms: list with the names of the rooms.
+		corridors: list with the names of the corridors, the charging one is the last.
+		doors: list with the names of the doors.
+		location_doors: dictionary with the doors of every location, i.e. {location: [door]}.
+
+	"""
+	if topology not in TOPOLOGIES:
+		raise ValueError(f'Unknown topology {topology}, it should be one of {TOPOLOGIES}')
+	if number_corridors < 1:
+		raise ValueError('The map needs at least the charging corridor')
+	rooms = [f'R{a}' for a in range(1, number_rooms + 1)]
+	corridors = [f'C{c}' for c in range(1, number_corridors)]
+	rng.shuffle(rooms)
+	rng.shuffle(corridors)
+	corridors.append(charge_loc)
+	links = _corridor_links(corridors, topology, rng)
+	needed = number_rooms + len(links)
+	if number_doors < needed:
+		raise ValueError(f'The {topology} map with {number_rooms} rooms and {number_corridors} corridors needs at least {needed} doors')
+	if number_doors > needed and number_corridors < 2:
+		raise ValueError('The exceeding doors need at least two corridors')
+	# Connect the exceeding doors to random pairs of corridors
+	for _ in range(number_doors - needed):
+		links.append(tuple(rng.sample(corridors, 2)))
+	doors = [f'D{b}' for b in range(1, number_doors + 1)]
+	rng.shuffle(doors)
+	location_doors = {loc: [] for loc in rooms + corridors}
+	# Put one door for every room, shared with one of the corridors (not the charging one if possible)
+	hubs = corridors[:-1] if number_corridors > 1 else corridors
+	for d in range(0, number_rooms):
+		location_doors[rooms[d]].append(doors[d])
+		location_doors[hubs[d * len(hubs) // number_rooms]].append(doors[d])
+	# Put the doors in common among the corridors
+	for e, (c1, c2) in enumerate(links, number_rooms):
+		location_doors[c1].append(doors[e])
+		location_doors[c2].append(doors[e])
+	return rooms, corridors, doors, location_doors
+
+
+
+def minimum_doors(number_rooms, number_corridors, topology='ring'):
+	"""
+	Function that computes the number of doors needed by a map, i.e. one for every room plus the
+	ones shared by the corridors according to the topology.
+
+	Args:
+		number_rooms: it is the number of rooms.
+		number_corridors: it is the number of corridors, including the charging one.
+		topology: it is the way in which the corridors are connected, one of TOPOLOGIES.
+
+	Returns:
+		number_doors: the minimum number of doors of the map.
+
+	"""
+	corridors = [f'C{c}' for c in range(0, number_corridors)]
+	return number_rooms + len(_corridor_links(corridors, topology, random.Random(0)))
+
+
+
+def is_connected(location_doors, start):
+	"""
+	Function that checks if every location of a map can be reached from a given one, i.e. if the
+	robot can go back to the charging corridor from every location.
+
+	Args:
+		location_doors: dictionary with the doors of every location, i.e. {location: [door]}.
+		start: it is the name of the location from which the visit starts.
+
+	Returns:
+		connected: Bool value that states if every location is reachable.
+
+	"""
+	door_locations = {}
+	for loc, doors in location_doors.items():
+		for door in doors:
+			door_locations.setdefault(door, []).append(loc)
+	visited = {start}
+	frontier = [start]
+	while len(frontier) > 0:
+		loc = frontier.pop()
+		for door in location_doors[loc]:
+			for other in door_locations[door]:
+				if other not in visited:
+					visited.add(other)
+					frontier.append(other)
+	return len(visited) == len(location_doors)
+
+
+
+def _corridor_links(corridors, topology, rng):
+	"""
+	Function that computes the pairs of corridors sharing a door, according to the topology.
+
+	Args:
+		corridors: list with the names of the corridors, the charging one is the last.
+		topology: it is the way in which the corridors are connected, one of TOPOLOGIES.
+		rng: it is the random generator.
+
+	Returns:
+		links: list of pairs of corridors with a door in common.
+
+	"""
+	n = len(corridors)
+	if n < 2:
+		return []
+	if topology == 'ring':
+		links = [(corridors[i], corridors[i + 1]) for i in range(0, n - 1)]
+		if n > 2:
+			links.append((corridors[0], corridors[-1]))
+		return links
+	if topology == 'chain':
+		# The charging corridor is at one end of the chain
+		return [(corridors[i], corridors[i + 1]) for i in range(0, n - 1)]
+	if topology == 'star':
+		return [(corridors[i], corridors[-1]) for i in range(0, n - 1)]
+	if topology == 'grid':
+		side = math.ceil(math.sqrt(n))
+		links = []
+		for i in range(0, n):
+			if (i + 1) % side != 0 and i + 1 < n:
+				links.append((corridors[i], corridors[i + 1]))
+			if i + side < n:
+				links.append((corridors[i], corridors[i + side]))
+		return links
+	# Random spanning tree: every corridor is connected to one of the previous ones
+	return [(corridors[i], corridors[rng.randrange(0, i)]) for i in range(1, n)]
@@ -0,0 +1,235 @@
+#!/usr/bin/env python
+"""
+.. module:: ontology_cache
+	:platform: Unix
+	:synopsis: Python module for the read-through cache of the ontology queries
+
+.. moduleauthor:: Francesco Ferrazzi <s5262829@studenti.unige.it>
+
+Read-through cache placed in front of the functions that communicate with the ontology. The result
+of the QUERY directives about object properties, data properties and classes of an individual is
+memorized, so that the same question is not sent twice to the ARMOR service if nothing changed in the
+meantime. Every ADD, REPLACE, REMOVE or REASON directive drops only the entries that it can affect.
+
+Since the ontology is loaded with a buffered reasoner, the queries may keep answering with the old
+knowledge until the next REASON. For this reason, the entries affected by a write are dropped both
+when the write is done and again at the following REASON.
+"""
+
+# Define the QUERY specifications that can be cached
+CACHED_SPECS = ('OBJECTPROP', 'DATAPROP', 'CLASS')
+# Define the commands that change the knowledge of the ontology
+WRITE_COMMANDS = ('ADD', 'REPLACE', 'REMOVE', 'DISJOINT', 'LOAD')
+# Define the tag used to identify the entries that store the classes of an individual
+CLASS_TAG = 'CLASS'
+# Define the selector which matches every entry of the cache
+ANY = (None, None)
+
+
+
+class OntologyCache:
+	"""
+	This class implements the cache of the ontology queries. Every entry is identified by the QUERY
+	directive that generated it and it is tagged with the pair (property, individual) it depends on,
+	where the property is CLASS_TAG for the queries of the classes of an individual.
+
+	"""
+	def __init__(self):
+		"""
+		Function that initializes the class OntologyCache.
+
+		Args:
+			self: instance of the current class.
+
+		"""
+		self.enabled = True        # Set to False to send every query to the ontology
+		self.hits = 0              # Number of queries answered by the cache
+		self.misses = 0            # Number of queries sent to the ontology
+		self.invalidations = 0     # Number of entries dropped by a write or a REASON
+		self._entries = {}         # Entries grouped by tag, i.e. {(property, individual): {key: result}}
+		self._pending = set()      # Selectors of the writes done since the last REASON
+
+
+	def lookup_batch(self, directives):
+		"""
+		Method that retrieves from the cache the result of the QUERY directives of a list. A cached
+		result is not used if a previous directive of the same list may change it, since the list is
+		executed in order by the ontology.
+
+		Args:
+			self: instance of the current class.
+			directives: list of tuples (command, primary_command_spec, secondary_command_spec, ARGS).
+
+		Returns:
+			results: list with the cached result of every directive, `None` if the directive has to
+				be sent to the ontology.
+
+		"""
+		results = [None] * len(directives)
+		if not self.enabled:
+			return results
+		blocked = set()
+		for i, (command, primary_command_spec, secondary_command_spec, ARGS) in enumerate(directives):
+			if command == 'QUERY':
+				tag, key = self._key(primary_command_spec, secondary_command_spec, ARGS)
+				if key is None:
+					continue
+				entry = self._entries.get(tag, {}).get(key)
+				if entry is not None and not self._matches(tag, blocked):
+					self.hits += 1
+					results[i] = list(entry)
+				else:
+					self.misses += 1
+			elif command == 'REASON':
+				blocked |= self._pending
+			elif command in WRITE_COMMANDS:
+				blocked.update(self._selectors(command, primary_command_spec, ARGS))
+		return results
+
+
+	def update_batch(self, directives, results):
+		"""
+		Method that updates the cache with the outcome of a list of directives executed by the
+		ontology. The directives are processed in order: the results of the queries are stored,
+		while the writes and the REASON drop the entries that they affect.
+
+		Args:
+			self: instance of the current class.
+			directives: list of tuples (command, primary_command_spec, secondary_command_spec, ARGS).
+			results: list with the queried objects of every directive.
+
+		"""
+		if not self.enabled:
+			return
+		for (command, primary_command_spec, secondary_command_spec, ARGS), result in zip(directives, results):
+			if command == 'QUERY':
+				tag, key = self._key(primary_command_spec, secondary_command_spec, ARGS)
+				if key is not None and result is not None:
+					self._entries.setdefault(tag, {})[key] = list(result)
+			elif command == 'REASON':
+				self._drop(self._pending)
+				self._pending = set()
+			elif command in WRITE_COMMANDS:
+				selectors = self._selectors(command, primary_command_spec, ARGS)
+				self._drop(selectors)
+				self._pending.update(selectors)
+
+
+	def clear(self):
+		"""
+		Method that drops every entry of the cache, e.g. when a new ontology is loaded.
+
+		Args:
+			self: instance of the current class.
+
+		"""
+		self._drop([ANY])
+		self._pending = set()
+
+
+	def stats(self):
+		"""
+		Method that returns the counters of the cache, which can be used to tune it.
+
+		Args:
+			self: instance of the current class.
+
+		Returns:
+			stats: dictionary with the hits, misses, hit ratio, invalidations and size of the cache.
+
+		"""
+		total = self.hits + self.misses
+		return {'hits': self.hits,
+			'misses': self.misses,
+			'hit_ratio': self.hits / total if total > 0 else 0.0,
+			'invalidations': self.invalidations,
+			'entries': sum(len(group) for group in self._entries.values())}
+
+
+	def _key(self, primary_command_spec, secondary_command_spec, ARGS):
+		"""
+		Method that computes the tag and the key of a QUERY directive.
+
+		Args:
+			self: instance of the current class.
+			primary_command_spec: it is the primary command specification of the query.
+			secondary_command_spec: it is the secondary command specification of the query.
+			ARGS: it is the list of arguments of the query.
+
+		Returns:
+			tag: pair (property, individual) on which the result of the query depends.
+			key: key of the query inside the cache, `None` if the query cannot be cached.
+
+		"""
+		if primary_command_spec not in CACHED_SPECS or secondary_command_spec != 'IND':
+			return None, None
+		key = (primary_command_spec, secondary_command_spec, tuple(ARGS))
+		if primary_command_spec == 'CLASS':
+			return (CLASS_TAG, ARGS[0]), key
+		return (ARGS[0], ARGS[1]), key
+
+
+	def _selectors(self, command, primary_command_spec, ARGS):
+		"""
+		Method that computes which entries can be affected by a write in the ontology. A selector
+		is a pair (property, individual) where `None` matches any value. Beside the written property,
+		the facts inferred by the rules of the ontology from that property are selected as well:
+		`connectedTo` and `canReach` derive from `hasDoor` and `isIn`, while the classes of a location
+		(e.g. URGENT, CORRIDOR) derive from `hasDoor`, `visitedAt`, `now` and `urgencyThreshold`.
+
+		Args:
+			self: instance of the current class.
+			command: it is the command of the write (e.g. ADD, REPLACE, ...).
+			primary_command_spec: it is the primary command specification of the write.
+			ARGS: it is the list of arguments of the write.
+
+		Returns:
+			selectors: set of selectors of the affected entries.
+
+		"""
+		if command not in ('ADD', 'REPLACE', 'REMOVE') or primary_command_spec not in ('OBJECTPROP', 'DATAPROP'):
+			return {ANY}
+		prop, individual = ARGS[0], ARGS[1]
+		selectors = {(prop, individual)}
+		if prop == 'hasDoor':
+			selectors |= {('connectedTo', None), ('canReach', None), (CLASS_TAG, individual)}
+		elif prop == 'isIn':
+			selectors |= {('canReach', individual), (CLASS_TAG, individual)}
+		elif prop == 'visitedAt':
+			selectors |= {(CLASS_TAG, individual)}
+		elif prop in ('now', 'urgencyThreshold'):
+			selectors |= {(CLASS_TAG, None)}
+		return selectors
+
+
+	def _matches(self, tag, selectors):
+		"""
+		Method that checks if a tag is matched by at least one selector.
+
+		Args:
+			self: instance of the current class.
+			tag: pair (property, individual) of an entry.
+			selectors: iterable of selectors.
+
+		Returns:
+			matched: Bool value that states if the tag is selected.
+
+		"""
+		for prop, individual in selectors:
+			if (prop is None or prop == tag[0]) and (individual is None or individual == tag[1]):
+				return True
+		return False
+
+
+	def _drop(self, selectors):
+		"""
+		Method that drops the entries matched by the given selectors.
+
+		Args:
+			self: instance of the current class.
+			selectors: iterable of selectors.
+
+		"""
+		for tag in [tag for tag in self._entries if self._matches(tag, selectors)]:
+			self.invalidations += len(self._entries[tag])
+			del self._entries[tag]
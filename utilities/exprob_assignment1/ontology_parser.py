@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+"""
+.. module:: ontology_parser
+	:platform: Unix
+	:synopsis: Python module for the parser of the objects queried from the ontology
+
+.. moduleauthor:: Francesco Ferrazzi <s5262829@studenti.unige.it>
+
+Parser of the `queried_objects` returned by ARMOR, which are either IRIs of individuals and classes,
+e.g. `<http://bnc/exp-rob-lab/2022-23#R1>`, or typed literals, e.g. `"1665579740"^^xsd:long`.
+Instead of cutting the strings at fixed positions, which silently gives wrong names if the IRI
+changes, the IRIs are matched by a compiled regular expression and the literals are split at their
+closing quote. The names are interned and memorized, so the same IRI is parsed only once and its
+name can be compared by identity, while the literals are converted to the Python type of their
+datatype (e.g. the timestamps become `int`).
+"""
+
+import re
+import sys
+
+# Define the pattern of an IRI, the name is what follows the last '#' or '/'
+IRI_PATTERN = re.compile(r'<(?P<iri>[^>]*[#/])(?P<name>[^#/>]+)>')
+# Define the conversion of the datatypes of the literals
+CONVERTERS = {
+	'xsd:long': int,
+	'xsd:int': int,
+	'xsd:integer': int,
+	'xsd:short': int,
+	'xsd:nonNegativeInteger': int,
+	'xsd:double': float,
+	'xsd:float': float,
+	'xsd:decimal': float,
+	'xsd:boolean': lambda value: value == 'true',
+}
+
+# Memorize the name of every IRI already parsed
+_names = {}
+
+
+
+def parse_name(queried_object):
+	"""
+	Function that returns the name of an individual or a class from its IRI. A string which is not
+	an IRI is returned as it is.
+
+	Args:
+		queried_object: it is the object queried from the ontology, e.g. `<http://bnc/exp-rob-lab/2022-23#R1>`.
+
+	Returns:
+		name: the interned name of the IRI, e.g. `R1`.
+
+	"""
+	name = _names.get(queried_object)
+	if name is None:
+		match = IRI_PATTERN.fullmatch(queried_object)
+		name = sys.intern(match.group('name') if match is not None else queried_object)
+		_names[queried_object] = name
+	return name
+
+
+
+def parse_names(queried_objects):
+	"""
+	Function that returns the names of a list of IRIs.
+
+	Args:
+		queried_objects: list of objects queried from the ontology.
+
+	Returns:
+		names: list with the interned names of the IRIs.
+
+	"""
+	names = _names
+	return [names.get(obj) or parse_name(obj) for obj in queried_objects]
+
+
+
+def parse_literal(queried_object):
+	"""
+	Function that returns the value of a typed literal, converted to the Python type of its
+	datatype. Literals with an unknown datatype are returned as strings.
+
+	Args:
+		queried_object: it is the object queried from the ontology, e.g. `"1665579740"^^xsd:long`.
+
+	Returns:
+		value: the value of the literal, e.g. `1665579740`.
+
+	Raises:
+		ValueError: if the object is not a literal.
+
+	"""
+	head, separator, datatype = queried_object.rpartition('"^^')
+	if separator:
+		value = head[1:]
+	elif len(queried_object) >= 2 and queried_object[-1] == '"':
+		value, datatype = queried_object[1:-1], None
+	else:
+		value = None
+	if value is None or queried_object[0] != '"':
+		raise ValueError(f'{queried_object} is not a literal')
+	converter = CONVERTERS.get(datatype)
+	return converter(value) if converter is not None else value
+
+
+
+def parse_literals(queried_objects):
+	"""
+	Function that returns the values of a list of typed literals.
+
+	Args:
+		queried_objects: list of objects queried from the ontology.
+
+	Returns:
+		values: list with the values of the literals.
+
+	"""
+	return [parse_literal(obj) for obj in queried_objects]
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+"""
+.. module:: plan_cache
+	:platform: Unix
+	:synopsis: Python module for the cache of the paths of the planner
+
+.. moduleauthor:: Francesco Ferrazzi <s5262829@studenti.unige.it>
+
+Bounded cache of the paths computed by the planner. Since the robot moves among the same locations,
+the same paths are requested many times, so the least recently used ones are kept. Every path expires
+after a time to live, measured with the ROS time, and the whole cache is dropped when the map changes.
+"""
+
+import rospy
+from collections import OrderedDict
+
+# Define the default number of paths kept in the cache and the time after which they expire, in seconds
+CACHE_SIZE = 128
+CACHE_TTL = 60.0
+
+
+
+class PlanCache:
+	"""
+	This class implements a bounded cache of the paths with least recently used eviction. Every entry
+	expires after a time to live, measured with the ROS time.
+	
+	"""
+	def __init__(self, capacity=CACHE_SIZE, ttl=CACHE_TTL):
+		""" 
+		Function that initializes the class PlanCache.
+		
+		Args:
+			self: instance of the current class.
+			capacity: it is the largest number of entries, the cache is disabled if it is not positive.
+			ttl: it is the time after which an entry expires in seconds, the entries never expire if it is not positive.
+		
+		"""
+		self.capacity = capacity
+		self.ttl = ttl
+		self.hits = 0                  # Number of paths found in the cache
+		self.misses = 0                # Number of paths not found in the cache
+		self.evictions = 0             # Number of entries dropped to make room for the new ones
+		self.expirations = 0           # Number of entries dropped since they expired
+		self.invalidations = 0         # Number of entries dropped since the map changed
+		self._entries = OrderedDict()  # Paths from the least to the most recently used, i.e. {key: (time, path)}
+	
+	
+	def lookup(self, key):
+		""" 
+		Method that retrieves a path from the cache and marks it as the most recently used.
+		
+		Args:
+			self: instance of the current class.
+			key: it is the key of the path.
+			
+		Returns:
+			path: the cached path, None if it is not in the cache or it expired.
+		
+		"""
+		if self.capacity <= 0:
+			return None
+		entry = self._entries.get(key)
+		if entry is not None and self.ttl > 0 and rospy.get_time() - entry[0] > self.ttl:
+			del self._entries[key]
+			self.expirations += 1
+			entry = None
+		if entry is None:
+			self.misses += 1
+			return None
+		self._entries.move_to_end(key)
+		self.hits += 1
+		return entry[1]
+	
+	
+	def store(self, key, path):
+		""" 
+		Method that adds a path to the cache, dropping the least recently used one if it is full.
+		
+		Args:
+			self: instance of the current class.
+			key: it is the key of the path.
+			path: it is the path.
+		
+		"""
+		if self.capacity <= 0:
+			return
+		self._entries[key] = (rospy.get_time(), path)
+		self._entries.move_to_end(key)
+		while len(self._entries) > self.capacity:
+			self._entries.popitem(last=False)
+			self.evictions += 1
+	
+	
+	def clear(self):
+		""" 
+		Method that drops every entry of the cache, e.g. when the map changes.
+		
+		Args:
+			self: instance of the current class.
+		
+		"""
+		self.invalidations += len(self._entries)
+		self._entries.clear()
+	
+	
+	def stats(self):
+		""" 
+		Method that returns the counters of the cache, which can be used to tune it.
+		
+		Args:
+			self: instance of the current class.
+			
+		Returns:
+			stats: dictionary with the hits, misses, hit ratio, dropped entries and size of the cache.
+		
+		"""
+		total = self.hits + self.misses
+		return {'hits': self.hits,
+			'misses': self.misses,
+			'hit_ratio': self.hits / total if total > 0 else 0.0,
+			'evictions': self.evictions,
+			'expirations': self.expirations,
+			'invalidations': self.invalidations,
+			'entries': len(self._entries)}
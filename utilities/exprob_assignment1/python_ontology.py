@@ -0,0 +1,407 @@
+#!/usr/bin/env python
+"""
+.. module:: python_ontology
+	:platform: Unix
+	:synopsis: Python module for the in-process ontology backend
+
+.. moduleauthor:: Francesco Ferrazzi <s5262829@studenti.unige.it>
+
+In-process ontology backend which can be used instead of the ARMOR service. It loads the
+topological_map.owl file, keeps the Abox in Python dictionaries and evaluates natively the rules of
+the ontology that are used by this architecture:
+
+	- Connectability: two different locations with a door in common are `connectedTo` each other.
+	- Reachability: a robot `isIn` a location `canReach` every location connected to it.
+	- Urgency: a location is URGENT if `now - visitedAt > urgencyThreshold` for a robot.
+
+The locations are also classified as LOCATION (exactly one `visitedAt`), ROOM (at least one door)
+and CORRIDOR (at least two doors), according to the Tbox.
+The backend accepts the same directives of ARMOR (e.g. LOAD, ADD, REPLACE, REASON, QUERY) and
+formats the queried objects in the same way, so it can be plugged under the ontology_manager.
+As for the buffered reasoner used with ARMOR, the inferred knowledge is updated only by a REASON.
+"""
+
+import threading
+import xml.etree.ElementTree as ET
+
+# Define the name spaces used in the OWL files
+RDF = 'http://www.w3.org/1999/02/22-rdf-syntax-ns#'
+OWL = 'http://www.w3.org/2002/07/owl#'
+XSD = 'http://www.w3.org/2001/XMLSchema#'
+# Define the properties inferred by the rules of the ontology
+INFERRED_PROPERTIES = ('connectedTo', 'canReach')
+
+
+
+class PythonOntology:
+	"""
+	This class implements an ontology that lives inside the process that uses it. The asserted
+	knowledge is stored in dictionaries indexed by individual, while the inferred knowledge is
+	computed by the REASON directive.
+
+	"""
+	def __init__(self):
+		"""
+		Function that initializes the class PythonOntology.
+
+		Args:
+			self: instance of the current class.
+
+		"""
+		self.iri = ''                 # IRI of the loaded ontology
+		self._objects = {}            # Asserted object properties, i.e. {individual: {property: [individuals]}}
+		self._data = {}               # Asserted data properties, i.e. {individual: {property: [(value, type)]}}
+		self._types = {}              # Asserted classes, i.e. {individual: [classes]}
+		self._inferred_objects = {}   # Inferred object properties, i.e. {individual: {property: [individuals]}}
+		self._inferred_types = {}     # Inferred classes, i.e. {individual: [classes]}
+		self._lock = threading.Lock() # Mutex to serialize the directives coming from different threads
+
+
+	def call(self, command, primary_command_spec, secondary_command_spec, ARGS):
+		"""
+		Method that executes a directive with the same syntax used by the ARMOR service.
+
+		Args:
+			self: instance of the current class.
+			command: it is the command to execute (e.g. ADD, LOAD, ...).
+			primary_command_spec: it is the primary command specification (optional).
+			secondary_command_spec: it is the secondary command specification (optional).
+			ARGS: it is the list of arguments (e.g. list of individuals to add).
+
+		Returns:
+			queried_objects: it returns a list of queried objects formatted as ARMOR does.
+
+		"""
+		with self._lock:
+			return self._execute(command, primary_command_spec, secondary_command_spec, ARGS)
+
+
+	def call_batch(self, directives):
+		"""
+		Method that executes a list of directives in the given order.
+
+		Args:
+			self: instance of the current class.
+			directives: list of tuples (command, primary_command_spec, secondary_command_spec, ARGS).
+
+		Returns:
+			queried_objects: list with the queried objects of every directive.
+
+		"""
+		with self._lock:
+			return [self._execute(*directive) for directive in directives]
+
+
+	def _execute(self, command, primary_command_spec, secondary_command_spec, ARGS):
+		"""
+		Method that dispatches a directive to the method that implements it.
+
+		Args:
+			self: instance of the current class.
+			command: it is the command to execute (e.g. ADD, LOAD, ...).
+			primary_command_spec: it is the primary command specification (optional).
+			secondary_command_spec: it is the secondary command specification (optional).
+			ARGS: it is the list of arguments (e.g. list of individuals to add).
+
+		Returns:
+			queried_objects: it returns a list of queried objects formatted as ARMOR does.
+
+		"""
+		if command == 'LOAD':
+			self.load(ARGS[0], ARGS[1])
+		elif command == 'REASON':
+			self.reason()
+		elif command == 'DISJOINT':
+			# Individuals with different names are always considered different
+			pass
+		elif command in ('ADD', 'REMOVE', 'REPLACE') and primary_command_spec in ('OBJECTPROP', 'DATAPROP'):
+			self._write(command, primary_command_spec, ARGS)
+		elif command == 'ADD' and primary_command_spec == 'IND' and secondary_command_spec == 'CLASS':
+			self._add_value(self._types, ARGS[0], None, ARGS[1])
+		elif command == 'QUERY' and primary_command_spec == 'OBJECTPROP':
+			return [self._format_individual(ind) for ind in self.object_values(ARGS[0], ARGS[1])]
+		elif command == 'QUERY' and primary_command_spec == 'DATAPROP':
+			return [self._format_literal(value, datatype) for value, datatype in self._data.get(ARGS[1], {}).get(ARGS[0], [])]
+		elif command == 'QUERY' and primary_command_spec == 'CLASS':
+			only_direct = len(ARGS) > 1 and ARGS[1] == 'true'
+			return [self._format_individual(cls) for cls in self.classes(ARGS[0], only_direct)]
+		elif command == 'QUERY' and primary_command_spec == 'IND' and secondary_command_spec == 'CLASS':
+			return [self._format_individual(ind) for ind in self.individuals(ARGS[0])]
+		else:
+			raise ValueError(f'Directive not supported by the Python ontology: {command} {primary_command_spec} {secondary_command_spec}')
+		return []
+
+
+	def load(self, file_path, iri):
+		"""
+		Method that loads the individuals of an OWL file written in RDF/XML, as the ones saved by
+		Protege or ARMOR. The Tbox is assumed to be the one of topological_map.owl, whose rules are
+		implemented by the reason() method.
+
+		Args:
+			self: instance of the current class.
+			file_path: it is the path of the OWL file.
+			iri: it is the IRI of the ontology.
+
+		"""
+		self.iri = iri
+		self._objects, self._data, self._types = {}, {}, {}
+		prefix = '{' + iri + '#}'
+		for individual in ET.parse(file_path).getroot().iter(f'{{{OWL}}}NamedIndividual'):
+			name = self._short(individual.get(f'{{{RDF}}}about'))
+			self._types.setdefault(name, [])
+			for assertion in individual:
+				if not assertion.tag.startswith(prefix):
+					if assertion.tag == f'{{{RDF}}}type':
+						self._add_value(self._types, name, None, self._short(assertion.get(f'{{{RDF}}}resource')))
+					continue
+				prop = assertion.tag[len(prefix):]
+				if assertion.get(f'{{{RDF}}}resource') is not None:
+					self._add_value(self._objects, name, prop, self._short(assertion.get(f'{{{RDF}}}resource')))
+				else:
+					datatype = self._short(assertion.get(f'{{{RDF}}}datatype', XSD + 'string'))
+					self._add_value(self._data, name, prop, (assertion.text, datatype))
+		self.reason()
+
+
+	def reason(self):
+		"""
+		Method that updates the inferred knowledge by applying the rules of the ontology to the
+		asserted knowledge.
+
+		Args:
+			self: instance of the current class.
+
+		"""
+		locations = [ind for ind, props in self._data.items() if len(props.get('visitedAt', [])) == 1]
+		location_set = set(locations)
+		robots = [ind for ind, props in self._objects.items()
+			if len([loc for loc in props.get('isIn', []) if loc in location_set]) == 1]
+		doors = {door for props in self._objects.values() for door in props.get('hasDoor', [])}
+		inferred_objects = {}
+		inferred_types = {ind: list(classes) for ind, classes in self._types.items()}
+		# Classify doors, robots and locations
+		for door in doors:
+			self._add_unique(inferred_types, door, 'DOOR')
+		for robot in robots:
+			self._add_unique(inferred_types, robot, 'ROBOT')
+		for loc in locations:
+			self._add_unique(inferred_types, loc, 'LOCATION')
+			loc_doors = [door for door in self._objects.get(loc, {}).get('hasDoor', []) if door in doors]
+			if len(loc_doors) >= 1:
+				self._add_unique(inferred_types, loc, 'ROOM')
+			if len(set(loc_doors)) >= 2:
+				self._add_unique(inferred_types, loc, 'CORRIDOR')
+		# Connectability: locations with a door in common are connected
+		door_locations = {}
+		for loc in locations:
+			for door in self._objects.get(loc, {}).get('hasDoor', []):
+				door_locations.setdefault(door, []).append(loc)
+		for door in doors:
+			for l1 in door_locations.get(door, []):
+				for l2 in door_locations.get(door, []):
+					if l1 != l2:
+						self._add_unique(inferred_objects.setdefault(l1, {}), 'connectedTo', l2)
+		# Reachability: a robot can reach the locations connected to the one in which it is
+		for robot in robots:
+			l1 = [loc for loc in self._objects[robot]['isIn'] if loc in location_set][0]
+			for l2 in inferred_objects.get(l1, {}).get('connectedTo', []):
+				self._add_unique(inferred_objects.setdefault(robot, {}), 'canReach', l2)
+		# Urgency: locations not visited for more than the threshold of a robot are urgent
+		for robot in robots:
+			now = self._long(robot, 'now')
+			threshold = self._long(robot, 'urgencyThreshold')
+			if now is None or threshold is None:
+				continue
+			for loc in locations:
+				if now - self._long(loc, 'visitedAt') > threshold:
+					self._add_unique(inferred_types, loc, 'URGENT')
+		self._inferred_objects = inferred_objects
+		self._inferred_types = inferred_types
+
+
+	def object_values(self, prop, individual):
+		"""
+		Method that returns the values of an object property of an individual. The properties
+		defined by the rules are retrieved from the inferred knowledge.
+
+		Args:
+			self: instance of the current class.
+			prop: it is the name of the object property.
+			individual: it is the name of the individual.
+
+		Returns:
+			values: list with the names of the individuals related through the property.
+
+		"""
+		source = self._inferred_objects if prop in INFERRED_PROPERTIES else self._objects
+		return list(source.get(individual, {}).get(prop, []))
+
+
+	def classes(self, individual, only_direct=False):
+		"""
+		Method that returns the classes of an individual according to the last REASON.
+
+		Args:
+			self: instance of the current class.
+			individual: it is the name of the individual.
+			only_direct: if True, the super classes implied by a more specific one are omitted.
+
+		Returns:
+			classes: list with the names of the classes of the individual.
+
+		"""
+		classes = list(self._inferred_types.get(individual, []))
+		if only_direct:
+			# CORRIDOR is a sub class of ROOM that is a sub class of LOCATION, as URGENT
+			implied = set()
+			if 'CORRIDOR' in classes:
+				implied.add('ROOM')
+			if 'ROOM' in classes or 'URGENT' in classes:
+				implied.add('LOCATION')
+			classes = [cls for cls in classes if cls not in implied]
+		return classes
+
+
+	def individuals(self, cls):
+		"""
+		Method that returns the individuals belonging to a class according to the last REASON.
+
+		Args:
+			self: instance of the current class.
+			cls: it is the name of the class.
+
+		Returns:
+			individuals: list with the names of the individuals of the class.
+
+		"""
+		return [ind for ind, classes in self._inferred_types.items() if cls in classes]
+
+
+	def _write(self, command, primary_command_spec, ARGS):
+		"""
+		Method that adds, removes or replaces the value of a property of an individual.
+		The arguments follow the ARMOR syntax, i.e. [prop, individual, value, old_value] for the object
+		properties and [prop, individual, type, value, old_value] for the data properties.
+
+		Args:
+			self: instance of the current class.
+			command: it is the command to execute (i.e. ADD, REMOVE or REPLACE).
+			primary_command_spec: it is OBJECTPROP or DATAPROP.
+			ARGS: it is the list of arguments of the directive.
+
+		"""
+		prop, individual = ARGS[0], ARGS[1]
+		if primary_command_spec == 'OBJECTPROP':
+			store, value = self._objects, ARGS[2]
+			old_value = ARGS[3] if command == 'REPLACE' else value
+		else:
+			store, value = self._data, (ARGS[3], 'xsd:' + ARGS[2].lower())
+			old_value = (ARGS[4], value[1]) if command == 'REPLACE' else value
+		values = store.setdefault(individual, {}).setdefault(prop, [])
+		if command in ('REMOVE', 'REPLACE'):
+			if primary_command_spec == 'DATAPROP':
+				values[:] = [v for v in values if v[0] != old_value[0]]
+			elif old_value in values:
+				values.remove(old_value)
+		if command in ('ADD', 'REPLACE'):
+			self._add_unique(store.setdefault(individual, {}), prop, value)
+
+
+	def _long(self, individual, prop):
+		"""
+		Method that returns the first value of a data property as an integer.
+
+		Args:
+			self: instance of the current class.
+			individual: it is the name of the individual.
+			prop: it is the name of the data property.
+
+		Returns:
+			value: the integer value of the property, `None` if it is not defined.
+
+		"""
+		values = self._data.get(individual, {}).get(prop, [])
+		return int(values[0][0]) if len(values) > 0 else None
+
+
+	def _add_value(self, store, individual, prop, value):
+		"""
+		Method that appends a value to the list of an individual, or of one of its properties.
+
+		Args:
+			self: instance of the current class.
+			store: dictionary indexed by individual.
+			individual: it is the name of the individual.
+			prop: it is the name of the property, `None` if the store holds lists of classes.
+			value: it is the value to append.
+
+		"""
+		if prop is None:
+			self._add_unique(store, individual, value)
+		else:
+			self._add_unique(store.setdefault(individual, {}), prop, value)
+
+
+	def _add_unique(self, store, key, value):
+		"""
+		Method that appends a value to the list stored at a key, if it is not already there.
+
+		Args:
+			self: instance of the current class.
+			store: dictionary of lists.
+			key: key of the list.
+			value: it is the value to append.
+
+		"""
+		values = store.setdefault(key, [])
+		if value not in values:
+			values.append(value)
+
+
+	def _short(self, iri):
+		"""
+		Method that returns the short name of an IRI, i.e. what follows the '#'.
+
+		Args:
+			self: instance of the current class.
+			iri: it is the full IRI.
+
+		Returns:
+			name: the short name of the IRI.
+
+		"""
+		if iri.startswith(XSD):
+			return 'xsd:' + iri[len(XSD):]
+		return iri.rsplit('#', 1)[-1]
+
+
+	def _format_individual(self, name):
+		"""
+		Method that formats the name of an individual or of a class as ARMOR does.
+
+		Args:
+			self: instance of the current class.
+			name: it is the short name.
+
+		Returns:
+			iri: the full IRI between angle brackets.
+
+		"""
+		return f'<{self.iri}#{name}>'
+
+
+	def _format_literal(self, value, datatype):
+		"""
+		Method that formats a typed literal as ARMOR does.
+
+		Args:
+			self: instance of the current class.
+			value: it is the lexical value of the literal.
+			datatype: it is the short name of the type (e.g. xsd:long).
+
+		Returns:
+			literal: the literal formatted as "value"^^type.
+
+		"""
+		return f'"{value}"^^{datatype}'
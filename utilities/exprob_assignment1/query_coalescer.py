@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+"""
+.. module:: query_coalescer
+	:platform: Unix
+	:synopsis: Python module for the coalescing of the ontology directives sent by many robots
+
+.. moduleauthor:: Francesco Ferrazzi <s5262829@studenti.unige.it>
+
+Ontology backend that wraps another one (e.g. the ArmorClient) and merges the lists of directives
+sent at the same time by different threads, i.e. by the state machines of different robots running
+in the same process, into a single round trip. The lists are queued and sent by a background
+thread: when a list arrives, it waits at most a short window collecting the lists queued in the
+meantime, then sends all of them with a single call_batch() and gives every list its own results.
+The window is cut short as soon as a list of every sender (i.e. every robot) is queued, so a single
+sender never waits. The lists are sent in the same order in which they are queued, and the directives
+of every list keep their order, so the behavior is the same of direct calls done in that order.
+"""
+
+import queue
+import threading
+import time
+
+# Define how long the first list waits at most for the others, in seconds
+COALESCE_WINDOW = 0.002
+
+
+
+class _Request:
+	"""
+	Class that holds a list of directives waiting to be sent and, once sent, its results.
+
+	"""
+	def __init__(self, directives):
+		"""
+		Function that initializes the class _Request.
+
+		Args:
+			self: instance of the current class.
+			directives: list of tuples (command, primary_command_spec, secondary_command_spec, ARGS).
+
+		"""
+		self.directives = directives
+		self.results = None
+		self.error = None
+		self.done = threading.Event()
+
+	def result(self):
+		"""
+		Method that waits until the directives have been executed.
+
+		Args:
+			self: instance of the current class.
+
+		Returns:
+			queried_objects: list with the queried objects of every directive.
+
+		Raises:
+			Exception: the error raised by the backend, if any.
+
+		"""
+		self.done.wait()
+		if self.error is not None:
+			raise self.error
+		return self.results
+
+
+
+class QueryCoalescer:
+	"""
+	This class implements an ontology backend which coalesces the directives of many threads into
+	batched calls of the wrapped backend.
+
+	"""
+	def __init__(self, backend, senders=1, window=COALESCE_WINDOW):
+		"""
+		Function that initializes the class QueryCoalescer.
+
+		Args:
+			self: instance of the current class.
+			backend: it is the backend which executes the directives, e.g. an ArmorClient.
+			senders: it is the number of threads sending directives, e.g. the robots of a fleet.
+			window: it is how long the first list waits at most for the others, in seconds.
+
+		"""
+		self.backend = backend
+		self.senders = senders
+		self.window = window
+		self._queue = queue.Queue()   # Lists of directives waiting to be sent, None to stop
+		self.requests = 0             # Number of lists of directives sent
+		self.round_trips = 0          # Number of calls done to the wrapped backend
+		self._thread = threading.Thread(target=self._run, daemon=True)
+		self._thread.start()
+
+	def call(self, command, primary_command_spec, secondary_command_spec, ARGS):
+		"""
+		Method that executes a single directive, coalesced with the ones of the other threads.
+
+		Args:
+			self: instance of the current class.
+			command: it is the command to execute (e.g. ADD, LOAD, ...).
+			primary_command_spec: it is the primary command specification (optional).
+			secondary_command_spec: it is the secondary command specification (optional).
+			ARGS: it is the list of arguments (e.g. list of individuals to add).
+
+		Returns:
+			queried_objects: it returns a list of queried objects.
+
+		"""
+		return self.call_batch([(command, primary_command_spec, secondary_command_spec, ARGS)])[0]
+
+	def call_batch(self, directives):
+		"""
+		Method that executes a list of directives, coalesced with the ones of the other threads.
+
+		Args:
+			self: instance of the current class.
+			directives: list of tuples (command, primary_command_spec, secondary_command_spec, ARGS).
+
+		Returns:
+			queried_objects: list with the queried objects of every directive, in the same order.
+
+		"""
+		return self.submit(directives).result()
+
+	def submit(self, directives):
+		"""
+		Method that queues a list of directives without waiting for its results. The lists are sent
+		in the same order in which they are queued, so a thread can queue its list while holding a
+		lock and wait for the results after releasing it.
+
+		Args:
+			self: instance of the current class.
+			directives: list of tuples (command, primary_command_spec, secondary_command_spec, ARGS).
+
+		Returns:
+			request: the queued request, whose result() method waits for the queried objects.
+
+		"""
+		request = _Request(directives)
+		self._queue.put(request)
+		return request
+
+	def stats(self):
+		"""
+		Method that returns how many lists of directives have been merged.
+
+		Args:
+			self: instance of the current class.
+
+		Returns:
+			stats: dictionary with the number of requests and round trips.
+
+		"""
+		return {'requests': self.requests, 'round_trips': self.round_trips}
+
+	def close(self):
+		"""
+		Method that closes the wrapped backend, if it can be closed.
+
+		Args:
+			self: instance of the current class.
+
+		"""
+		self._queue.put(None)
+		if hasattr(self.backend, 'close'):
+			self.backend.close()
+
+	def _run(self):
+		"""
+		Method executed by the background thread, which collects the queued lists of directives and
+		sends them until the coalescer is closed.
+
+		Args:
+			self: instance of the current class.
+
+		"""
+		running = True
+		while running:
+			request = self._queue.get()
+			if request is None:
+				return
+			# Wait for the lists of the other threads until one list for every sender is queued or the
+			# window elapses, then send everything queued so far
+			batch = [request]
+			deadline = time.monotonic() + self.window
+			while running:
+				remaining = deadline - time.monotonic()
+				try:
+					if len(batch) < self.senders and remaining > 0:
+						request = self._queue.get(timeout=remaining)
+					else:
+						request = self._queue.get_nowait()
+				except queue.Empty:
+					break
+				if request is None:
+					running = False
+					break
+				batch.append(request)
+			self._send(batch)
+
+	def _send(self, batch):
+		"""
+		Method that sends the lists of directives of many threads in a single call and splits the
+		results among them.
+
+		Args:
+			self: instance of the current class.
+			batch: list of requests to be sent.
+
+		"""
+		directives = [directive for request in batch for directive in request.directives]
+		self.requests += len(batch)
+		try:
+			results = self.backend.call_batch(directives)
+		except Exception as error:
+			for request in batch:
+				request.error = error
+				request.done.set()
+			return
+		self.round_trips += 1
+		start = 0
+		for request in batch:
+			end = start + len(request.directives)
+			request.results = results[start:end]
+			start = end
+			request.done.set()
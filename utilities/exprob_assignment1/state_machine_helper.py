@@ -14,10 +14,13 @@ called in the previously mentioned code is defined in the current node.
 
 Subscribes to:
 	/state/battery_low where the state of the battery is published
+	/state/battery_low_stamp where the time in which the battery got low is published
 	
 Service:
 	/state/recharge to charge the robot
 	/armor_interface_srv to communicate with the ontology
+	/armor_interface_serialized_srv to send many directives to the ontology in a single call
+	(both are not used if the in-process Python ontology is selected through config/ontology_backend)
 	
 Action Service:
 	/motion/planner to make the planner create the desired path
@@ -30,26 +33,42 @@ import rospy
 import rospkg
 import os
 import time
-import sys
 import actionlib
-from threading import Lock
+from threading import Lock, Condition
 from actionlib import SimpleActionClient
+from actionlib_msgs.msg import GoalStatus
 
 # Import used messages defined within the ROS architecture.
-from exprob_assignment1.msg import Point, PlanAction, PlanGoal, ControlAction, ControlGoal
+from exprob_assignment1.msg import Point, PlanAction, PlanGoal, ControlAction, ControlGoal, PatrolPlanAction, PatrolPlanGoal
 #from exprob_assignment1.msg import *
 
 # Import constant name defined to structure the architecture.
 from exprob_assignment1 import architecture_name_mapper as anm
+# Import the cache placed in front of the ontology queries.
+from exprob_assignment1.ontology_cache import OntologyCache
+# Import the in-process ontology that can be used instead of ARMOR.
+from exprob_assignment1.python_ontology import PythonOntology
+# Import the client of the ARMOR service.
+from exprob_assignment1.armor_client import ArmorClient
+# Import the local index of the urgent locations.
+from exprob_assignment1.urgency_tracker import UrgencyTracker, read_long_property
+# Import the local index of the topology of the map.
+from exprob_assignment1.topology_index import TopologyIndex
+# Import the parser of the objects queried from the ontology.
+from exprob_assignment1.ontology_parser import parse_names
+# Import the generator of the Abox of the ontology.
+from exprob_assignment1.abox_generator import write_abox
+# Import the generator of the map.
+from exprob_assignment1.map_generator import generate_map
+# Import the layout of the map, which gives the position of the locations.
+from exprob_assignment1.grid_planner import MapLayout
+# Import the backend which merges the directives of the robots of a fleet.
+from exprob_assignment1.query_coalescer import QueryCoalescer
 
 # Import the messages used by services and publishers.
-from std_msgs.msg import Bool
+from std_msgs.msg import Bool, Header
 from std_srvs.srv import SetBool, SetBoolResponse, SetBoolRequest
 
-# Armor import to work with the ontology
-from armor_msgs.srv import ArmorDirective, ArmorDirectiveRequest, ArmorDirectiveResponse
-from armor_msgs.srv import ArmorDirectiveList, ArmorDirectiveListRequest, ArmorDirectiveListResponse
-
 # A tag for identifying logs producer.
 LOG_TAG = anm.NODE_STATE_MACHINE
 
@@ -60,22 +79,35 @@ assignment_path = rp.get_path('exprob_assignment1')
 # Define the file path in which the ontology is stored
 ONTOLOGY_FILE_PATH = os.path.join(assignment_path, "topological_map", "topological_map.owl")
 ONTOLOGY_FILE_PATH_DEBUG = os.path.join(assignment_path, "topological_map", "topological_map_debug.owl")
+ABOX_FILE_PATH = os.path.join(assignment_path, "topological_map", "topological_map_generated.owl")
 WEB_PATH = 'http://bnc/exp-rob-lab/2022-23'
+# Define the robot of the Tbox, whose properties (e.g. urgencyThreshold) are given to every robot
+TBOX_ROBOT = 'Robot1'
 
-# Initialize and define the client to use armor
-cli_armorontology = rospy.ServiceProxy('/armor_interface_srv', ArmorDirective) 
-# Initialize and define the request message for armor
-armorontology_req = ArmorDirectiveRequest()
+# Initialize and define the cache of the ontology queries
+ontology_cache = OntologyCache()
+# Initialize the ontology backend, i.e. the ARMOR client or the in-process ontology, chosen at the first use
+ontology_backend = None
+# Initialize the metrics which record the calls to the ontology backend, if any
+ontology_metrics = None
 # Initialize and define the arg list to pass to the ontology
 ARGS = []
-# Initialize and define the number of rooms, corridors and doors in the environment
+# Initialize and define the default number of rooms, corridors and doors in the environment
 NUMBER_ROOMS = 4
 NUMBER_CORRIDORS = 3
 NUMBER_DOORS = 7
 # Initialize and define the time for which a robot checks the room
-WAIT_SURVEILLANCE_TIME = rospy.Duration(0.15)
+WAIT_SURVEILLANCE_TIME = rospy.Duration(3.0)
+# Initialize and define the longest time a state waits for an event before checking again its flags, in seconds
+WAIT_EVENT_TIMEOUT = 1.0
 # Define the number for which the state of the action client is done
 DONE = 3 # since the get_state() function returns 3 when the action server achieves the goal
+# Define the longest time to wait for the result of the planner or of the controller
+ACTION_TIMEOUT = rospy.Duration(30.0)
+# Define the delay before planning again the path to the charging station after a failure, doubled at every attempt
+CHARGE_RETRY_DELAY = 0.5
+# Define the longest delay between two attempts to reach the charging station
+CHARGE_RETRY_MAX_DELAY = 8.0
 
 
 
@@ -83,6 +115,8 @@ def ontology_manager(command, primary_command_spec, secondary_command_spec, ARGS
 	""" 
 	Function used to communicate with the ARMOR service to set and retrieve informations of the ontology
 	regarding the environment. This function is used instead of the ARMOR API.
+	Queries already answered are retrieved from the ontology_cache, if nothing changed in the meantime.
+	The directive is executed by the selected ontology_backend, which is the ARMOR client by default.
 		
 	Args:
 		command: it is the command to execute (e.g. ADD, LOAD, ...).
@@ -94,39 +128,168 @@ def ontology_manager(command, primary_command_spec, secondary_command_spec, ARGS
 		armorontology_res: it returns a list of queried objects.
 		
 	"""
-	armorontology_req.armor_request.client_name = 'example'
-	armorontology_req.armor_request.reference_name = 'ontoRef'
-	armorontology_req.armor_request.command = command
-	armorontology_req.armor_request.primary_command_spec = primary_command_spec
-	armorontology_req.armor_request.secondary_command_spec = secondary_command_spec
-	armorontology_req.armor_request.args = ARGS
-	rospy.wait_for_service('/armor_interface_srv')
-	try:
-			armorontology_res = (cli_armorontology(armorontology_req)).armor_response.queried_objects
-			return armorontology_res
-	except rospy.ServiceException as e:
-			print('Service call failed: %s' %e)
-			sys.exit(1)
-			
- 	
-def ontology_format(old_list, start, end):
+	directives = [(command, primary_command_spec, secondary_command_spec, ARGS)]
+	armorontology_res = ontology_cache.lookup_batch(directives)[0]
+	if armorontology_res is None:
+		start = time.perf_counter()
+		armorontology_res = get_ontology_backend().call(command, primary_command_spec, secondary_command_spec, ARGS)
+		if ontology_metrics is not None:
+			ontology_metrics.record_call(time.perf_counter() - start)
+		ontology_cache.update_batch(directives, [armorontology_res])
+	return armorontology_res
+
+
+def ontology_manager_batch(directives):
+	"""
+	Function used to send a list of directives to the ARMOR service in a single round trip, relying on
+	the ArmorDirectiveList service. ARMOR executes the directives in the same order in which they are
+	given, so a QUERY placed after an ADD or a REASON already sees the updated ontology.
+	Queries that can be answered by the ontology_cache are not sent.
+
+	Args:
+		directives: list of tuples (command, primary_command_spec, secondary_command_spec, ARGS), one
+			for every directive, with the same meaning of the arguments of ontology_manager().
+
+	Returns:
+		armorontology_res: it returns a list with the queried objects of every directive, in the same
+			order of the given directives.
+
+	"""
+	armorontology_res = ontology_cache.lookup_batch(directives)
+	to_send = [i for i, res in enumerate(armorontology_res) if res is None]
+	if len(to_send) > 0:
+		start = time.perf_counter()
+		for i, res in zip(to_send, get_ontology_backend().call_batch([directives[i] for i in to_send])):
+			armorontology_res[i] = res
+		if ontology_metrics is not None:
+			ontology_metrics.record_call(time.perf_counter() - start, len(to_send))
+		ontology_cache.update_batch(directives, armorontology_res)
+	return armorontology_res
+
+
+def get_ontology_backend():
+	""" 
+	Function that returns the backend which executes the directives of ontology_manager() and 
+	ontology_manager_batch(). If no backend has been selected, the ARMOR client is created.
+		
+	Returns:
+		ontology_backend: it is the object that executes the directives.
+		
+	"""
+	if ontology_backend is None:
+		set_ontology_backend(ArmorClient())
+	return ontology_backend
+
+
+def set_ontology_metrics(metrics):
 	""" 
-	Function that takes as input a list and returns a new one, which starts from the old one.
-	The new list takes every element of the old list, starting from the index specified by 'start'
-	and finishing at the index specified by 'end'. In this way, only characters and numbers in 
-	indexes that are between 'start' and 'end' will be copied into the new list.
+	Function used to record the number and the latency of the calls done to the ontology backend,
+	e.g. in the metrics of the state which does them.
 		
 	Args:
-		old_list: is the list that needs to be formatted.
-		start: starting list's element index that will be copied to the new list.
-		end: ending list's element index that will be copied to the new list.
+		metrics: it is the object whose method record_call(latency, directives) is called after 
+			every call, e.g. a StateMetrics, or None to stop recording.
+		
+	"""
+	global ontology_metrics
+	ontology_metrics = metrics
 
-	Returns:
-		new_list: is the correctly formatted list.
+
+def set_ontology_backend(backend):
+	""" 
+	Function used to select the backend that executes the directives of ontology_manager() and 
+	ontology_manager_batch(). The backend must implement the methods call() and call_batch(), 
+	as the ArmorClient and the PythonOntology do.
+		
+	Args:
+		backend: it is the object that executes the directives.
 		
 	"""
-	new_list = [num[start:end] for num in old_list]
-	return new_list
+	global ontology_backend
+	ontology_backend = backend
+	ontology_cache.clear()
+
+
+class Fleet:
+	"""
+	This class holds what is shared by the helpers of the robots controlled by the same process, i.e.
+	the ontology backend, the map and the local indexes of the topology and of the urgency. The map is
+	built by the first helper entering the BUILDWORLD state, for every robot of the fleet, while the
+	other helpers wait for it. With more robots, their directives are merged by a QueryCoalescer.
+	
+	"""
+	def __init__(self, robots=(TBOX_ROBOT,)):
+		""" 
+		Function that initializes the class Fleet and selects the ontology backend.
+		
+		Args:
+			self: instance of the current class.
+			robots: list with the names of the robots.
+		
+		"""
+		self.robots = list(robots)
+		self.lock = Lock()                   # Mutex to update the shared indexes and the ontology together
+		self.built = threading.Event()       # Set when the map has been built
+		self._building = False               # Set to True when a helper starts building the map
+		self.rooms = []                      # List of room objects
+		self.doors = []                      # List of door objects
+		self.corridors = []                  # List of corridor objects
+		self.now = None                      # Time in which the map has been built
+		self.layout = None                   # Position of the locations in the environment
+		# Initialize the index of the urgent locations with the threshold defined in the ontology
+		self.urgency = UrgencyTracker(read_long_property(ONTOLOGY_FILE_PATH, TBOX_ROBOT, 'urgencyThreshold'))
+		# Initialize the index of the connections among the locations, filled when the map is built
+		self.topology = TopologyIndex()
+		# Enable or disable the cache of the ontology queries
+		ontology_cache.enabled = rospy.get_param(anm.PARAM_ONTOLOGY_CACHE, True)
+		# Select the ontology backend, i.e. the ARMOR service or the in-process Python ontology
+		if rospy.get_param(anm.PARAM_ONTOLOGY_BACKEND, 'armor') == 'python':
+			backend = PythonOntology()
+			ontology_cache.enabled = False   # the in-process queries are cheaper than the cache bookkeeping
+			log_msg = f'Using the in-process Python ontology instead of ARMOR'
+			rospy.loginfo(anm.tag_log(log_msg, LOG_TAG))
+		else:
+			backend = ArmorClient()
+		if len(self.robots) > 1:
+			# The robots share the connection, their directives are merged in the same round trips
+			backend = QueryCoalescer(backend, len(self.robots))
+			ontology_cache.enabled = False   # the robots move independently, every state is queried locally
+			log_msg = f'Controlling the robots {self.robots} with a single ontology connection'
+			rospy.loginfo(anm.tag_log(log_msg, LOG_TAG))
+		set_ontology_backend(backend)
+		
+	
+	def namespace(self, robot):
+		""" 
+		Get the namespace of the topics, services and actions of a robot, which is empty if there is
+		a single robot (i.e. the names of the single robot architecture are used).
+		
+		Args:
+			self: instance of the current class.
+			robot: it is the name of the robot.
+		
+		Returns:
+			namespace: the namespace of the robot, e.g. `robot2` for `Robot2`.
+		
+		"""
+		return '' if len(self.robots) == 1 else robot.lower()
+		
+	
+	def claim_build(self):
+		""" 
+		Method that tells if the calling helper has to build the map, i.e. if it is the first one.
+		
+		Args:
+			self: instance of the current class.
+		
+		Returns:
+			build: Bool value that states if the map has to be built by the caller.
+		
+		"""
+		with self.lock:
+			build = not self._building
+			self._building = True
+			return build
 
 
 
@@ -134,17 +297,25 @@ class Helper:
 	"""
 	This class is created to decouple the implementation of the Finite State Machine, allowing to have a
 	more readable and cleaner code in the state_machine.py node. This class manages the synchronization 
-	with subscribers, services and action servers to achieve the correct behavior.
+	with subscribers, services and action servers to achieve the correct behavior. Every helper controls
+	a single robot, while the map and the ontology are shared with the other robots of its fleet.
 	
 	"""
-	def __init__(self):
+	def __init__(self, robot=TBOX_ROBOT, fleet=None):
 		""" 
 		Function that initializes the class Helper.
 		
 		Args:
 			self: instance of the current class.
+			robot: it is the name of the robot controlled by the helper.
+			fleet: instance of the class Fleet() shared with the other robots, None for a single robot.
 		
 		"""
+		self.robot = robot
+		self.fleet = fleet if fleet is not None else Fleet([robot])
+		namespace = self.fleet.namespace(robot)
+		# Tag the logs with the name of the robot if there are many of them
+		self.log_tag = LOG_TAG if namespace == '' else f'{LOG_TAG}/{robot}'
 		# Initialize the variables used in the class 
 		self.battery_low = False            # Set to True if the battery of the robot is low
 		self.map_completed = False          # Set to True when the ontology is complete
@@ -157,132 +328,259 @@ class Helper:
 		self._rooms = []                         # List of room objects
 		self._doors = []                         # List of door objects
 		self._corridors = []                     # List of corridor objects
+		self._corridor_set = set()               # Set of corridor objects, for fast membership checks
 		self._locations = []                     # List to store all the locations e.g. rooms + corridors
 		self._viapoints = []                     # List of via points randomically generated by the palnner
+		self.plan_points = []                    # Via points of the plan received so far with the feedback of the planner
+		self.feedback_gaps = 0                   # Number of feedbacks of the planner received after a lost one
 		self.prev_loc = anm.INIT_LOCATION        # Previous location, the robot starts from location 'E'
 		self.next_loc = ''                       # Future location in which the robot will move, starts empty
 		self.charge_loc = anm.CHARGE_LOCATION    # Define the charging location
 		self.target_point = Point()              # Initialize the target point for the planner action service
 		self.current_point = Point()             # Initialize the current point for the planner action service
+		self.layout = None                       # Position of the locations in the environment, known when the map is built
+		
+		self._ontology_dirty = True              # Set to True when the ontology changed since the last REASON
+		self._last_reason_time = 0.0             # ROS time in which the last REASON has been sent
+		self.reason_executed = 0                 # Number of REASON directives sent to the ontology
+		self.reason_skipped = 0                  # Number of REASON directives skipped since nothing changed
+		self.check_period = 0.0                  # Time between two cross-checks of the local indexes with the ontology
+		self._last_check = 0.0                   # ROS time in which the last cross-check has been done
+		self.checks = 0                          # Number of cross-checks done
+		self.check_mismatches = 0                # Number of cross-checks which found differences
+		
+		self.speculative = False                 # Set to True to decide the next location while the robot moves
+		self._speculation = None                 # Provisional decision, i.e. (location, time, decision)
+		self._speculation_id = 0                 # Identifier of the last provisional decision requested
+		self.speculation_hits = 0                # Number of provisional decisions used by the reasoner
+		self.speculation_misses = 0              # Number of provisional decisions discarded by the reasoner
+		self._control_start = 0.0                # ROS time in which the last goal has been sent to the controller
+		self._travel_time = 0.0                  # Estimated time to reach a location after the controller starts
+		self.prefetch = False                    # Set to True to request the next plan while checking a location
+		self._prefetch = None                    # Plan requested in advance, i.e. (location, PlanGoal)
+		self.prefetch_hits = 0                   # Number of prefetched plans used by the planner
+		self.prefetch_misses = 0                 # Number of prefetched plans cancelled by the planner
+		self.visits = 0                          # Number of locations visited by the robot
+		self._start_time = rospy.get_time()      # ROS time in which the robot started the surveillance
 		
 		# Define the initial position as current position
 		self.current_point.x = anm.INIT_POINT[0]
 		self.current_point.y = anm.INIT_POINT[1]
 		
 		# Initialize the current time
-		self.timer_now = str(int(time.time()))  
+		self.timer_now = str(int(rospy.get_time()))  
+		# Use the indexes of the urgent locations and of the connections among the locations of the fleet
+		self.urgency = self.fleet.urgency
+		self.topology = self.fleet.topology
 		# Initialize and define the mutex to work with transition variables
 		self.mutex = Lock()
-		
-		# Load the ontology
-		ARGS = [ONTOLOGY_FILE_PATH, WEB_PATH, 'true', 'PELLET', 'false']
-		ontology_manager('LOAD', 'FILE', '', ARGS)	
-		log_msg = f'Loading of the ontology went well'
-		rospy.loginfo(anm.tag_log(log_msg, LOG_TAG))
-		
-		# Subscribe to the topic that controls the battery level.
-		self.battery_sub = rospy.Subscriber(anm.TOPIC_BATTERY_LOW, Bool, self.battery_callback)
+		# Initialize and define the condition signalled by the callbacks, it has its own lock since the
+		# callbacks of the action clients cannot take the mutex (get_state() is called while holding it)
+		self.event = Condition(Lock())
+		self._event_count = 0                    # Number of events signalled so far
+		self._battery_listeners = []             # Functions called when the status of the battery changes
+		self._preemption_lock = Lock()           # Mutex to pair the battery low stamps with the preemptions
+		self._low_stamp = None                   # Time in which the last battery low has been published
+		self._preempt_time = None                # Time in which the goals have been cancelled for the last battery low
+		self.preemption_latencies = []           # Seconds between the battery low publish and the goals cancellation
+		rospy.on_shutdown(self.notify)
+		# Enable or disable the speculative reasoning
+		self.speculative = rospy.get_param(anm.PARAM_SPECULATIVE_REASONING, False)
+		# Enable or disable the prefetching of the plans
+		self.prefetch = rospy.get_param(anm.PARAM_PLAN_PREFETCH, False)
+		# Ask the planner for the feedback with only the new points of the plan, or with the whole plan
+		self.delta_feedback = rospy.get_param(anm.PARAM_PLANNER_DELTA_FEEDBACK, True)
+		# Cross-check the local indexes with the ontology periodically, or never if not positive
+		self.check_period = rospy.get_param(anm.PARAM_ONTOLOGY_CHECK_PERIOD, 60.0)
+		# In the benchmark mode the surveillance of a location does not wait
+		self.benchmark = rospy.get_param(anm.PARAM_BENCHMARK_MODE, False)
 		
 		# Initialize and define the client for the recharge service
-		rospy.wait_for_service(anm.TOPIC_RECHARGE)
-		self.recharge_cli = rospy.ServiceProxy(anm.TOPIC_RECHARGE, SetBool)
+		rospy.wait_for_service(rospy.names.ns_join(namespace, anm.TOPIC_RECHARGE))
+		self.recharge_cli = rospy.ServiceProxy(rospy.names.ns_join(namespace, anm.TOPIC_RECHARGE), SetBool)
 		
 		# Initialize and define the action client for the planner action service
-		self.planner_cli = actionlib.SimpleActionClient(anm.ACTION_PLANNER, PlanAction)
+		self.planner_cli = actionlib.SimpleActionClient(rospy.names.ns_join(namespace, anm.ACTION_PLANNER), PlanAction)
 		self.planner_cli.wait_for_server()
 		
+		# The action client for the patrol planner action service is created at the first patrol, since
+		# the planner may not serve it
+		self.patrol_cli = None
+		self._patrol_action = rospy.names.ns_join(namespace, anm.ACTION_PATROL_PLANNER)
+		
 		# Initialize and define the action client for the controller action service
-		self.controller_cli = actionlib.SimpleActionClient(anm.ACTION_CONTROLLER, ControlAction)
+		self.controller_cli = actionlib.SimpleActionClient(rospy.names.ns_join(namespace, anm.ACTION_CONTROLLER), ControlAction)
 		self.controller_cli.wait_for_server()
+		
+		# Subscribe to the topic that controls the battery level, after the action clients since
+		# the callback cancels their goals when the battery gets low
+		self.battery_sub = rospy.Subscriber(rospy.names.ns_join(namespace, anm.TOPIC_BATTERY_LOW), Bool, self.battery_callback)
+		self.battery_stamp_sub = rospy.Subscriber(rospy.names.ns_join(namespace, anm.TOPIC_BATTERY_LOW_STAMP), Header, self.battery_stamp_callback)
+			
+	
+	def notify(self):
+		""" 
+		Method that signals an event to the states waiting in wait_event(), e.g. the battery 
+		changed its status or an action server finished its goal.
+		
+		Args:
+			self: instance of the current class.
+		
+		"""
+		with self.event:
+			self._event_count += 1
+			self.event.notify_all()
+			
+	
+	def event_count(self):
+		""" 
+		Get the number of events signalled so far. It has to be read before checking the flags 
+		of a state, so that an event signalled in the meantime is not missed by wait_event().
+		
+		Args:
+			self: instance of the current class.
+		
+		Returns:
+			self._event_count: number of events signalled so far.
+		
+		"""
+		with self.event:
+			return self._event_count
+			
+	
+	def wait_event(self, count, timeout=WAIT_EVENT_TIMEOUT):
+		""" 
+		Method that blocks the calling state, without using the CPU, until an event is signalled
+		after the one given, the node is shut down, or the timeout elapses. It must be called 
+		without holding the mutex.
+		
+		Args:
+			self: instance of the current class.
+			count: number of events read by event_count() before checking the flags.
+			timeout: longest time to wait, in seconds.
+		
+		Returns:
+			self._event_count: number of events signalled so far.
+		
+		"""
+		with self.event:
+			if self._event_count == count and not rospy.is_shutdown():
+				self.event.wait(timeout)
+			return self._event_count
+			
+	
+	def action_callback(self, state, result):
+		""" 
+		It is the done callback of the goals sent to the planner and to the controller, which 
+		wakes up the state waiting for the result.
+		
+		Args:
+			self: instance of the current class.
+			state: it is the final state of the goal.
+			result: it is the result of the goal.
+		
+		"""
+		self.notify()
 			
 		
 	def build_environment(self):
 		""" 
 		Method that initializes the environment ontology using the ARMOR service.
-		It creates the desired indoor environment in a random way, based on a fixed number 
-		of rooms, doors and corridors. 
-		It also communicates with the ontology to initialize and define everything 
-		that will be needed to guarantee the correct behavior of the program.
+		It creates the desired indoor environment in a random way, based on the number 
+		of rooms, doors and corridors and on the topology given as parameters. 
+		The whole Abox is written in an OWL file, which is then loaded in the ontology with a
+		single LOAD, to define everything that will be needed to guarantee the correct behavior
+		of the program. If the robot belongs to a fleet, the map is built only once, with every
+		robot in the charging location, and the other robots wait for it.
 		
 		Args:
 			self: instance of the current class.
 		
 		"""
-		# Create the room objects
-		for a in range(1,NUMBER_ROOMS+1):
-			self._rooms.append("R" + str(a))
-		# Create the door objects 
-		for b in range(1,NUMBER_DOORS+1):
-			self._doors.append("D" + str(b))
-		# Create the corridor objects
-		for c in range(1,NUMBER_CORRIDORS):
-			self._corridors.append("C" + str(c))	
-		# Randomize the lists
-		random.shuffle(self._rooms)
-		random.shuffle(self._doors)
-		random.shuffle(self._corridors)
+		if not self.fleet.claim_build():
+			self.join_environment()
+			return
+		# Generate the map, the default parameters give the map of the assignment
+		self._rooms, self._corridors, self._doors, location_doors = generate_map(
+			rospy.get_param(anm.PARAM_MAP_ROOMS, NUMBER_ROOMS),
+			rospy.get_param(anm.PARAM_MAP_CORRIDORS, NUMBER_CORRIDORS),
+			rospy.get_param(anm.PARAM_MAP_DOORS, NUMBER_DOORS),
+			rospy.get_param(anm.PARAM_MAP_TOPOLOGY, 'ring'),
+			self.charge_loc)
 		log_msg = f'ROOMS: {self._rooms}'
-		rospy.loginfo(anm.tag_log(log_msg, LOG_TAG))
+		rospy.loginfo(anm.tag_log(log_msg, self.log_tag))
 		log_msg = f'DOORS: {self._doors}'
-		rospy.loginfo(anm.tag_log(log_msg, LOG_TAG))
-		# Put one door for every room
-		for d in range(0,NUMBER_ROOMS):
-			ARGS = ['hasDoor', self._rooms[d], self._doors[d]]
-			ontology_manager('ADD', 'OBJECTPROP', 'IND', ARGS)
-		# Make the doors of the rooms adjacent to the corridors
-		for e in range(0,2):
-			ARGS = ['hasDoor', self._corridors[0], self._doors[e]]
-			ontology_manager('ADD', 'OBJECTPROP', 'IND', ARGS)
-		for f in range(2,4):
-			ARGS = ['hasDoor', self._corridors[1], self._doors[f]]
-			ontology_manager('ADD', 'OBJECTPROP', 'IND', ARGS)
-		# Make corridor C1 and C2 have a door in common
-		ARGS = ['hasDoor', self._corridors[0], self._doors[4]]
-		ontology_manager('ADD', 'OBJECTPROP', 'IND', ARGS)
-		ARGS = ['hasDoor', self._corridors[1], self._doors[4]]
-		ontology_manager('ADD', 'OBJECTPROP', 'IND', ARGS)	
-		# Adding 'E' to the corridor's list
-		self._corridors.append("E")
+		rospy.loginfo(anm.tag_log(log_msg, self.log_tag))
 		log_msg = f'CORRIDORS: {self._corridors}'
-		rospy.loginfo(anm.tag_log(log_msg, LOG_TAG))
-		# Put two doors in the corridor 'E' one in common with 'C1' and the other with 'C2'
-		ARGS = ['hasDoor', self._corridors[0], self._doors[5]]
-		ontology_manager('ADD', 'OBJECTPROP', 'IND', ARGS)
-		ARGS = ['hasDoor', self.charge_loc, self._doors[5]]
-		ontology_manager('ADD', 'OBJECTPROP', 'IND', ARGS)
-		ARGS = ['hasDoor', self._corridors[1], self._doors[6]]
-		ontology_manager('ADD', 'OBJECTPROP', 'IND', ARGS)
-		ARGS = ['hasDoor', self.charge_loc, self._doors[6]]
-		ontology_manager('ADD', 'OBJECTPROP', 'IND', ARGS)
+		rospy.loginfo(anm.tag_log(log_msg, self.log_tag))
+		# Index the doors of every location
+		for loc, doors in location_doors.items():
+			for door in doors:
+				self.topology.add_door(loc, door)
 		# Define the locations
 		self._locations = self._rooms + self._corridors
-		location_number = range(0,NUMBER_ROOMS+NUMBER_CORRIDORS) 
-		# Disjoint corridors, rooms and doors
-		ARGS = self._rooms + self._corridors + self._doors
-		ontology_manager('DISJOINT', 'IND', '', ARGS)
-		# State the robot initial position
-		ARGS = ['isIn', 'Robot1', self.prev_loc]
-		ontology_manager('ADD', 'OBJECTPROP', 'IND' , ARGS)
+		self._corridor_set = set(self._corridors)
+		location_number = range(0,len(self._locations)) 
 		# Get a time in the past (before the timestamp of the robot)
 		self.timer_now = str(int(1000000000)) # This is done to make every room URGENT at the beginning  
 		# Start the timestamp in every location to retrieve when a location becomes urgent
 		for g in location_number:
-			ARGS = ['visitedAt', self._locations[g], 'Long', self.timer_now]
-			ontology_manager('ADD', 'DATAPROP', 'IND', ARGS)
+			self.urgency.update(self._locations[g], int(self.timer_now))
 		# Update the timestamp of corridor 'E' since the robot spawns in it
-		ARGS = ['']
-		ontology_manager('REASON', '', '', ARGS)
-		ARGS = ['visitedAt', self.charge_loc]
-		last_location = ontology_manager('QUERY', 'DATAPROP', 'IND', ARGS)
-		last_location = ontology_format(last_location, 1, 11) 
-		self.timer_now = str(int(time.time())) # initial location is not urgent
-		ARGS = ['visitedAt', self.charge_loc, 'Long', self.timer_now, last_location[0]]
-		ontology_manager('REPLACE', 'DATAPROP', 'IND', ARGS)
+		self.timer_now = str(int(rospy.get_time())) # initial location is not urgent
+		self.urgency.update(self.charge_loc, int(self.timer_now))
+		# Write the whole Abox in a file, the robot is in its initial position and has just moved
+		doors = {loc: self.topology.doors(loc) for loc in self._locations}
+		visited_at = {loc: self.urgency.visited_at(loc) for loc in self._locations}
+		robots = {robot: self.prev_loc for robot in self.fleet.robots if robot != TBOX_ROBOT}
+		write_abox(ONTOLOGY_FILE_PATH, ABOX_FILE_PATH, WEB_PATH, doors, visited_at, TBOX_ROBOT, self.prev_loc, self.timer_now, robots)
+		# Place the locations in the environment and give their doors to the planners, which draw the same layout
+		self.layout = MapLayout(doors, anm.ENVIRONMENT_SIZE, self.charge_loc)
+		rospy.set_param(anm.PARAM_MAP_LOCATION_DOORS, doors)
+		# Load the ontology and reason about it in a single call
+		directives = []
+		ARGS = [ABOX_FILE_PATH, WEB_PATH, 'true', 'PELLET', 'false']
+		directives.append(('LOAD', 'FILE', '', ARGS))
+		directives.extend(self.reason_directive(directives))
+		self.ontology_batch(directives)
+		log_msg = f'Loading of the ontology went well'
+		rospy.loginfo(anm.tag_log(log_msg, self.log_tag))
 		# Save ontology for DEBUG purposes
 		#ARGS = [ONTOLOGY_FILE_PATH_DEBUG] # <--- uncomment this line for ontology debug
 		#ontology_manager('SAVE', '', '', ARGS) # <--- uncomment this line for ontology debug
 		log_msg = f'The map has been generated in the ontology\n\n'
-		rospy.loginfo(anm.tag_log(log_msg, LOG_TAG))
+		rospy.loginfo(anm.tag_log(log_msg, self.log_tag))
+		self._start_time = rospy.get_time()
+		self._last_check = self._start_time
+		# Share the map with the other robots of the fleet
+		self.fleet.rooms, self.fleet.doors, self.fleet.corridors = self._rooms, self._doors, self._corridors
+		self.fleet.now = self.timer_now
+		self.fleet.layout = self.layout
+		self.fleet.built.set()
+		self.map_completed = True   # Set to True only the one involved in the state
+		
+		
+	def join_environment(self):
+		""" 
+		Method that waits until the map has been built by another robot of the fleet, then takes its
+		locations. The robot is already in the ontology, in the charging location.
+		
+		Args:
+			self: instance of the current class.
+		
+		"""
+		while not self.fleet.built.wait(WAIT_EVENT_TIMEOUT):
+			if rospy.is_shutdown():
+				return
+		self._rooms, self._doors, self._corridors = self.fleet.rooms, self.fleet.doors, self.fleet.corridors
+		self._locations = self._rooms + self._corridors
+		self._corridor_set = set(self._corridors)
+		self.timer_now = self.fleet.now
+		self.layout = self.fleet.layout
+		log_msg = f'The map has been generated in the ontology by another robot\n\n'
+		rospy.loginfo(anm.tag_log(log_msg, self.log_tag))
+		self._start_time = rospy.get_time()
+		self._last_check = self._start_time
 		self.map_completed = True   # Set to True only the one involved in the state
 		
 		
@@ -301,13 +599,107 @@ class Helper:
 		"""
 		return self.map_completed
 		
+		
+	def reason_directive(self, directives):
+		""" 
+		Method that decides if a REASON has to be sent to the ontology after the given directives.
+		Reasoning is the most expensive operation of the ontology, hence it is done only if an ADD, 
+		REPLACE, REMOVE or DISJOINT was sent since the last REASON (or is among the given directives),
+		or if more than the urgency threshold elapsed since the last REASON. The latter guarantees that
+		changes done by other clients of the same ontology are not ignored for longer than that.
+		
+		Args:
+			self: instance of the current class.
+			directives: list of directives that will be sent before the REASON.
+			
+		Returns:
+			reason: list with the REASON directive if it is needed, empty otherwise.
+		
+		"""
+		writes = [d for d in directives if d[0] in ('ADD', 'REPLACE', 'REMOVE', 'DISJOINT', 'LOAD')]
+		elapsed = rospy.get_time() - self._last_reason_time
+		if self._ontology_dirty or len(writes) > 0 or elapsed > self.urgency.threshold:
+			self.reason_executed += 1
+			ARGS = ['']
+			return [('REASON', '', '', ARGS)]
+		self.reason_skipped += 1
+		return []
+		
+		
+	def ontology_batch(self, directives):
+		""" 
+		Method that sends a list of directives to the ontology through ontology_manager_batch(), 
+		keeping track of the changes done to the ontology since the last REASON.
+		
+		Args:
+			self: instance of the current class.
+			directives: list of tuples (command, primary_command_spec, secondary_command_spec, ARGS).
+			
+		Returns:
+			armorontology_res: list with the queried objects of every directive.
+		
+		"""
+		armorontology_res = ontology_manager_batch(directives)
+		self.track_changes(directives)
+		return armorontology_res
+		
+		
+	def ontology_submit(self, directives):
+		""" 
+		Method that sends a list of directives like ontology_batch(), but without waiting for the
+		results if the backend queues them, i.e. the QueryCoalescer of a fleet. The lists submitted
+		while holding a lock are executed in the same order in which the lock is taken.
+		
+		Args:
+			self: instance of the current class.
+			directives: list of tuples (command, primary_command_spec, secondary_command_spec, ARGS).
+			
+		Returns:
+			wait: function that waits for the list with the queried objects of every directive.
+		
+		"""
+		backend = get_ontology_backend()
+		if not isinstance(backend, QueryCoalescer):
+			armorontology_res = self.ontology_batch(directives)
+			return lambda: armorontology_res
+		start = time.perf_counter()
+		request = backend.submit(directives)
+		self.track_changes(directives)
+		def wait():
+			armorontology_res = request.result()
+			if ontology_metrics is not None:
+				ontology_metrics.record_call(time.perf_counter() - start, len(directives))
+			return armorontology_res
+		return wait
+		
+		
+	def track_changes(self, directives):
+		""" 
+		Method that keeps track of the changes done to the ontology since the last REASON.
+		
+		Args:
+			self: instance of the current class.
+			directives: list of tuples (command, primary_command_spec, secondary_command_spec, ARGS).
+		
+		"""
+		for command, primary_command_spec, secondary_command_spec, ARGS in directives:
+			if command == 'REASON':
+				self._ontology_dirty = False
+				self._last_reason_time = rospy.get_time()
+			elif command in ('ADD', 'REPLACE', 'REMOVE', 'DISJOINT', 'LOAD'):
+				self._ontology_dirty = True
+		
 			
 	def reason(self):
 		""" 
 		Method that communicates with the ontology already created to retrieve information
 		and decide, based on the desired pre-determined behavior, where the robot should
 		move next.
-		First of all, reachable rooms and their status (e.g. ROOM, URGENT, CORRIDOR) are retrieved.
+		First of all, reachable rooms are retrieved from the local index of the topology, while their
+		status (e.g. URGENT, CORRIDOR) is known from the local index of the visitedAt timestamps.
+		If the speculative reasoning is enabled, this decision is taken in background while the robot
+		moves and checks a location, and it is only validated here. Every `check_period` seconds the
+		local indexes are cross-checked with the ontology.
 		Then, each reachable room is checked and the robot will move first in URGENT locations.
 		If there are no URGENT locations, it stays on CORRIDORS. If there are no CORRIDORS the robot
 		moves to a random ROOM. In the end, the next location that will be visited is returned.
@@ -322,60 +714,98 @@ class Helper:
 		# Reset the boolean variables
 		self.reset_var()
 		log_msg = f'The Robot is in location: {self.prev_loc}'
-		rospy.loginfo(anm.tag_log(log_msg, LOG_TAG))
-		# Reason about the onoloy
-		ARGS = ['']
-		ontology_manager('REASON', '', '', ARGS)
-		# Retreive the locations that the robot can reach
-		ARGS = ['canReach', 'Robot1']
-		can_reach = ontology_manager('QUERY', 'OBJECTPROP', 'IND', ARGS)
-		can_reach = ontology_format(can_reach, 32, -1)
-		random.shuffle(can_reach) # Make the choice randomic
+		rospy.loginfo(anm.tag_log(log_msg, self.log_tag))
+		# Use the decision taken in background while the robot moved, if it is still valid,
+		# otherwise take it now
+		decision = self.validate_speculation(self.prev_loc, int(self.timer_now))
+		if decision is None:
+			decision = self.classify(self.prev_loc, int(self.timer_now))
+		can_reach, urgent_loc, possible_corridor = decision
 		log_msg = f'The Robot can reach: {can_reach}'
-		rospy.loginfo(anm.tag_log(log_msg, LOG_TAG))
-		# Retrieve the status of the reachable locations
-		loc_status = []
-		all_status = []
-		for loc in range(0, len(can_reach)):
-			ARGS = [can_reach[loc], 'false']
-			loc_status = ontology_manager('QUERY', 'CLASS', 'IND', ARGS)  
-			loc_status = ontology_format(loc_status, 32, -1)
-			all_status.append(loc_status)
-		log_msg = f'Status of the locations: {all_status}'
-		rospy.loginfo(anm.tag_log(log_msg, LOG_TAG))
-		# Check the status of the room (e.g. ROOM, CORRIDOR, URGENT)
-		urgent_loc = []
-		possible_corridor = []
-		for sta in range(0, len(all_status)):
-			for urg in range(0, len(all_status[sta])):
-				# If location is urgent and it is reachable
-				if all_status[sta][urg] == 'URGENT':
-					urgent_loc.append(can_reach[sta])
-				# If location is a corridor and it is reachable
-				elif all_status[sta][urg] == 'CORRIDOR':
-					possible_corridor.append(can_reach[sta])
+		rospy.loginfo(anm.tag_log(log_msg, self.log_tag))
+		log_msg = f'Visited locations: {self.visits}, per hour: {self.visits * 3600.0 / max(rospy.get_time() - self._start_time, 1.0):.1f}'
+		rospy.loginfo(anm.tag_log(log_msg, self.log_tag))
+		if self.speculative or self.prefetch:
+			log_msg = f'Speculative decisions used: {self.speculation_hits}, discarded: {self.speculation_misses}'
+			rospy.logdebug(anm.tag_log(log_msg, self.log_tag))
+		if self.prefetch:
+			log_msg = f'Prefetched plans used: {self.prefetch_hits}, cancelled: {self.prefetch_misses}'
+			rospy.logdebug(anm.tag_log(log_msg, self.log_tag))
+		log_msg = f'Ontology cache: {ontology_cache.stats()}'
+		rospy.logdebug(anm.tag_log(log_msg, self.log_tag))
+		log_msg = f'REASON executed: {self.reason_executed}, skipped: {self.reason_skipped}'
+		rospy.logdebug(anm.tag_log(log_msg, self.log_tag))
+		if self.check_period > 0 and rospy.get_time() - self._last_check >= self.check_period:
+			self.cross_check(can_reach)
+		if isinstance(ontology_backend, ArmorClient):
+			log_msg = f'ARMOR client: {ontology_backend.stats()}'
+			rospy.logdebug(anm.tag_log(log_msg, self.log_tag))
 		# Retrieve the next location taht will be checked by the robot
 		if len(urgent_loc) == 0:
 			log_msg = f'There are no urgent locations'
-			rospy.loginfo(anm.tag_log(log_msg, LOG_TAG))
+			rospy.loginfo(anm.tag_log(log_msg, self.log_tag))
 			if len(possible_corridor) == 0:
 				log_msg = f'There are no reachable corridors'
-				rospy.loginfo(anm.tag_log(log_msg, LOG_TAG))
+				rospy.loginfo(anm.tag_log(log_msg, self.log_tag))
 				self.next_loc = can_reach # take the first randomic reachable room
 			else:
 				log_msg = f'The reachable corridors are: {possible_corridor}'
-				rospy.loginfo(anm.tag_log(log_msg, LOG_TAG))
+				rospy.loginfo(anm.tag_log(log_msg, self.log_tag))
 				self.next_loc = possible_corridor # take the first reachable corridor
 		else:
 			log_msg = f'The Urgent locations are: {urgent_loc}'
-			rospy.loginfo(anm.tag_log(log_msg, LOG_TAG))
-			self.next_loc = urgent_loc # take the first randomic urgent room
+			rospy.loginfo(anm.tag_log(log_msg, self.log_tag))
+			self.next_loc = urgent_loc # take the least recently visited urgent room
 		if type(self.next_loc) == list:
-			self.next_loc = self.next_loc[0]
+			# Stay in the same location if no other one can be reached, e.g. in a map with a single location
+			self.next_loc = self.next_loc[0] if len(self.next_loc) > 0 else self.prev_loc
 		self.reasoner_done = True   # Set to True only the one involved in the state
 		return self.next_loc
 		
 		
+	def cross_check(self, can_reach):
+		""" 
+		Method that checks that the local indexes agree with the ontology. The locations that the robot
+		can reach and the URGENT ones are queried in the same call, after a REASON if something changed
+		since the last one. Since the robot moves between two checks, the REASON is sent and drops the
+		cached canReach of the robot, while the query of the URGENT class is never cached, so both are
+		answered by the ontology. The URGENT locations depend on the time of every robot, so they are
+		only compared with a single robot. The differences are logged, since the decisions are taken
+		on the local indexes.
+		
+		Args:
+			self: instance of the current class.
+			can_reach: list of the reachable locations according to the local index of the topology.
+		
+		"""
+		self._last_check = rospy.get_time()
+		directives = self.reason_directive([])
+		first = len(directives)
+		ARGS = ['canReach', self.robot]
+		directives.append(('QUERY', 'OBJECTPROP', 'IND', ARGS))
+		single = len(self.fleet.robots) == 1
+		if single:
+			ARGS = ['URGENT', 'false']
+			directives.append(('QUERY', 'IND', 'CLASS', ARGS))
+		armorontology_res = self.ontology_batch(directives)
+		self.checks += 1
+		differences = []
+		queried = set(parse_names(armorontology_res[first]))
+		if queried != set(can_reach):
+			differences.append(f'reachable {sorted(queried)} instead of {sorted(can_reach)}')
+		if single:
+			queried = set(parse_names(armorontology_res[first + 1]))
+			urgent = set(self.urgency.urgent(int(self.timer_now)))
+			if queried != urgent:
+				differences.append(f'URGENT {sorted(queried)} instead of {sorted(urgent)}')
+		if len(differences) > 0:
+			self.check_mismatches += 1
+			log_msg = f'The ontology disagrees with the local indexes: {", ".join(differences)}'
+			rospy.logwarn(anm.tag_log(log_msg, self.log_tag))
+		log_msg = f'Cross-checks with the ontology: {self.checks}, with differences: {self.check_mismatches}'
+		rospy.logdebug(anm.tag_log(log_msg, self.log_tag))
+		
+		
 	def reason_done(self):
 		""" 
 		Get the value of the variable responsible for stating the completion of the reasoning
@@ -399,7 +829,10 @@ class Helper:
 		When the robot's battery is low, it gets as target location the charging station
 		and moves towards it. After calling the planner and the controller to reach the location,
 		once 'E' is reached, the variable charge_reached is set to True and the robot is ready
-		to be charged. 
+		to be charged. The results are waited without busy loops, and if a goal is aborted, 
+		preempted, rejected or takes too long, a new path is planned from the last reached point,
+		after a delay which grows at every failed attempt. If the node is shut down first, the 
+		charging location is not reached.
 		
 		Args:
 			self: instance of the current class.
@@ -411,19 +844,63 @@ class Helper:
 		# Set the next location to be the charging station
 		self.next_loc = self.charge_loc
 		log_msg = f'Battery of the robot low, next location will be: {self.next_loc}'
-		rospy.loginfo(anm.tag_log(log_msg, LOG_TAG))
-		self.planner()
-		while self.planner_cli.get_state() != DONE: # Loops until the plan action service is Not DONE
-			self.charge_reached = False # Wate time
-		log_msg = f'The PLANNER has found the path for the charging station'
-		rospy.loginfo(anm.tag_log(log_msg, LOG_TAG))
-		# Get the waypoints that will be used in the Controller
-		self._viapoints = (self.planner_cli.get_result()).via_points
-		self.controller()
-		while self.controller_cli.get_state() != DONE: # Loops until the control action service is Not DONE
-			self.charge_reached = False # Wate time
-		self.check_controller()
-		self.charge_reached = True   # Set to True only the one involved in the state
+		rospy.loginfo(anm.tag_log(log_msg, self.log_tag))
+		attempt = 0
+		delay = CHARGE_RETRY_DELAY
+		while not rospy.is_shutdown():
+			attempt = attempt + 1
+			if attempt > 1:
+				# Wait before planning again, so that a planner or a controller which fails at once is not flooded
+				try:
+					rospy.sleep(delay)
+				except rospy.ROSInterruptException:
+					return
+				delay = min(delay * 2, CHARGE_RETRY_MAX_DELAY)
+			# Plan a path from the current point, which is the last one reached if a previous attempt failed
+			self.planner()
+			state = self.wait_action(self.planner_cli)
+			if state != GoalStatus.SUCCEEDED:
+				log_msg = f'The PLANNER failed with state {state} ({self.planner_cli.get_goal_status_text()}) at attempt {attempt}, planning again in {delay} seconds'
+				rospy.logwarn(anm.tag_log(log_msg, self.log_tag))
+				continue
+			log_msg = f'The PLANNER has found the path for the charging station'
+			rospy.loginfo(anm.tag_log(log_msg, self.log_tag))
+			# Get the waypoints that will be used in the Controller
+			self._viapoints = (self.planner_cli.get_result()).via_points
+			self.plan_points = list(self._viapoints)
+			self.controller()
+			state = self.wait_action(self.controller_cli)
+			if state != GoalStatus.SUCCEEDED:
+				log_msg = f'The CONTROLLER failed with state {state} ({self.controller_cli.get_goal_status_text()}) at attempt {attempt}, planning again in {delay} seconds'
+				rospy.logwarn(anm.tag_log(log_msg, self.log_tag))
+				continue
+			self.check_controller()
+			self.charge_reached = True   # Set to True only the one involved in the state
+			return
+		
+		
+	def wait_action(self, client, timeout=ACTION_TIMEOUT):
+		""" 
+		Method that waits, without using the CPU, until the goal sent by an action client reaches a 
+		terminal state. If the goal is not finished within the timeout, it is cancelled.
+		
+		Args:
+			self: instance of the current class.
+			client: it is the action client which sent the goal.
+			timeout: longest time to wait for the result.
+		
+		Returns:
+			state: the final state of the goal (e.g. GoalStatus.SUCCEEDED, GoalStatus.ABORTED).
+		
+		"""
+		if not client.wait_for_result(timeout):
+			log_msg = f'No result after {timeout.to_sec()} seconds, cancelling the goal'
+			rospy.logwarn(anm.tag_log(log_msg, self.log_tag))
+			client.cancel_goal()
+			client.wait_for_result(rospy.Duration(1.0))
+			if client.get_state() not in (GoalStatus.PREEMPTED, GoalStatus.RECALLED, GoalStatus.ABORTED, GoalStatus.REJECTED, GoalStatus.SUCCEEDED):
+				return GoalStatus.LOST
+		return client.get_state()
 		
 		
 	def charge_ready(self):
@@ -454,15 +931,109 @@ class Helper:
 		"""
 		self.mutex.acquire()    # take the mutex
 		try: 
+			was_low = self.battery_low
 			self.battery_low = msg.data    # change the flag of battery low with the received message
 			if self.battery_low == True:
 				log_msg = f'\n@@@ Battery of the robot is low! Recharging needed @@@\n'
-				rospy.loginfo(anm.tag_log(log_msg, LOG_TAG))
+				rospy.loginfo(anm.tag_log(log_msg, self.log_tag))
 			if self.battery_low == False:
 				log_msg = f'\n@@@ Battery of the robot is full! @@@\n'
-				rospy.loginfo(anm.tag_log(log_msg, LOG_TAG))
+				rospy.loginfo(anm.tag_log(log_msg, self.log_tag))
 		finally:
 			self.mutex.release()    # release the mutex
+		# Interrupt the running state as soon as the battery gets low
+		if msg.data and not was_low:
+			self.preempt()
+		self.battery_changed(msg.data)
+	
+	
+	def battery_stamp_callback(self, msg):
+		""" 
+		It is the callback that manages the subscriber to the topic: /state/battery_low_stamp to 
+		retrieve the time in which the battery got low, which is used to measure the latency of 
+		the preemption.
+		
+		Args:
+			self: instance of the current class.
+			msg: is the header with the time in which the battery low has been published.
+		
+		"""
+		with self._preemption_lock:
+			self._low_stamp = msg.stamp
+		self.report_preemption()
+	
+	
+	def preempt(self):
+		""" 
+		Method that interrupts the running task when the battery gets low: the goals of the planners
+		and of the controller are cancelled, including the plan requested in advance, without waiting
+		for the state to notice the battery. The state is then woken up by battery_changed() and 
+		goes to REACHCHARGE.
+		
+		Args:
+			self: instance of the current class.
+		
+		"""
+		self._prefetch = None
+		self.planner_cli.cancel_all_goals()
+		if self.patrol_cli is not None:
+			self.patrol_cli.cancel_all_goals()
+		self.controller_cli.cancel_all_goals()
+		with self._preemption_lock:
+			self._preempt_time = rospy.Time.now()
+		self.report_preemption()
+	
+	
+	def report_preemption(self):
+		""" 
+		Method that measures and logs the time from the publish of the battery low to the 
+		cancellation of the goals, as soon as both of them are known. The two are received on 
+		different topics, so they may arrive in any order.
+		
+		Args:
+			self: instance of the current class.
+		
+		"""
+		with self._preemption_lock:
+			if self._low_stamp is None or self._preempt_time is None or self._low_stamp > self._preempt_time:
+				return
+			latency = (self._preempt_time - self._low_stamp).to_sec()
+			self._low_stamp = None
+			self._preempt_time = None
+			self.preemption_latencies.append(latency)
+			latencies = list(self.preemption_latencies)
+		log_msg = (f'Goals cancelled {latency * 1000.0:.1f} ms after the battery low was published '
+			   f'(mean {sum(latencies) * 1000.0 / len(latencies):.1f} ms, max {max(latencies) * 1000.0:.1f} ms '
+			   f'over {len(latencies)} preemptions)')
+		rospy.loginfo(anm.tag_log(log_msg, self.log_tag))
+	
+	
+	def add_battery_listener(self, listener):
+		""" 
+		Method that registers a function called every time the status of the battery changes, 
+		e.g. by the asyncio variant of the helper.
+		
+		Args:
+			self: instance of the current class.
+			listener: function that takes as argument the new value of battery_low.
+		
+		"""
+		self._battery_listeners.append(listener)
+		
+	
+	def battery_changed(self, battery_low):
+		""" 
+		Method that signals a change of the status of the battery to the waiting states and to the
+		registered listeners.
+		
+		Args:
+			self: instance of the current class.
+			battery_low: it is the new value of battery_low.
+		
+		"""
+		for listener in self._battery_listeners:
+			listener(battery_low)
+		self.notify()
 	
 			
 	def ret_battery_low(self):
@@ -497,15 +1068,17 @@ class Helper:
 		request.data = True
 		response = self.recharge_cli(request)
 		log_msg = f'The Robot has been recharged! Ready for action!!\n\n'
-		rospy.loginfo(anm.tag_log(log_msg, LOG_TAG))
+		rospy.loginfo(anm.tag_log(log_msg, self.log_tag))
 		self.battery_low = False
+		self.battery_changed(False)
 	
 		
 	def planner(self):
 		""" 
-		This method executes a planner for a surveillance task. It starts by deciding a random
-		point inside the environment that will be reached. Then, a request to the PlanGoal() action 
-		service is done to simulate a planner.
+		This method executes a planner for a surveillance task. It starts by taking the centre
+		of the next location as the point that will be reached. Then, a request to the PlanGoal() action 
+		service is done to simulate a planner. If the plan towards the next location has already 
+		been requested while checking the previous location, no new request is done.
 		
 		Args:
 			self: instance of the current class.
@@ -513,17 +1086,139 @@ class Helper:
 		"""
 		# Reset the boolean variables
 		self.reset_var()
+		# Reuse the plan requested in advance if it goes towards the same location from the same point,
+		# otherwise cancel it
+		if self._prefetch is not None:
+			location, request = self._prefetch
+			self._prefetch = None
+			if location == self.next_loc and request.current == self.current_point:
+				self.prefetch_hits += 1
+				self.target_point = request.target
+				log_msg = f'Using the plan requested in advance for location: {location}'
+				rospy.loginfo(anm.tag_log(log_msg, self.log_tag))
+				return
+			self.prefetch_misses += 1
+			self.planner_cli.cancel_goal()
 		request = PlanGoal()
-		# Generate a randomic random point 
-		self.target_point.x = random.uniform(0, anm.ENVIRONMENT_SIZE[0])
-		self.target_point.y = random.uniform(0, anm.ENVIRONMENT_SIZE[1])
+		# Go to the centre of the next location
+		self.target_point = self.location_point(self.next_loc)
 		# Define the request for the Planner
 		request.target = self.target_point
 		request.current = self.current_point
+		request.delta_feedback = self.delta_feedback
 		# Sends the goal to the action server.
-		self.planner_cli.send_goal(request)
+		self.plan_points = []
+		self.planner_cli.send_goal(request, done_cb=self.action_callback, feedback_cb=self.planner_feedback)
+		
+		
+	def location_point(self, location):
+		""" 
+		Method that returns the centre of a location in the environment, used as target of the planner.
+		
+		Args:
+			self: instance of the current class.
+			location: it is the name of the location.
+		
+		Returns:
+			point: the centre of the location.
+		
+		"""
+		point = Point()
+		point.x, point.y = self.layout.centre(location)
+		return point
+		
+		
+	def plan_patrol(self, locations, timeout=ACTION_TIMEOUT):
+		""" 
+		Method that requests the plans to visit many locations in order, starting from the current 
+		point, with a single goal of the patrol planner, e.g. to go through all the urgent rooms. 
+		It blocks until the plans of all the legs are received, or the goal is cancelled because the 
+		battery gets low. The client of the patrol planner is created at the first call.
+		
+		Args:
+			self: instance of the current class.
+			locations: list of the locations to be visited, in order.
+			timeout: longest time to wait for the plans.
+		
+		Returns:
+			legs: list with the via points of every leg, i.e. from the previous location to each of the 
+				given ones, None if the plans could not be computed.
+		
+		"""
+		if len(locations) == 0:
+			return []
+		if self.patrol_cli is None:
+			client = actionlib.SimpleActionClient(self._patrol_action, PatrolPlanAction)
+			if not client.wait_for_server(timeout):
+				log_msg = f'The patrol planner `{self._patrol_action}` is not available'
+				rospy.logwarn(anm.tag_log(log_msg, self.log_tag))
+				return None
+			self.patrol_cli = client
+		request = PatrolPlanGoal()
+		request.current = self.current_point
+		request.targets = [self.location_point(location) for location in locations]
+		self.patrol_cli.send_goal(request)
+		state = self.wait_action(self.patrol_cli, timeout)
+		if state != GoalStatus.SUCCEEDED:
+			log_msg = f'The patrol through {len(locations)} locations could not be planned (state {state})'
+			rospy.logwarn(anm.tag_log(log_msg, self.log_tag))
+			return None
+		legs = [list(leg.via_points) for leg in self.patrol_cli.get_result().legs]
+		log_msg = f'Planned the patrol through: {", ".join(locations)}'
+		rospy.loginfo(anm.tag_log(log_msg, self.log_tag))
+		return legs
+		
+		
+	def prefetch_plan(self):
+		""" 
+		Method that requests the plan towards the next location while the robot checks the current 
+		one. The next location is decided now, and the decision is stored so that the reasoner 
+		takes the same one, unless the robot moves or the urgency changes in the meantime. Nothing
+		is requested if no location can be reached, e.g. in a map with a single location.
+		
+		Args:
+			self: instance of the current class.
+		
+		"""
+		decision = self.classify(self.prev_loc, int(self.timer_now))
+		with self.mutex:
+			self._speculation_id += 1   # a decision still computed in background is outdated
+			self._speculation = (self.prev_loc, int(self.timer_now), decision)
+		can_reach, urgent_loc, possible_corridor = decision
+		candidates = urgent_loc + possible_corridor + can_reach
+		if not candidates:
+			return   # nothing can be reached, the Reasoner and the Planner decide it as usual
+		location = candidates[0]
+		request = PlanGoal()
+		request.target = self.location_point(location)
+		request.current = self.current_point
+		request.delta_feedback = self.delta_feedback
+		self.plan_points = []
+		self.planner_cli.send_goal(request, done_cb=self.action_callback, feedback_cb=self.planner_feedback)
+		self._prefetch = (location, request)
+		log_msg = f'Requesting in advance the plan for location: {location}'
+		rospy.loginfo(anm.tag_log(log_msg, self.log_tag))
 		
 	
+	def planner_feedback(self, feedback):
+		""" 
+		It is the feedback callback of the goals sent to the planner, which rebuilds the plan received 
+		so far. Every feedback holds the points of the plan starting from the given index, i.e. only 
+		the new points with the delta feedback or the whole plan otherwise. If a feedback was lost, 
+		the plan is rebuilt again with the result of the goal.
+		
+		Args:
+			self: instance of the current class.
+			feedback: it is the feedback of the planner with the points and the index of the first one.
+		
+		"""
+		if feedback.first_index > len(self.plan_points):
+			self.feedback_gaps += 1
+			return
+		del self.plan_points[feedback.first_index:]
+		self.plan_points.extend(feedback.via_points)
+		
+		
 	def check_planner(self):
 		""" 
 		This method checks if the planner has done its execution when the state of the action service
@@ -538,9 +1233,10 @@ class Helper:
 		# Execute only when the plan action service is done
 		if self.planner_cli.get_state() == DONE:
 			log_msg = f'The PLANNER has found the path to get to the target\n\n'
-			rospy.loginfo(anm.tag_log(log_msg, LOG_TAG))
+			rospy.loginfo(anm.tag_log(log_msg, self.log_tag))
 			# Get the waypoints that will be used in the Controller
 			self._viapoints = (self.planner_cli.get_result()).via_points
+			self.plan_points = list(self._viapoints)
 			self.plan_completed = True  # Set to True only the one involved in the state
 	
 		
@@ -559,6 +1255,99 @@ class Helper:
 		return self.plan_completed
 		
 	
+	def classify(self, location, now):
+		""" 
+		Method that retrieves the locations that the robot can reach from a location, i.e. the ones
+		connected to it, together with the URGENT ones, the least recently visited first, and the
+		corridors among them. Everything is known locally, so the ontology is not queried.
+		
+		Args:
+			self: instance of the current class.
+			location: it is the location of the robot.
+			now: it is the time in which the robot arrived at the location.
+		
+		Returns:
+			can_reach: list of reachable locations, in random order.
+			urgent_loc: list of the reachable URGENT locations.
+			possible_corridor: list of the reachable corridors.
+		
+		"""
+		can_reach = self.topology.neighbours(location)
+		random.shuffle(can_reach) # Make the choice randomic
+		urgent_loc = self.urgency.urgent(now, can_reach)
+		possible_corridor = [loc for loc in can_reach if loc in self._corridor_set]
+		return can_reach, urgent_loc, possible_corridor
+		
+		
+	def speculate(self, location, now):
+		""" 
+		Method that starts a background worker which decides the next location in advance, given 
+		the location in which the robot is going to be and the predicted time of its arrival. 
+		Only the last requested decision is kept. It does nothing if the speculative reasoning is disabled.
+		
+		Args:
+			self: instance of the current class.
+			location: it is the location in which the robot is going to be.
+			now: it is the predicted time of the arrival in the location.
+		
+		"""
+		if not self.speculative:
+			return
+		with self.mutex:
+			self._speculation_id += 1
+			speculation_id = self._speculation_id
+		worker = threading.Thread(target=self._speculate, args=(speculation_id, location, now), daemon=True)
+		worker.start()
+		
+		
+	def _speculate(self, speculation_id, location, now):
+		""" 
+		Body of the background worker started by speculate().
+		
+		Args:
+			self: instance of the current class.
+			speculation_id: it is the identifier of the requested decision.
+			location: it is the location in which the robot is going to be.
+			now: it is the predicted time of the arrival in the location.
+		
+		"""
+		decision = self.classify(location, now)
+		with self.mutex:
+			if speculation_id == self._speculation_id:
+				self._speculation = (location, now, decision)
+		
+		
+	def validate_speculation(self, location, now):
+		""" 
+		Method that checks the decision taken in background against the real state of the robot.
+		The decision is still valid if the robot is in the predicted location, and the URGENT 
+		locations that it can reach are the same at the real time of arrival. The reachable 
+		locations and corridors do not change, hence they are not checked.
+		
+		Args:
+			self: instance of the current class.
+			location: it is the location of the robot.
+			now: it is the time in which the robot arrived at the location.
+		
+		Returns:
+			decision: the tuple (can_reach, urgent_loc, possible_corridor) decided in background, 
+				`None` if there is no valid decision.
+		
+		"""
+		with self.mutex:
+			speculation = self._speculation
+			self._speculation = None
+		if speculation is None:
+			return None
+		spec_location, spec_now, decision = speculation
+		# With the same location and time the inputs are the same, otherwise the urgency is checked again
+		if spec_location == location and (spec_now == now or self.urgency.urgent(now, decision[0]) == decision[1]):
+			self.speculation_hits += 1
+			return decision
+		self.speculation_misses += 1
+		return None
+		
+		
 	def controller(self):
 		""" 
 		This function executes the controller for a surveillance task. It starts by 
@@ -575,7 +1364,24 @@ class Helper:
 		# Define the request for the Controller
 		request.via_points = self._viapoints
 		# Sends the goal to the action server.
-		self.controller_cli.send_goal(request)
+		self._control_start = rospy.get_time()
+		self.controller_cli.send_goal(request, done_cb=self.action_callback, feedback_cb=self.controller_feedback)
+		# Decide the next location in background, predicting when the robot will arrive
+		self.speculate(self.next_loc, int(self._control_start + self._travel_time))
+		
+		
+	def controller_feedback(self, feedback):
+		""" 
+		It is the feedback callback of the goals sent to the controller, which keeps the current 
+		point of the robot updated with the last via point reached. In this way, if the goal fails,
+		a new path can be planned from where the robot is.
+		
+		Args:
+			self: instance of the current class.
+			feedback: it is the feedback of the controller with the last reached point.
+		
+		"""
+		self.current_point = feedback.reached_point
 		
 		
 	def check_controller(self):
@@ -595,34 +1401,37 @@ class Helper:
 		# Execute only when the plan action service is done
 		if self.controller_cli.get_state() == DONE:
 			log_msg = f'The CONTROLLER has reached the target point'
-			rospy.loginfo(anm.tag_log(log_msg, LOG_TAG))
+			rospy.loginfo(anm.tag_log(log_msg, self.log_tag))
 			# Get the final destination when arrived and update the current position of the robot
 			self.current_point = (self.controller_cli.get_result()).reached_point
+			# Retreive the last time the robot moved, which is the value previously written in the ontology
+			last_motion = self.timer_now
 			# Update the position of the robot in the ontology
-			ARGS = ['isIn', 'Robot1', self.next_loc, self.prev_loc]
-			ontology_manager('REPLACE', 'OBJECTPROP', 'IND' , ARGS)
+			directives = []
+			ARGS = ['isIn', self.robot, self.next_loc, self.prev_loc]
+			directives.append(('REPLACE', 'OBJECTPROP', 'IND' , ARGS))
 			self.prev_loc = self.next_loc
 			log_msg = f'The robot arrived at location: {self.next_loc}\n\n'
-			rospy.loginfo(anm.tag_log(log_msg, LOG_TAG))
-			# Reason about the onoloy
-			ARGS = ['']
-			ontology_manager('REASON', '', '', ARGS)
-			# Retreive the last time the robot moved
-			ARGS = ['now', 'Robot1']
-			last_motion = ontology_manager('QUERY', 'DATAPROP', 'IND', ARGS)
-			last_motion = ontology_format(last_motion, 1, 11)
-			# Retreive the last time a specific location has been visited
-			ARGS = ['visitedAt', self.next_loc]
-			last_location = ontology_manager('QUERY', 'DATAPROP', 'IND', ARGS)
-			last_location = ontology_format(last_location, 1, 11) 
+			rospy.loginfo(anm.tag_log(log_msg, self.log_tag))
 			# Update the time
-			self.timer_now = str(int(time.time())) 
+			self.timer_now = str(int(rospy.get_time())) 
 			# Update the timestamp since the robot moved
-			ARGS = ['now', 'Robot1', 'Long', self.timer_now, last_motion[0]]
-			ontology_manager('REPLACE', 'DATAPROP', 'IND', ARGS)
-			# Update the timestamp since the robot visited the location
-			ARGS = ['visitedAt', self.next_loc, 'Long', self.timer_now, last_location[0]]
-			ontology_manager('REPLACE', 'DATAPROP', 'IND', ARGS)
+			ARGS = ['now', self.robot, 'Long', self.timer_now, last_motion]
+			directives.append(('REPLACE', 'DATAPROP', 'IND', ARGS))
+			# The location is shared with the other robots, so its last visit is read, replaced and 
+			# sent to the ontology in the same order for every robot
+			with self.fleet.lock:
+				# Update the timestamp since the robot visited the location
+				last_location = str(self.urgency.visited_at(self.next_loc))
+				ARGS = ['visitedAt', self.next_loc, 'Long', self.timer_now, last_location]
+				directives.append(('REPLACE', 'DATAPROP', 'IND', ARGS))
+				wait = self.ontology_submit(directives)
+				self.urgency.update(self.next_loc, int(self.timer_now))
+			wait()
+			self.visits += 1
+			# Update the estimated travel time, which is used to predict the time of the next arrival
+			travel_time = rospy.get_time() - self._control_start
+			self._travel_time = travel_time if self.visits == 1 else 0.5 * (self._travel_time + travel_time)
 			self.control_completed = True  # Set to True only the one involved in the state
 	
 		
@@ -662,7 +1471,8 @@ class Helper:
 		""" 
 		It simulates a survaillance task of the location in which the robot arrives when the 
 		controller has done its execution. 
-		While it explores the location, also the status of the battery is checked.
+		While it explores the location, it waits for a low battery signal which stops the task.
+		In the benchmark mode the location is checked without waiting.
 		
 		
 		Args:
@@ -671,19 +1481,31 @@ class Helper:
 		"""
 		# Reset the boolean variables
 		self.reset_var()
-		# Surveillance task, lasts 5 seconds if the battery is charged
-		surv_count = 0
+		# The time of arrival is known, decide the next location in background while checking this one,
+		# or decide it now to request its plan in advance
+		if self.prefetch:
+			self.prefetch_plan()
+		else:
+			self.speculate(self.prev_loc, int(self.timer_now))
+		# Surveillance task, lasts 3 seconds if the battery is charged
 		log_msg = f'The robot is surveilling the location'
-		rospy.loginfo(anm.tag_log(log_msg, LOG_TAG))
-		while self.battery_low == False and surv_count < 20: # If bettery low there won't be surveillance task
-			rospy.sleep(WAIT_SURVEILLANCE_TIME)
-			surv_count = surv_count + 1
+		rospy.loginfo(anm.tag_log(log_msg, self.log_tag))
+		if not self.benchmark:
+			end_time = rospy.get_time() + WAIT_SURVEILLANCE_TIME.to_sec()
+			# The timer follows the ROS time, so it also wakes up the surveillance under a simulated clock
+			timer = rospy.Timer(WAIT_SURVEILLANCE_TIME, lambda event: self.notify(), oneshot=True)
+			count = self.event_count()
+			while self.battery_low == False and not rospy.is_shutdown(): # If bettery low there won't be surveillance task
+				if rospy.get_time() >= end_time:
+					break
+				count = self.wait_event(count)   # woken up as soon as the battery gets low or the timer expires
+			timer.shutdown()
 		if self.battery_low == False:
 			log_msg = f'The robot checked location: {self.next_loc}\n\n'
-			rospy.loginfo(anm.tag_log(log_msg, LOG_TAG))
+			rospy.loginfo(anm.tag_log(log_msg, self.log_tag))
 		else:
 			log_msg = f'Stop surveilling! Go to the charge station\n\n'
-			rospy.loginfo(anm.tag_log(log_msg, LOG_TAG))
+			rospy.loginfo(anm.tag_log(log_msg, self.log_tag))
 		self.check_completed = True  # Set to True only the one involved in the state
 	
 	
@@ -0,0 +1,484 @@
+#!/usr/bin/env python
+"""
+.. module:: state_metrics
+	:platform: Unix
+	:synopsis: Python module for the timing and transition metrics of the states of the state machine
+
+.. moduleauthor:: Francesco Ferrazzi <s5262829@studenti.unige.it>
+
+Instrumentation of the SMACH states, which records for every state the time of its last entry and
+exit, how long it lasted, how many times it returned every outcome, and how many calls it did to the
+ontology with their latency. The durations and the latencies are kept in streaming histograms with
+logarithmic buckets, so the memory does not grow with the running time and recording a value costs
+a few operations, i.e. the instrumentation can stay enabled. The metrics are published periodically
+on the /diagnostics topic and saved in a JSON file when the node is shut down.
+The module also counts the requests served by the simulators of the architecture (i.e. the planner,
+the controller and the battery), whose rate is published on the same topic.
+"""
+
+import json
+import math
+import threading
+import time
+import rospy
+
+# Import constant name defined to structure the architecture.
+from exprob_assignment1 import architecture_name_mapper as anm
+from diagnostic_msgs.msg import DiagnosticArray, DiagnosticStatus, KeyValue
+
+# Define the smallest value of the histograms, in seconds, and the growth between two buckets
+HISTOGRAM_MIN = 1e-6
+HISTOGRAM_GROWTH = 1.1
+# Define the quantiles published on the diagnostics
+QUANTILES = (0.5, 0.9, 0.99)
+# Define the name of the calls done outside of any state
+NO_STATE = 'NONE'
+
+
+
+class Histogram:
+	"""
+	This class implements a streaming histogram with logarithmic buckets, whose quantiles have a
+	relative error lower than the growth between two buckets.
+
+	"""
+	def __init__(self):
+		"""
+		Function that initializes the class Histogram.
+
+		Args:
+			self: instance of the current class.
+
+		"""
+		self.count = 0
+		self.total = 0.0
+		self.min = math.inf
+		self.max = 0.0
+		self._buckets = {}   # Number of values of every bucket, i.e. {index: count}
+
+	def record(self, value):
+		"""
+		Method that adds a value to the histogram.
+
+		Args:
+			self: instance of the current class.
+			value: it is the value to be added, e.g. a duration in seconds.
+
+		"""
+		self.count += 1
+		self.total += value
+		if value < self.min:
+			self.min = value
+		if value > self.max:
+			self.max = value
+		index = 0 if value <= HISTOGRAM_MIN else int(math.log(value / HISTOGRAM_MIN, HISTOGRAM_GROWTH)) + 1
+		self._buckets[index] = self._buckets.get(index, 0) + 1
+
+	def quantile(self, q):
+		"""
+		Method that estimates a quantile of the values, as the upper bound of its bucket.
+
+		Args:
+			self: instance of the current class.
+			q: it is the quantile, between 0 and 1.
+
+		Returns:
+			value: the estimated quantile, 0 if the histogram is empty.
+
+		"""
+		if self.count == 0:
+			return 0.0
+		rank = q * self.count
+		seen = 0
+		for index in sorted(self._buckets):
+			seen += self._buckets[index]
+			if seen >= rank:
+				return min(HISTOGRAM_MIN * HISTOGRAM_GROWTH ** index, self.max)
+		return self.max
+
+	def summary(self):
+		"""
+		Method that returns the statistics of the histogram.
+
+		Args:
+			self: instance of the current class.
+
+		Returns:
+			summary: dictionary with the count, mean, min, max and quantiles of the values.
+
+		"""
+		summary = {'count': self.count,
+			'mean': self.total / self.count if self.count > 0 else 0.0,
+			'min': self.min if self.count > 0 else 0.0,
+			'max': self.max}
+		for q in QUANTILES:
+			summary[f'p{int(q * 100)}'] = self.quantile(q)
+		return summary
+
+
+
+class _StateRecord:
+	"""
+	Class that holds the metrics of a single state.
+
+	"""
+	def __init__(self):
+		"""
+		Function that initializes the class _StateRecord.
+
+		Args:
+			self: instance of the current class.
+
+		"""
+		self.entered = None           # Wall time of the last entry in the state
+		self.exited = None            # Wall time of the last exit from the state
+		self.durations = Histogram()  # Time spent in the state, in seconds
+		self.outcomes = {}            # Number of times every outcome has been returned
+		self.calls = 0                # Number of calls to the ontology done in the state
+		self.directives = 0           # Number of directives sent with those calls
+		self.latencies = Histogram()  # Latency of the calls to the ontology, in seconds
+
+	def summary(self):
+		"""
+		Method that returns the metrics of the state.
+
+		Args:
+			self: instance of the current class.
+
+		Returns:
+			summary: dictionary with the metrics of the state.
+
+		"""
+		return {'entered': self.entered,
+			'exited': self.exited,
+			'duration': self.durations.summary(),
+			'outcomes': dict(self.outcomes),
+			'ontology_calls': self.calls,
+			'ontology_directives': self.directives,
+			'ontology_latency': self.latencies.summary()}
+
+
+
+class StateMetrics:
+	"""
+	This class collects the metrics of the states of the state machine. The calls to the ontology
+	are assigned to the state executed by the calling thread, or to the last entered state if the
+	call comes from another thread (e.g. the executor of the asyncio helper).
+
+	"""
+	def __init__(self, name='state_machine'):
+		"""
+		Function that initializes the class StateMetrics.
+
+		Args:
+			self: instance of the current class.
+			name: it is the name of the diagnostics.
+
+		"""
+		self.name = name
+		self._records = {}
+		self._lock = threading.Lock()
+		self._local = threading.local()   # State executed by every thread
+		self._last_state = NO_STATE
+		self._publisher = None
+		self._timer = None
+
+	def instrument(self, label, state):
+		"""
+		Method that wraps the execute() method of a SMACH state to record its metrics.
+
+		Args:
+			self: instance of the current class.
+			label: it is the name of the state in the state machine.
+			state: it is the SMACH state.
+
+		Returns:
+			state: the same SMACH state, instrumented.
+
+		"""
+		execute = state.execute
+		def timed_execute(userdata):
+			outcome = None
+			self.enter(label)
+			start = time.perf_counter()
+			try:
+				outcome = execute(userdata)
+				return outcome
+			finally:
+				self.exit(label, outcome, time.perf_counter() - start)
+		state.execute = timed_execute
+		return state
+
+	def enter(self, label):
+		"""
+		Method that records the entry in a state.
+
+		Args:
+			self: instance of the current class.
+			label: it is the name of the state.
+
+		"""
+		self._local.state = label
+		self._last_state = label
+		with self._lock:
+			self._record(label).entered = time.time()
+
+	def exit(self, label, outcome, duration):
+		"""
+		Method that records the exit from a state.
+
+		Args:
+			self: instance of the current class.
+			label: it is the name of the state.
+			outcome: it is the outcome returned by the state.
+			duration: it is the time spent in the state, in seconds.
+
+		"""
+		self._local.state = None
+		with self._lock:
+			record = self._record(label)
+			record.exited = time.time()
+			record.durations.record(duration)
+			record.outcomes[outcome] = record.outcomes.get(outcome, 0) + 1
+
+	def record_call(self, latency, directives=1):
+		"""
+		Method that records a call to the ontology, done by the state executed by the calling thread.
+
+		Args:
+			self: instance of the current class.
+			latency: it is the latency of the call, in seconds.
+			directives: it is the number of directives sent with the call.
+
+		"""
+		label = getattr(self._local, 'state', None) or self._last_state
+		with self._lock:
+			record = self._record(label)
+			record.calls += 1
+			record.directives += directives
+			record.latencies.record(latency)
+
+	def summary(self):
+		"""
+		Method that returns the metrics of every state.
+
+		Args:
+			self: instance of the current class.
+
+		Returns:
+			summary: dictionary with the metrics of every state, i.e. {state: metrics}.
+
+		"""
+		with self._lock:
+			return {label: record.summary() for label, record in self._records.items()}
+
+	def start(self, topic='/diagnostics', period=1.0):
+		"""
+		Method that starts publishing the metrics on the diagnostics topic.
+
+		Args:
+			self: instance of the current class.
+			topic: it is the name of the diagnostics topic.
+			period: it is the time between two messages, in seconds.
+
+		"""
+		self._publisher = rospy.Publisher(topic, DiagnosticArray, queue_size=1)
+		self._timer = rospy.Timer(rospy.Duration(period), self.publish)
+
+	def start_benchmark(self):
+		"""
+		Method used by the simulators in the benchmark mode, which starts publishing the rate and logs 
+		the requests served when the node is shut down.
+
+		Args:
+			self: instance of the current class.
+
+		"""
+		self.start()
+		rospy.on_shutdown(self.log_summary)
+
+	def log_summary(self):
+		"""
+		Method that logs the number of requests served and their mean rate, tagged with the name.
+
+		Args:
+			self: instance of the current class.
+
+		"""
+		summary = self.summary()
+		log_msg = f'Served {summary["requests"]} requests, {summary["requests_per_second"]:.1f} per second.'
+		rospy.loginfo(anm.tag_log(log_msg, self.name))
+
+	def publish(self, event=None):
+		"""
+		Method that publishes the metrics of every state as a status of the diagnostics.
+
+		Args:
+			self: instance of the current class.
+			event: it is the event of the timer.
+
+		"""
+		msg = DiagnosticArray()
+		msg.header.stamp = rospy.Time.now()
+		for label, summary in self.summary().items():
+			status = DiagnosticStatus(level=DiagnosticStatus.OK, name=f'{self.name}: {label}', hardware_id=self.name)
+			status.message = f'{summary["duration"]["count"]} executions'
+			for key in ('duration', 'ontology_latency'):
+				for stat, value in summary[key].items():
+					status.values.append(KeyValue(key=f'{key}/{stat}', value=str(value)))
+			for outcome, count in summary['outcomes'].items():
+				status.values.append(KeyValue(key=f'outcome/{outcome}', value=str(count)))
+			status.values.append(KeyValue(key='ontology_calls', value=str(summary['ontology_calls'])))
+			status.values.append(KeyValue(key='ontology_directives', value=str(summary['ontology_directives'])))
+			msg.status.append(status)
+		self._publisher.publish(msg)
+
+	def dump(self, file_path):
+		"""
+		Method that saves the metrics of every state in a JSON file.
+
+		Args:
+			self: instance of the current class.
+			file_path: it is the path of the JSON file.
+
+		"""
+		if self._timer is not None:
+			self._timer.shutdown()
+		with open(file_path, 'w') as metrics_file:
+			json.dump(self.summary(), metrics_file, indent=2, default=str)
+
+	def _record(self, label):
+		"""
+		Method that returns the record of a state, creating it if needed. It must be called holding
+		the lock.
+
+		Args:
+			self: instance of the current class.
+			label: it is the name of the state.
+
+		Returns:
+			record: the metrics of the state.
+
+		"""
+		record = self._records.get(label)
+		if record is None:
+			record = self._records[label] = _StateRecord()
+		return record
+
+
+
+class RequestRate:
+	"""
+	This class counts the requests served by a node and measures how many of them are served every
+	second, both since the first request and since the last publish. The wall clock is used, since
+	the rate measures the computation of the node.
+
+	"""
+	def __init__(self, name):
+		"""
+		Function that initializes the class RequestRate.
+
+		Args:
+			self: instance of the current class.
+			name: it is the name of the diagnostics.
+
+		"""
+		self.name = name
+		self.requests = 0           # Number of requests served
+		self._first = None          # Wall time of the first request
+		self._last_requests = 0     # Number of requests served at the last publish
+		self._last_time = None      # Wall time of the last publish
+		self._lock = threading.Lock()
+		self._publisher = None
+		self._timer = None
+
+	def record(self):
+		"""
+		Method that counts a request.
+
+		Args:
+			self: instance of the current class.
+
+		"""
+		with self._lock:
+			if self._first is None:
+				self._first = time.monotonic()
+			self.requests += 1
+
+	def summary(self):
+		"""
+		Method that returns the number of requests and the mean rate since the first one.
+
+		Args:
+			self: instance of the current class.
+
+		Returns:
+			summary: dictionary with the number of requests and the requests per second.
+
+		"""
+		with self._lock:
+			elapsed = time.monotonic() - self._first if self._first is not None else 0.0
+			return {'requests': self.requests,
+				'requests_per_second': self.requests / elapsed if elapsed > 0 else 0.0}
+
+	def start(self, topic='/diagnostics', period=1.0):
+		"""
+		Method that starts publishing the rate on the diagnostics topic.
+
+		Args:
+			self: instance of the current class.
+			topic: it is the name of the diagnostics topic.
+			period: it is the time between two messages, in seconds.
+
+		"""
+		self._publisher = rospy.Publisher(topic, DiagnosticArray, queue_size=1)
+		self._timer = rospy.Timer(rospy.Duration(period), self.publish)
+
+	def start_benchmark(self):
+		"""
+		Method used by the simulators in the benchmark mode, which starts publishing the rate and logs 
+		the requests served when the node is shut down.
+
+		Args:
+			self: instance of the current class.
+
+		"""
+		self.start()
+		rospy.on_shutdown(self.log_summary)
+
+	def log_summary(self):
+		"""
+		Method that logs the number of requests served and their mean rate, tagged with the name.
+
+		Args:
+			self: instance of the current class.
+
+		"""
+		summary = self.summary()
+		log_msg = f'Served {summary["requests"]} requests, {summary["requests_per_second"]:.1f} per second.'
+		rospy.loginfo(anm.tag_log(log_msg, self.name))
+
+	def publish(self, event=None):
+		"""
+		Method that publishes the number of requests and the rates as a status of the diagnostics.
+
+		Args:
+			self: instance of the current class.
+			event: it is the event of the timer.
+
+		"""
+		summary = self.summary()
+		now = time.monotonic()
+		with self._lock:
+			recent = 0.0
+			if self._last_time is not None and now > self._last_time:
+				recent = (summary['requests'] - self._last_requests) / (now - self._last_time)
+			self._last_requests, self._last_time = summary['requests'], now
+		summary['recent_requests_per_second'] = recent
+		msg = DiagnosticArray()
+		msg.header.stamp = rospy.Time.now()
+		status = DiagnosticStatus(level=DiagnosticStatus.OK, name=f'{self.name}: requests', hardware_id=self.name)
+		status.message = f'{recent:.1f} requests per second'
+		status.values = [KeyValue(key=key, value=str(value)) for key, value in summary.items()]
+		msg.status.append(status)
+		self._publisher.publish(msg)
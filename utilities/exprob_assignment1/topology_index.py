@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+"""
+.. module:: topology_index
+	:platform: Unix
+	:synopsis: Python module for the local index of the connections among the locations
+
+.. moduleauthor:: Francesco Ferrazzi <s5262829@studenti.unige.it>
+
+In-memory index of the topology of the map, i.e. location -> doors -> neighbouring locations.
+It applies the same rules of the ontology: two different locations with a door in common are
+`connectedTo` each other, and the robot `canReach` the locations connected to the one it `isIn`.
+The adjacency is computed once and it is rebuilt only when a door is added or removed, so the
+reachable locations are known without querying the ontology.
+"""
+
+
+
+class TopologyIndex:
+	"""
+	This class implements the index of the topology of the map, filled with the same `hasDoor`
+	assertions written in the ontology.
+
+	"""
+	def __init__(self):
+		"""
+		Function that initializes the class TopologyIndex.
+
+		Args:
+			self: instance of the current class.
+
+		"""
+		self.rebuilds = 0          # Number of times the adjacency has been computed
+		self._doors = {}           # Doors of every location in insertion order, i.e. {location: {door: None}}
+		self._locations = {}       # Locations of every door in insertion order, i.e. {door: {location: None}}
+		self._adjacency = None     # Neighbours of every location, `None` when it has to be rebuilt
+
+
+	def add_door(self, location, door):
+		"""
+		Method that states that a location has a door, as `hasDoor` in the ontology.
+
+		Args:
+			self: instance of the current class.
+			location: it is the name of the location.
+			door: it is the name of the door.
+
+		"""
+		doors = self._doors.setdefault(location, {})
+		if door in doors:
+			return
+		doors[door] = None
+		self._locations.setdefault(door, {})[location] = None
+		self._adjacency = None
+
+
+	def remove_door(self, location, door):
+		"""
+		Method that removes a door from a location.
+
+		Args:
+			self: instance of the current class.
+			location: it is the name of the location.
+			door: it is the name of the door.
+
+		"""
+		if door not in self._doors.get(location, {}):
+			return
+		del self._doors[location][door]
+		del self._locations[door][location]
+		self._adjacency = None
+
+
+	def doors(self, location):
+		"""
+		Method that returns the doors of a location.
+
+		Args:
+			self: instance of the current class.
+			location: it is the name of the location.
+
+		Returns:
+			doors: list of the doors of the location.
+
+		"""
+		return list(self._doors.get(location, {}))
+
+
+	def neighbours(self, location):
+		"""
+		Method that returns the locations connected to the given one, i.e. the locations that
+		the robot can reach when it is in the given location.
+
+		Args:
+			self: instance of the current class.
+			location: it is the name of the location.
+
+		Returns:
+			neighbours: list of the connected locations.
+
+		"""
+		if self._adjacency is None:
+			self._rebuild()
+		return list(self._adjacency.get(location, []))
+
+
+	def _rebuild(self):
+		"""
+		Method that computes the neighbours of every location from the doors they share.
+
+		Args:
+			self: instance of the current class.
+
+		"""
+		adjacency = {}
+		for location, doors in self._doors.items():
+			neighbours = {}
+			for door in doors:
+				for other in self._locations[door]:
+					if other != location:
+						neighbours[other] = None
+			adjacency[location] = list(neighbours)
+		self._adjacency = adjacency
+		self.rebuilds += 1
@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+"""
+.. module:: urgency_tracker
+	:platform: Unix
+	:synopsis: Python module for the local index of the urgent locations
+
+.. moduleauthor:: Francesco Ferrazzi <s5262829@studenti.unige.it>
+
+In-memory index of the `visitedAt` timestamps of the locations, which allows knowing which locations
+are URGENT without querying the ontology. It applies the same rule of the ontology: a location is
+URGENT when `now - visitedAt > urgencyThreshold`, where `now` is the last time the robot moved.
+The timestamps are kept in a min-heap of (visitedAt, location), so that an update costs O(log n) and
+the least recently visited locations are always retrieved first. Outdated entries of the heap are
+discarded lazily. The ontology stays the source of truth, this index mirrors what the helper writes.
+"""
+
+import heapq
+import xml.etree.ElementTree as ET
+
+# Define the name spaces used in the OWL files
+RDF = 'http://www.w3.org/1999/02/22-rdf-syntax-ns#'
+OWL = 'http://www.w3.org/2002/07/owl#'
+
+
+
+def read_long_property(file_path, individual, prop):
+	"""
+	Function that reads the value of an integer data property of an individual from an OWL file
+	written in RDF/XML, e.g. the `urgencyThreshold` of the robot in topological_map.owl.
+
+	Args:
+		file_path: it is the path of the OWL file.
+		individual: it is the name of the individual.
+		prop: it is the name of the data property.
+
+	Returns:
+		value: the integer value of the property, `None` if it is not defined.
+
+	"""
+	for node in ET.parse(file_path).getroot().iter(f'{{{OWL}}}NamedIndividual'):
+		if node.get(f'{{{RDF}}}about', '').rsplit('#', 1)[-1] != individual:
+			continue
+		for assertion in node:
+			if assertion.tag.rsplit('}', 1)[-1] == prop:
+				return int(assertion.text)
+	return None
+
+
+
+class UrgencyTracker:
+	"""
+	This class implements the index of the urgent locations, based on a min-heap of the timestamps
+	in which every location has been visited.
+
+	"""
+	def __init__(self, threshold):
+		"""
+		Function that initializes the class UrgencyTracker.
+
+		Args:
+			self: instance of the current class.
+			threshold: time in seconds after which a location that is not visited becomes URGENT.
+
+		"""
+		self.threshold = threshold
+		self._heap = []          # Entries (visitedAt, location), including outdated ones
+		self._visited_at = {}    # Last visit of every location, i.e. {location: visitedAt}
+
+
+	def update(self, location, timestamp):
+		"""
+		Method that stores the time in which a location has been visited. The previous entry of the
+		location stays in the heap and is discarded when it reaches the top.
+
+		Args:
+			self: instance of the current class.
+			location: it is the name of the location.
+			timestamp: it is the time of the visit, in seconds.
+
+		"""
+		self._visited_at[location] = timestamp
+		heapq.heappush(self._heap, (timestamp, location))
+		# Rebuild the heap when the outdated entries are the majority
+		if len(self._heap) > 2 * len(self._visited_at) + 16:
+			self._heap = [(t, loc) for loc, t in self._visited_at.items()]
+			heapq.heapify(self._heap)
+
+
+	def visited_at(self, location):
+		"""
+		Method that returns the last time in which a location has been visited.
+
+		Args:
+			self: instance of the current class.
+			location: it is the name of the location.
+
+		Returns:
+			timestamp: the time of the last visit, `None` if the location is unknown.
+
+		"""
+		return self._visited_at.get(location)
+
+
+	def is_urgent(self, location, now):
+		"""
+		Method that checks if a location is URGENT.
+
+		Args:
+			self: instance of the current class.
+			location: it is the name of the location.
+			now: it is the last time in which the robot moved.
+
+		Returns:
+			urgent: Bool value that states if the location is URGENT.
+
+		"""
+		timestamp = self._visited_at.get(location)
+		return timestamp is not None and now - timestamp > self.threshold
+
+
+	def urgent(self, now, candidates=None):
+		"""
+		Method that returns the URGENT locations, from the least recently visited one. When the
+		candidates are given (e.g. the reachable locations) only them are checked, otherwise the
+		urgent entries are popped from the top of the heap and pushed back, which costs O(k log n)
+		for k urgent locations.
+
+		Args:
+			self: instance of the current class.
+			now: it is the last time in which the robot moved.
+			candidates: list of locations to be checked, `None` to check every location.
+
+		Returns:
+			urgent: list of URGENT locations, the oldest first.
+
+		"""
+		if candidates is not None:
+			urgent = [loc for loc in candidates if self.is_urgent(loc, now)]
+			urgent.sort(key=lambda loc: self._visited_at[loc])
+			return urgent
+		urgent = []
+		popped = []
+		seen = set()
+		while len(self._heap) > 0 and now - self._heap[0][0] > self.threshold:
+			timestamp, location = heapq.heappop(self._heap)
+			if self._visited_at.get(location) != timestamp:
+				continue   # outdated entry, the location has been visited again
+			popped.append((timestamp, location))
+			if location not in seen:
+				seen.add(location)
+				urgent.append(location)
+		for entry in popped:
+			heapq.heappush(self._heap, entry)
+		return urgent